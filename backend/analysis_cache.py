@@ -0,0 +1,131 @@
+# analysis_cache.py
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+from config import ANALYSIS_CACHE_PATH, ANALYSIS_CACHE_MAX_ENTRIES
+
+class AnalysisCache:
+    """
+    Persistent SQLite cache for Ollama analysis results.
+    Entries are keyed by content hash, model name and prompt version, and the least
+    recently used entries are evicted once the cache grows past its size limit.
+    """
+
+    def __init__(self, path=ANALYSIS_CACHE_PATH, max_entries=ANALYSIS_CACHE_MAX_ENTRIES):
+        """
+        Open (or create) the cache database.
+
+        Args:
+            path (str): Path to the SQLite database file.
+            max_entries (int): Maximum number of cached results; 0 disables the cache.
+        """
+        self.path = path
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._conn = None
+        self._size = 0
+
+        if self.max_entries <= 0:
+            return
+        try:
+            # The connection is shared between request threads and guarded by self._lock
+            self._conn = sqlite3.connect(path, check_same_thread=False)
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS analysis_cache ("
+                " content_hash TEXT NOT NULL,"
+                " model TEXT NOT NULL,"
+                " prompt_version TEXT NOT NULL,"
+                " result TEXT NOT NULL,"
+                " last_used REAL NOT NULL,"
+                " PRIMARY KEY (content_hash, model, prompt_version))"
+            )
+            self._conn.execute(
+                "CREATE INDEX IF NOT EXISTS idx_analysis_cache_last_used ON analysis_cache (last_used)"
+            )
+            self._conn.commit()
+            self._size = self._conn.execute("SELECT COUNT(*) FROM analysis_cache").fetchone()[0]
+        except Exception as e:
+            # A broken cache must never prevent analysis; run uncached instead
+            print(f"Could not open analysis cache at {path}: {e}")
+            self._conn = None
+
+    @staticmethod
+    def hash_content(content: str) -> str:
+        """Return a stable hex digest for the given content."""
+        return hashlib.sha256(content.encode('utf-8', errors='ignore')).hexdigest()
+
+    def get(self, content_hash: str, model: str, prompt_version: str):
+        """
+        Look up a cached analysis result and mark it as recently used.
+
+        Returns:
+            dict or None: The cached result, or None on a miss.
+        """
+        if self._conn is None:
+            return None
+        key = (content_hash, model, str(prompt_version))
+        with self._lock:
+            try:
+                row = self._conn.execute(
+                    "SELECT result FROM analysis_cache WHERE content_hash = ? AND model = ? AND prompt_version = ?",
+                    key,
+                ).fetchone()
+                if row is None:
+                    self.misses += 1
+                    return None
+                self._conn.execute(
+                    "UPDATE analysis_cache SET last_used = ? WHERE content_hash = ? AND model = ? AND prompt_version = ?",
+                    (time.time(), *key),
+                )
+                self._conn.commit()
+                self.hits += 1
+                return json.loads(row[0])
+            except Exception as e:
+                print(f"Error reading analysis cache: {e}")
+                self.misses += 1
+                return None
+
+    def put(self, content_hash: str, model: str, prompt_version: str, result: dict):
+        """
+        Store an analysis result, evicting the least recently used entries if the cache is full.
+        """
+        if self._conn is None:
+            return
+        with self._lock:
+            try:
+                cursor = self._conn.execute(
+                    "INSERT OR REPLACE INTO analysis_cache (content_hash, model, prompt_version, result, last_used)"
+                    " VALUES (?, ?, ?, ?, ?)",
+                    (content_hash, model, str(prompt_version), json.dumps(result), time.time()),
+                )
+                # INSERT OR REPLACE reports one changed row either way, so recount only when near the limit
+                self._size += cursor.rowcount
+                if self._size > self.max_entries:
+                    self._size = self._conn.execute("SELECT COUNT(*) FROM analysis_cache").fetchone()[0]
+                    overflow = self._size - self.max_entries
+                    if overflow > 0:
+                        self._conn.execute(
+                            "DELETE FROM analysis_cache WHERE rowid IN"
+                            " (SELECT rowid FROM analysis_cache ORDER BY last_used ASC LIMIT ?)",
+                            (overflow,),
+                        )
+                        self._size -= overflow
+                self._conn.commit()
+            except Exception as e:
+                print(f"Error writing analysis cache: {e}")
+
+    def stats(self) -> dict:
+        """Return hit/miss counters and the current number of cached entries."""
+        lookups = self.hits + self.misses
+        return {
+            "enabled": self._conn is not None,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+            "entries": self._size,
+            "max_entries": self.max_entries,
+        }
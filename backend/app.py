@@ -1,12 +1,21 @@
 # FILEPILOT_BACKEND/main.py
-from flask import Flask, request, jsonify
+from flask import Flask, Response, g, request, jsonify
 from flask_cors import CORS
 import os
-import re
 import json
+import time
 
-from ollama_handler import OllamaHandler
+from ollama_handler import OllamaHandler, ANALYSIS_PROMPT_VERSION
 from file_operations import FileOperations
+from pipeline import OrganizePipeline
+from embedding_classifier import EmbeddingClassifier
+from rule_classifier import RuleClassifier
+from near_duplicate_index import NearDuplicateIndex
+from correction_classifier import CorrectionClassifier
+from circuit_breaker import OllamaUnavailableError
+from scheduler import lane, INTERACTIVE
+from metrics import REGISTRY, HTTP_REQUEST_SECONDS
+from file_ordering import ORDER_POLICIES
 from config import FLASK_PORT
 
 # Initialize Flask app and enable CORS for cross-origin requests (important for Electron communication)
@@ -16,16 +25,81 @@ CORS(app)
 # Initialize handlers for Ollama AI interactions and file operations
 ollama_handler = OllamaHandler()
 file_operations = FileOperations()
+# Extension/MIME rules, categories learned from manual moves, a near-duplicate index and an
+# embedding-based fast classifier consulted before the chat model
+rule_classifier = RuleClassifier(file_operations)
+correction_classifier = CorrectionClassifier(ollama_handler)
+near_duplicate_index = NearDuplicateIndex(ollama_handler.cache_model_key, ANALYSIS_PROMPT_VERSION)
+embedding_classifier = EmbeddingClassifier(ollama_handler)
+# Pipelined organize engine shared by the organize and analysis endpoints
+organize_pipeline = OrganizePipeline(file_operations, ollama_handler, embedding_classifier, rule_classifier,
+                                     near_duplicate_index, correction_classifier)
+
+@app.before_request
+def start_request_timer():
+    """Remember when the request started so its latency can be recorded."""
+    g.request_started = time.perf_counter()
+
+@app.after_request
+def record_request_latency(response):
+    """Record the request latency per endpoint route, method and status code."""
+    started = g.pop('request_started', None)
+    if started is not None:
+        endpoint = request.url_rule.rule if request.url_rule else "unmatched"
+        HTTP_REQUEST_SECONDS.observe(time.perf_counter() - started, endpoint=endpoint,
+                                     method=request.method, status=response.status_code)
+    return response
+
+@app.route('/metrics', methods=['GET'])
+def metrics():
+    """
+    Metrics endpoint in the Prometheus text exposition format.
+
+    Returns:
+        Histograms of Ollama call wall time, load/prompt evaluation/decoding durations and token counts
+        per call kind and model, backend request latency per endpoint, and organize pipeline stage timings.
+    """
+    return Response(REGISTRY.render(), mimetype="text/plain; version=0.0.4")
 
 @app.route('/health', methods=['GET'])
 def health_check():
     """
     Health check endpoint to verify that the backend is running.
+    Status is 'warming' while the startup model check is running, 'degraded' if it failed and
+    'unavailable' while the Ollama circuit breaker is open. A failed model check is re-run in the
+    background (at most every MODEL_RECHECK_SECONDS), so the status recovers once Ollama is up.
     
     Returns:
-        JSON response indicating the status and a message.
+        JSON response indicating the status, a message, the model check state, analysis cache hit/miss counters,
+        coalesced in-flight analyses, prompt evaluation counters, model cascade escalation rates, Ollama host load,
+        model load events, Ollama scheduler queue depth and wait times per lane, the adaptive concurrency limit,
+        circuit breaker state, near-duplicate reuse, learned corrections and rule/embedding classifier hit rates.
     """
-    return jsonify({"status": "healthy", "message": "Python backend is running."}), 200
+    ollama_handler.recheck_models()
+    model_status = ollama_handler.model_status
+    breaker = ollama_handler.breaker.stats()
+    if breaker["state"] == "open":
+        status = "unavailable"
+    else:
+        status = "healthy" if model_status == "ready" else model_status
+    return jsonify({
+        "status": status,
+        "message": "Python backend is running.",
+        "models": {"status": model_status, "message": ollama_handler.model_status_message},
+        "analysis_cache": ollama_handler.cache.stats(),
+        "coalesced_analyses": ollama_handler.coalescing_stats(),
+        "prompt_usage": ollama_handler.usage_stats(),
+        "model_cascade": ollama_handler.cascade_stats(),
+        "ollama_hosts": ollama_handler.pool.stats(),
+        "model_loads": ollama_handler.load_stats(),
+        "scheduler": ollama_handler.scheduler.stats(),
+        "concurrency": ollama_handler.concurrency.stats(),
+        "circuit_breaker": breaker,
+        "rule_classifier": rule_classifier.stats(),
+        "near_duplicates": near_duplicate_index.stats(),
+        "corrections": correction_classifier.stats(),
+        "embedding_classifier": embedding_classifier.stats()
+    }), 200
 
 @app.route('/save_schedule', methods=['POST'])
 def save_schedule():
@@ -82,11 +156,14 @@ def analyze_file_for_suggestions():
         return jsonify({"status": "error", "message": "File not found or invalid path."}), 400
 
     try:
-        # Read file content for analysis
-        file_content = file_operations.read_file_content(file_path)
-        # Use Ollama AI to analyze content
-        analysis = ollama_handler.analyze_content(file_content)
+        # Read and analyze the file through the same extract/classify stages as bulk organizing.
+        # A user is waiting on this one, so its Ollama calls go ahead of any running organize job.
+        with lane(INTERACTIVE):
+            analysis = organize_pipeline.analyze_file(file_path)
         return jsonify({"status": "success", "analysis": analysis}), 200
+    except OllamaUnavailableError as e:
+        # Ollama is down or overloaded; the client should retry later
+        return jsonify({"status": "error", "message": str(e)}), 503
     except Exception as e:
         # Log and return analysis failure
         print(f"Error analyzing file {file_path}: {e}")
@@ -96,6 +173,8 @@ def analyze_file_for_suggestions():
 def manual_file_action():
     """
     Performs manual file operations such as moving or renaming files.
+    Moving a file into a folder named after a category (e.g. '.../Financial') records that category
+    as a correction, so similar files get it in later organize runs without a model call.
     
     Expects JSON payload with:a
         - action_type (str): Either 'move' or 'rename'.
@@ -103,7 +182,8 @@ def manual_file_action():
         - target_path (str): For 'move', the new directory path; for 'rename', the new full file path.
     
     Returns:
-        JSON response indicating success or failure, and the new file path if successful.
+        JSON response indicating success or failure, the new file path if successful, and the
+        learned category (or null) for moves.
     """
     data = request.json
     action_type = data.get('action_type')
@@ -120,11 +200,19 @@ def manual_file_action():
     try:
         success = False
         message = ""
+        learned_category = None
         if action_type == 'move':
             # Move file to target directory, no rename
             target_directory = target_path
+            learned_category = correction_classifier.category_for_folder(target_directory)
+            # Read the content while the file is still at its known path
+            content = file_operations.read_file_content(original_path) if learned_category else ""
             success = file_operations.move_file(original_path, target_directory, None)
             message = "File moved successfully." if success else "Failed to move file."
+            if success and learned_category:
+                extension = os.path.splitext(original_path)[1].lstrip('.').lower()
+                if not correction_classifier.record(content, extension, learned_category):
+                    learned_category = None
         elif action_type == 'rename':
             # Rename file to target path
             success = file_operations.rename_file(original_path, target_path)
@@ -134,7 +222,8 @@ def manual_file_action():
             return jsonify({"status": "error", "message": "Invalid action type."}), 400
 
         if success:
-            return jsonify({"status": "success", "message": message, "new_path": target_path}), 200
+            return jsonify({"status": "success", "message": message, "new_path": target_path,
+                            "learned_category": learned_category}), 200
         else:
             # Operation failed without exception
             return jsonify({"status": "error", "message": message}), 500
@@ -153,72 +242,39 @@ def analyze_and_organize():
         - source_directory (str): Directory containing files to organize.
         - destination_base_directory (str): Base directory where categorized folders will be created.
         - rename_files (bool, optional): Whether to rename files based on suggestions.
+        - order (str, optional): Processing order: 'walk', 'smallest', 'mtime' or 'tokens'.
     
     Returns:
-        JSON response summarizing processed files and any errors encountered.
+        JSON response summarizing processed files, any errors encountered, groups of identical files
+        and run timing (time to first result, files/sec).
     """
     data = request.json
     source_directory = data.get('source_directory')
     destination_base_directory = data.get('destination_base_directory')
     rename_files = data.get('rename_files', False)
+    order = data.get('order')
 
     if not source_directory or not destination_base_directory:
         return jsonify({"status": "error", "message": "Missing source or destination directory."}), 400
     if not os.path.isdir(source_directory):
         # Ensure source directory exists and is accessible
         return jsonify({"status": "error", "message": f"Source directory '{source_directory}' does not exist."}), 400
+    if order is not None and order not in ORDER_POLICIES:
+        return jsonify({"status": "error", "message": f"Unknown order '{order}'; expected one of {', '.join(ORDER_POLICIES)}."}), 400
 
-    processed_files = []
-    errors = []
-
-    # Retrieve list of files to process
-    files_to_process = file_operations.get_files_in_directory(source_directory)
-
-    for file_path in files_to_process:
-        try:
-            # Read each file's content
-            file_content = file_operations.read_file_content(file_path)
-            # Analyze content for category and new name suggestion
-            analysis = ollama_handler.analyze_content(file_content)
-
-            category = analysis.get("category", "Miscellaneous")
-            new_name_suggestion = analysis.get("new_name_suggestion")
-
-            # Destination folder based on category
-            final_destination_folder = os.path.join(destination_base_directory, category)
-
-            original_base_name, ext = os.path.splitext(os.path.basename(file_path))
-            final_new_name = None
-            if rename_files and new_name_suggestion:
-                # Clean and format suggested new name
-                cleaned_name = re.sub(r'[^\w\s.-]', '', new_name_suggestion).strip()
-                cleaned_name = re.sub(r'\s+', '_', cleaned_name)
-                if cleaned_name:
-                    final_new_name = cleaned_name.lower()
-
-            # Move (and optionally rename) file to destination folder
-            success = file_operations.move_file(file_path, final_destination_folder, final_new_name)
-
-            if success:
-                processed_files.append({
-                    "original_path": file_path,
-                    "new_path": os.path.join(final_destination_folder, (final_new_name if final_new_name else original_base_name) + ext),
-                    "category": category,
-                    "renamed": bool(final_new_name)
-                })
-            else:
-                errors.append({"file": file_path, "message": "Failed to move file."})
-
-        except Exception as e:
-            # Log individual file errors but continue processing others
-            errors.append({"file": file_path, "message": str(e)})
+    # Run the shared scan -> extract -> classify -> plan -> move pipeline
+    result = organize_pipeline.run(source_directory, destination_base_directory, rename_files, order)
+    processed_files = result["processed_files"]
+    errors = result["errors"]
 
     return jsonify({
         "status": "success",
         "processed_count": len(processed_files),
         "error_count": len(errors),
         "processed_files": processed_files,
-        "errors": errors
+        "errors": errors,
+        "duplicate_groups": result["duplicate_groups"],
+        "timing": result["timing"]
     }), 200
 
 @app.route('/auto_organize_in_place', methods=['POST'])
@@ -230,71 +286,38 @@ def auto_organize_in_place():
     Expects JSON payload with:
         - source_directory (str): Directory to organize in place.
         - rename_files (bool, optional): Whether to rename files based on suggestions.
+        - order (str, optional): Processing order: 'walk', 'smallest', 'mtime' or 'tokens'.
     
     Returns:
-        JSON response summarizing processed files and any errors encountered.
+        JSON response summarizing processed files, any errors encountered, groups of identical files
+        and run timing (time to first result, files/sec).
     """
     data = request.json
     source_directory = data.get('source_directory')
     rename_files = data.get('rename_files', False)
+    order = data.get('order')
 
     if not source_directory:
         return jsonify({"status": "error", "message": "Missing directory to auto-organize."}), 400
     if not os.path.isdir(source_directory):
         # Validate directory existence and accessibility
         return jsonify({"status": "error", "message": f"Directory '{source_directory}' does not exist or is not accessible."}), 400
+    if order is not None and order not in ORDER_POLICIES:
+        return jsonify({"status": "error", "message": f"Unknown order '{order}'; expected one of {', '.join(ORDER_POLICIES)}."}), 400
 
-    processed_files = []
-    errors = []
-
-    # List files in source directory
-    files_to_process = file_operations.get_files_in_directory(source_directory)
-
-    for file_path in files_to_process:
-        try:
-            # Read file content for analysis
-            file_content = file_operations.read_file_content(file_path)
-            # Analyze content for category and renaming suggestions
-            analysis = ollama_handler.analyze_content(file_content)
-
-            category = analysis.get("category", "Miscellaneous")
-            new_name_suggestion = analysis.get("new_name_suggestion")
-
-            # Destination folder is a subfolder in source directory
-            final_destination_folder = os.path.join(source_directory, category)
-
-            original_base_name, ext = os.path.splitext(os.path.basename(file_path))
-            final_new_name = None
-            if rename_files and new_name_suggestion:
-                # Sanitize and format new name
-                cleaned_name = re.sub(r'[^\w\s.-]', '', new_name_suggestion).strip()
-                cleaned_name = re.sub(r'\s+', '_', cleaned_name)
-                if cleaned_name:
-                    final_new_name = cleaned_name.lower()
-
-            # Move and optionally rename file within source directory
-            success = file_operations.move_file(file_path, final_destination_folder, final_new_name)
-
-            if success:
-                processed_files.append({
-                    "original_path": file_path,
-                    "new_path": os.path.join(final_destination_folder, (final_new_name if final_new_name else original_base_name) + ext),
-                    "category": category,
-                    "renamed": bool(final_new_name)
-                })
-            else:
-                errors.append({"file": file_path, "message": "Failed to move file."})
-
-        except Exception as e:
-            # Continue processing other files despite errors
-            errors.append({"file": file_path, "message": str(e)})
+    # Category subfolders are created inside the source directory itself
+    result = organize_pipeline.run(source_directory, source_directory, rename_files, order)
+    processed_files = result["processed_files"]
+    errors = result["errors"]
 
     return jsonify({
         "status": "success",
         "processed_count": len(processed_files),
         "error_count": len(errors),
         "processed_files": processed_files,
-        "errors": errors
+        "errors": errors,
+        "duplicate_groups": result["duplicate_groups"],
+        "timing": result["timing"]
     }), 200
 
 @app.route('/get_file_content', methods=['POST'])
@@ -315,8 +338,8 @@ def get_file_content():
         # File must exist to return content
         return jsonify({"status": "error", "message": "File not found."}), 404
 
-    # Read and return file content
-    content = file_operations.read_file_content(file_path)
+    # Read and return file content; the user asked for the file itself, so PDFs are not sampled
+    content = file_operations.read_file_content(file_path, pdf_mode='full')
     return jsonify({"status": "success", "content": content}), 200
 
 @app.route('/list_files', methods=['POST'])
@@ -0,0 +1,2 @@
+# benchmarks/__init__.py
+# Fake Ollama server, synthetic corpus generator and end-to-end benchmark runner; run from the backend directory.
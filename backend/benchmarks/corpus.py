@@ -0,0 +1,164 @@
+# benchmarks/corpus.py
+"""
+Synthetic corpus generator for the benchmarks: text, code, CSV, DOCX and PDF files with a
+long-tailed size distribution, written into a single directory tree.
+
+Usage (from the backend directory):
+    python -m benchmarks.corpus /tmp/docpilot-corpus --count 500 --seed 1
+"""
+import argparse
+import os
+import random
+
+try:
+    from docx import Document
+except ImportError:
+    Document = None
+    print("python-docx not installed. The corpus will contain text files instead of DOCX files.")
+
+KINDS = ('text', 'code', 'csv', 'docx', 'pdf')
+
+WORDS = (
+    "invoice quarterly report budget meeting agenda project proposal contract agreement party lecture "
+    "chapter exercise summary customer revenue expense travel schedule design review release notes "
+    "server deployment analysis research results method discussion conclusion appendix policy update"
+).split()
+
+TEXT_TEMPLATES = (
+    "Invoice {number} for {name}. Date {date}. Total due {amount} USD. Payment terms net 30 days.",
+    "Meeting minutes {date}: the team reviewed the {word} {word2} and agreed on next steps.",
+    "Lecture {number}: introduction to {word} and {word2}. Exercise: summarize chapter {number}.",
+    "This agreement is made between the party of the first part, {name}, and the party of the second part.",
+    "{date} 12:00:01 INFO service started\n{date} 12:00:05 ERROR connection to {word} failed",
+)
+
+CODE_TEMPLATES = {
+    'py': "import os\n\ndef {word}_{word2}(path):\n    return os.path.basename(path)\n",
+    'js': "const {word} = require('{word2}');\nfunction {word}Handler(req) {{\n  return {word}(req);\n}}\n",
+}
+
+def _fill(template: str, rng: random.Random) -> str:
+    return template.format(
+        number=rng.randint(1, 9999), name=rng.choice(("ACME Corp", "Globex", "Initech", "Umbrella")),
+        date=f"2025-{rng.randint(1, 12):02d}-{rng.randint(1, 28):02d}", amount=f"{rng.uniform(10, 5000):.2f}",
+        word=rng.choice(WORDS), word2=rng.choice(WORDS),
+    )
+
+def _target_size(rng: random.Random) -> int:
+    """Long-tailed file size in characters: mostly a few KB, occasionally a few hundred KB."""
+    return int(min(rng.lognormvariate(7.5, 1.2), 400_000))
+
+def _paragraphs(rng: random.Random, size: int) -> list[str]:
+    """Random prose of roughly size characters, as a list of paragraphs."""
+    paragraphs = [_fill(rng.choice(TEXT_TEMPLATES), rng)]
+    total = len(paragraphs[0])
+    while total < size:
+        paragraph = " ".join(rng.choice(WORDS) for _ in range(rng.randint(20, 80))).capitalize() + "."
+        paragraphs.append(paragraph)
+        total += len(paragraph)
+    return paragraphs
+
+def _code(rng: random.Random, size: int, extension: str) -> str:
+    parts = []
+    while sum(len(part) for part in parts) < size:
+        parts.append(_fill(CODE_TEMPLATES[extension], rng))
+    return "\n".join(parts)
+
+def _csv(rng: random.Random, size: int) -> str:
+    lines = ["id,date,value,label"]
+    total = len(lines[0])
+    while total < size:
+        line = f"{len(lines)},2025-{rng.randint(1, 12):02d}-{rng.randint(1, 28):02d},{rng.uniform(0, 1000):.3f},{rng.choice(WORDS)}"
+        lines.append(line)
+        total += len(line) + 1
+    return "\n".join(lines)
+
+def write_pdf(file_path: str, paragraphs: list[str], lines_per_page: int = 50, chars_per_line: int = 90):
+    """Write a minimal text-only PDF (Helvetica, one text stream per page) without any PDF library."""
+    lines = []
+    for paragraph in paragraphs:
+        lines.extend(paragraph[start:start + chars_per_line] for start in range(0, len(paragraph), chars_per_line))
+    pages = [lines[start:start + lines_per_page] for start in range(0, len(lines), lines_per_page)] or [[]]
+
+    objects = [b"<< /Type /Catalog /Pages 2 0 R >>", None, b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>"]
+    page_ids = []
+    for page_lines in pages:
+        escaped = (line.replace('\\', '\\\\').replace('(', '\\(').replace(')', '\\)') for line in page_lines)
+        stream = ("BT /F1 10 Tf 14 TL 40 800 Td " + " ".join(f"({line}) Tj T*" for line in escaped) + " ET").encode('latin-1', 'replace')
+        objects.append(b"<< /Length %d >>\nstream\n" % len(stream) + stream + b"\nendstream")
+        objects.append(("<< /Type /Page /Parent 2 0 R /MediaBox [0 0 612 842] /Resources << /Font << /F1 3 0 R >> >>"
+                        f" /Contents {len(objects)} 0 R >>").encode())
+        page_ids.append(len(objects))
+    objects[1] = f"<< /Type /Pages /Kids [{' '.join(f'{page_id} 0 R' for page_id in page_ids)}] /Count {len(page_ids)} >>".encode()
+
+    output = bytearray(b"%PDF-1.4\n")
+    offsets = []
+    for number, body in enumerate(objects, start=1):
+        offsets.append(len(output))
+        output += b"%d 0 obj\n" % number + body + b"\nendobj\n"
+    xref_offset = len(output)
+    output += b"xref\n0 %d\n0000000000 65535 f \n" % (len(objects) + 1)
+    output += b"".join(b"%010d 00000 n \n" % offset for offset in offsets)
+    output += b"trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (len(objects) + 1, xref_offset)
+    with open(file_path, 'wb') as f:
+        f.write(output)
+
+def generate_corpus(directory: str, count: int, seed: int = 0, kinds=KINDS) -> list[str]:
+    """
+    Write count synthetic files into directory (and a few subdirectories).
+
+    Args:
+        directory (str): Target directory; created if missing.
+        count (int): Number of files to write.
+        seed (int): Seed, so the same arguments always produce the same corpus.
+        kinds (tuple): File kinds to draw from: 'text', 'code', 'csv', 'docx' and/or 'pdf'.
+
+    Returns:
+        list[str]: Paths of the written files.
+    """
+    rng = random.Random(seed)
+    paths = []
+    for index in range(count):
+        kind = rng.choice(kinds)
+        folder = os.path.join(directory, f"folder_{index % 7}") if index % 3 == 0 else directory
+        os.makedirs(folder, exist_ok=True)
+        size = _target_size(rng)
+        base = os.path.join(folder, f"{kind}_{seed}_{index}")
+
+        if kind == 'code':
+            extension = rng.choice(tuple(CODE_TEMPLATES))
+            file_path = f"{base}.{extension}"
+            with open(file_path, 'w', encoding='utf-8') as f:
+                f.write(_code(rng, size, extension))
+        elif kind == 'csv':
+            file_path = f"{base}.csv"
+            with open(file_path, 'w', encoding='utf-8') as f:
+                f.write(_csv(rng, size))
+        elif kind == 'pdf':
+            file_path = f"{base}.pdf"
+            write_pdf(file_path, _paragraphs(rng, size))
+        elif kind == 'docx' and Document is not None:
+            file_path = f"{base}.docx"
+            document = Document()
+            for paragraph in _paragraphs(rng, size):
+                document.add_paragraph(paragraph)
+            document.save(file_path)
+        else:
+            file_path = f"{base}.{rng.choice(('txt', 'md'))}"
+            with open(file_path, 'w', encoding='utf-8') as f:
+                f.write("\n\n".join(_paragraphs(rng, size)))
+        paths.append(file_path)
+    return paths
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate a synthetic corpus for DocPilot benchmarks.")
+    parser.add_argument('directory')
+    parser.add_argument('--count', type=int, default=100)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--kinds', nargs='+', choices=KINDS, default=list(KINDS))
+    args = parser.parse_args()
+    paths = generate_corpus(args.directory, args.count, args.seed, tuple(args.kinds))
+    print(f"Wrote {len(paths)} files to {args.directory}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,311 @@
+# benchmarks/fake_ollama.py
+"""
+Local stand-in for the Ollama HTTP API, so DocPilot's own overhead can be measured without a model.
+
+It answers /api/chat (plain, JSON and batch schemas, streamed or not), /api/generate, /api/embed,
+/api/show, /api/pull, /api/tags and /api/version with plausible content and Ollama's timing fields.
+
+Usage (from the backend directory):
+    python -m benchmarks.fake_ollama --port 11435 --latency lognormal:0.2:0.5 --tokens-per-second 40
+    OLLAMA_HOST=http://127.0.0.1:11435 python app.py
+"""
+import argparse
+import hashlib
+import json
+import math
+import random
+import re
+import threading
+import time
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+# Keyword heuristics used to pick a plausible category for the fake answers
+CATEGORY_KEYWORDS = [
+    ('Code', ('def ', 'import ', 'function ', 'return ', 'const ')),
+    ('Logs', ('ERROR', 'WARN', 'INFO')),
+    ('Financial', ('invoice', 'total due', 'budget', 'amount')),
+    ('Legal', ('agreement', 'party', 'hereby')),
+    ('Education', ('lecture', 'chapter', 'exercise')),
+    ('Data', ('id,', 'value,', 'date,')),
+]
+
+def parse_latency(spec: str, rng=random):
+    """
+    Turn a latency spec into a function returning seconds, drawing from rng:
+    'fixed:S', 'uniform:MIN:MAX', 'lognormal:MEDIAN:SIGMA' or 'exponential:MEAN'.
+    """
+    kind, *values = spec.split(':')
+    values = [float(value) for value in values]
+    if kind == 'fixed':
+        return lambda: values[0]
+    if kind == 'uniform':
+        return lambda: rng.uniform(values[0], values[1])
+    if kind == 'lognormal':
+        return lambda: rng.lognormvariate(math.log(values[0]), values[1])
+    if kind == 'exponential':
+        return lambda: rng.expovariate(1 / values[0])
+    raise ValueError(f"Unknown latency distribution '{spec}'")
+
+def guess_category(text: str) -> str:
+    """Pick a category for text from simple keyword matches."""
+    for category, keywords in CATEGORY_KEYWORDS:
+        if any(keyword in text for keyword in keywords):
+            return category
+    return 'Business'
+
+def fake_embedding(text: str, dimensions: int = 64) -> list[float]:
+    """Bag-of-words embedding from hashed words, so similar texts get similar vectors."""
+    vector = [0.0] * dimensions
+    for word in re.findall(r'\w+', text.lower()):
+        vector[int(hashlib.md5(word.encode()).hexdigest(), 16) % dimensions] += 1.0
+    return vector
+
+
+class FakeOllamaServer:
+    """
+    Threaded fake Ollama server with configurable latency, decoding speed and failure injection.
+    """
+
+    def __init__(self, host: str = '127.0.0.1', port: int = 0, latency: str = 'fixed:0.05',
+                 tokens_per_second: float = 200.0, failure_rate: float = 0.0, failure_status: int = 500,
+                 load_seconds: float = 0.0, seed: int = None, parallel: int = 0):
+        """
+        Args:
+            host (str): Interface to bind.
+            port (int): Port to bind; 0 picks a free one (see url).
+            latency (str): Distribution of the time before the first output token (see parse_latency).
+            tokens_per_second (float): Decoding speed; output is also paced chunk by chunk when streaming.
+            failure_rate (float): Fraction of requests answered with failure_status instead.
+            failure_status (int): HTTP status of injected failures.
+            load_seconds (float): Simulated model load time, paid once per model and after each unload.
+            seed (int, optional): Seed for the random latency and failure draws.
+            parallel (int): Generations served at once, like OLLAMA_NUM_PARALLEL; further chat requests
+                            queue for a free slot. 0 means unlimited.
+        """
+        self.random = random.Random(seed)
+        self.latency = parse_latency(latency, self.random)
+        self.tokens_per_second = tokens_per_second
+        self.failure_rate = failure_rate
+        self.failure_status = failure_status
+        self.load_seconds = load_seconds
+        self.slots = threading.BoundedSemaphore(parallel) if parallel > 0 else None
+        self.loaded_models = set()
+        self.requests = {}
+        self.failures = 0
+        self._lock = threading.Lock()
+        self._thread = None
+
+        handler = type('FakeOllamaHandler', (_Handler,), {'fake': self})
+        self._httpd = _Server((host, port), handler)
+
+    @property
+    def url(self) -> str:
+        host, port = self._httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self):
+        """Serve requests on a background thread; returns self."""
+        self._thread = threading.Thread(target=self.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def serve_forever(self):
+        """Serve requests on the calling thread until stop() is called."""
+        self._httpd.serve_forever()
+
+    def stop(self):
+        """Stop serving and close the socket."""
+        self._httpd.shutdown()
+        self._httpd.server_close()
+
+    def stats(self) -> dict:
+        """Return request counts per path and the number of injected failures."""
+        with self._lock:
+            return {"requests": dict(self.requests), "failures": self.failures}
+
+    def _count(self, path: str) -> bool:
+        """Count a request; returns True if it should fail."""
+        with self._lock:
+            self.requests[path] = self.requests.get(path, 0) + 1
+            failed = self.random.random() < self.failure_rate
+            self.failures += int(failed)
+            return failed
+
+    def _load(self, model: str) -> float:
+        """Simulate loading model if needed; returns the load time in seconds."""
+        with self._lock:
+            if model in self.loaded_models or self.load_seconds <= 0:
+                self.loaded_models.add(model)
+                return 0.0
+            self.loaded_models.add(model)
+        time.sleep(self.load_seconds)
+        return self.load_seconds
+
+
+class _Server(ThreadingHTTPServer):
+    # A deep listen backlog keeps bursts of parallel requests from being dropped and retried by the OS
+    request_queue_size = 128
+    daemon_threads = True
+
+
+class _Handler(BaseHTTPRequestHandler):
+    fake = None  # Set on the per-server subclass
+    protocol_version = 'HTTP/1.1'
+
+    def log_message(self, *args):
+        pass
+
+    def do_HEAD(self):
+        self._send_json({})
+
+    def do_GET(self):
+        self.fake._count(self.path)
+        if self.path.startswith('/api/tags'):
+            models = sorted(self.fake.loaded_models) or ['phi3:mini']
+            self._send_json({"models": [{"name": model, "model": model} for model in models]})
+        else:
+            self._send_json({"version": "0.0.0-fake"})
+
+    def do_POST(self):
+        length = int(self.headers.get('Content-Length', 0))
+        request = json.loads(self.rfile.read(length) or b'{}')
+        if self.fake._count(self.path):
+            self._send_json({"error": "injected failure"}, status=self.fake.failure_status)
+            return
+        if self.path == '/api/chat':
+            self._chat(request)
+        elif self.path == '/api/generate':
+            self._generate(request)
+        elif self.path == '/api/embed':
+            texts = request.get('input')
+            texts = [texts] if isinstance(texts, str) else texts or []
+            load = self.fake._load(request.get('model'))
+            time.sleep(self.fake.latency() / 4)
+            self._send_json({"model": request.get('model'), "embeddings": [fake_embedding(text) for text in texts],
+                             "load_duration": int(load * 1e9),
+                             "prompt_eval_count": sum(len(text) // 4 for text in texts)})
+        elif self.path == '/api/show':
+            self._send_json({"modelfile": "", "details": {}, "model_info": {}, "modified_at": "2024-01-01T00:00:00Z"})
+        else:
+            # /api/pull and anything else: report success
+            self._send_json({"status": "success"})
+
+    def _chat(self, request: dict):
+        if self.fake.slots is None:
+            self._generate_chat(request)
+            return
+        with self.fake.slots:
+            self._generate_chat(request)
+
+    def _generate_chat(self, request: dict):
+        model = request.get('model')
+        messages = request.get('messages', [])
+        prompt = "\n".join(message.get('content', '') for message in messages)
+        document = messages[-1].get('content', '') if messages else ''
+        content = self._answer(document, request.get('format'))
+        num_predict = (request.get('options') or {}).get('num_predict')
+        if num_predict:
+            # Like Ollama, stop at the output cap even if that cuts the answer short
+            content = content[:num_predict * 4]
+
+        load = self.fake._load(model)
+        first_token = self.fake.latency()
+        time.sleep(first_token)
+        tokens = max(1, len(content) // 4)
+        token_seconds = 1 / self.fake.tokens_per_second if self.fake.tokens_per_second > 0 else 0.0
+        final = {
+            "model": model, "created_at": "2024-01-01T00:00:00Z", "done": True, "done_reason": "stop",
+            "load_duration": int(load * 1e9),
+            "prompt_eval_count": len(prompt) // 4,
+            "prompt_eval_duration": int(first_token * 1e9),
+            "eval_count": tokens,
+            "eval_duration": int(tokens * token_seconds * 1e9),
+            "total_duration": int((load + first_token + tokens * token_seconds) * 1e9),
+        }
+        if not request.get('stream', True):
+            time.sleep(tokens * token_seconds)
+            self._send_json(final | {"message": {"role": "assistant", "content": content}})
+            return
+
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/x-ndjson')
+        self.send_header('Connection', 'close')
+        self.end_headers()
+        try:
+            for start in range(0, len(content), 4):
+                chunk = {"model": model, "message": {"role": "assistant", "content": content[start:start + 4]}, "done": False}
+                self.wfile.write((json.dumps(chunk) + "\n").encode())
+                self.wfile.flush()
+                time.sleep(token_seconds)
+            self.wfile.write((json.dumps(final | {"message": {"role": "assistant", "content": ""}}) + "\n").encode())
+        except (BrokenPipeError, ConnectionResetError):
+            # The client cancelled the stream once it had what it needed
+            pass
+        self.close_connection = True
+
+    def _answer(self, document: str, response_format) -> str:
+        """Build the fake model output for a chat request."""
+        if isinstance(response_format, dict) and 'results' in response_format.get('properties', {}):
+            parts = re.split(r'### Document (\d+)\n', document)[1:]
+            results = [
+                self._analysis(parts[index + 1]) | {"id": int(parts[index])}
+                for index in range(0, len(parts), 2)
+            ]
+            return json.dumps({"results": results})
+        if response_format:
+            return json.dumps(self._analysis(document))
+        return self._name(document)
+
+    def _analysis(self, document: str) -> dict:
+        category = guess_category(document)
+        return {"category": category, "new_name_suggestion": self._name(document),
+                "confidence": round(self.fake.random.uniform(0.6, 0.99), 2)}
+
+    def _name(self, document: str) -> str:
+        words = [word for word in re.findall(r'[A-Za-z]{4,}', document) if word.lower() not in ('file', 'content')]
+        return " ".join(words[2:6]).title() or "Untitled Document"
+
+    def _generate(self, request: dict):
+        model = request.get('model')
+        if request.get('keep_alive') in (0, '0'):
+            # keep_alive=0 unloads the model
+            with self.fake._lock:
+                self.fake.loaded_models.discard(model)
+            load = 0.0
+        else:
+            load = self.fake._load(model)
+        self._send_json({"model": model, "response": "", "done": True, "load_duration": int(load * 1e9)})
+
+    def _send_json(self, body: dict, status: int = 200):
+        data = json.dumps(body).encode()
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Fake Ollama server for benchmarking DocPilot.")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=11435)
+    parser.add_argument('--latency', default='fixed:0.05',
+                        help="fixed:S, uniform:MIN:MAX, lognormal:MEDIAN:SIGMA or exponential:MEAN (seconds)")
+    parser.add_argument('--tokens-per-second', type=float, default=200.0)
+    parser.add_argument('--failure-rate', type=float, default=0.0)
+    parser.add_argument('--failure-status', type=int, default=500)
+    parser.add_argument('--load-seconds', type=float, default=0.0)
+    parser.add_argument('--seed', type=int)
+    parser.add_argument('--parallel', type=int, default=0, help="Concurrent generations; 0 for unlimited")
+    args = parser.parse_args()
+
+    server = FakeOllamaServer(args.host, args.port, args.latency, args.tokens_per_second,
+                              args.failure_rate, args.failure_status, args.load_seconds, args.seed, args.parallel)
+    print(f"Fake Ollama server listening on {server.url}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,217 @@
+# benchmarks/run_benchmarks.py
+"""
+End-to-end throughput benchmark. Starts the fake Ollama server, points the backend at it, and drives
+/analyze_and_organize, /auto_organize_in_place and /list_files through Flask's test client on freshly
+generated corpora of several sizes. Reports files/sec, time to first result, p50/p99 latency and
+peak RSS per run, once per file ordering policy given with --orders.
+
+For the organize endpoints, latency is the time from the request start until each file has been moved;
+for /list_files it is the latency of each repeated request.
+
+Usage (from the backend directory):
+    python -m benchmarks.run_benchmarks --sizes 50 200 1000 --latency lognormal:0.1:0.4 --json results.json
+    python -m benchmarks.run_benchmarks --sizes 500 --orders walk smallest tokens
+"""
+import argparse
+import json
+import os
+import sys
+import tempfile
+import time
+
+from benchmarks.corpus import KINDS, generate_corpus
+from benchmarks.fake_ollama import FakeOllamaServer
+
+try:
+    import resource
+except ImportError:
+    resource = None  # Not available on Windows; peak RSS is reported as None there
+
+def peak_rss_mb():
+    """Peak resident set size of this process so far, in MiB, or None if unknown."""
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is in bytes on macOS and in KiB elsewhere
+    return round(peak / (1024 * 1024 if sys.platform == 'darwin' else 1024), 1)
+
+def percentile(samples: list[float], fraction: float):
+    """Nearest-rank percentile of samples, or None if there are none."""
+    if not samples:
+        return None
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, max(0, int(round(fraction * len(ordered))) - 1))]
+
+def configure_backend(work_dir: str, ollama_url: str, use_caches: bool):
+    """Point the backend's configuration at the fake server and throwaway cache files before it is imported."""
+    os.environ['OLLAMA_HOST'] = ollama_url
+    os.environ['OLLAMA_HOSTS'] = ollama_url
+    os.environ['ANALYSIS_CACHE_PATH'] = os.path.join(work_dir, 'analysis_cache.sqlite3')
+    os.environ['NEAR_DUPLICATE_INDEX_PATH'] = os.path.join(work_dir, 'near_duplicates.sqlite3')
+    # Never the backend's real store: learned corrections would answer for the model
+    os.environ['CORRECTIONS_PATH'] = os.path.join(work_dir, 'corrections.sqlite3')
+    if not use_caches:
+        os.environ['ANALYSIS_CACHE_MAX_ENTRIES'] = '0'
+        os.environ['NEAR_DUPLICATE_ENABLED'] = 'false'
+        os.environ['CORRECTION_LEARNING_ENABLED'] = 'false'
+
+class MoveTimer:
+    """Wraps FileOperations.move_file to timestamp each successful move."""
+
+    def __init__(self, file_operations):
+        self.file_operations = file_operations
+        self.move_file = file_operations.move_file
+        self.completed = []
+        file_operations.move_file = self._move_file
+
+    def _move_file(self, *args, **kwargs):
+        moved = self.move_file(*args, **kwargs)
+        if moved:
+            self.completed.append(time.perf_counter())
+        return moved
+
+    def reset(self):
+        self.completed = []
+
+def run_organize(client, timer, endpoint: str, payload: dict, files: int) -> dict:
+    """Run one organize request and summarize per-file completion latency."""
+    timer.reset()
+    started = time.perf_counter()
+    response = client.post(endpoint, json=payload)
+    seconds = time.perf_counter() - started
+    body = response.get_json() or {}
+    latencies = [completed - started for completed in timer.completed]
+    return {
+        "endpoint": endpoint,
+        "order": payload.get("order"),
+        "files": files,
+        "status": response.status_code,
+        "processed": body.get("processed_count"),
+        "errors": body.get("error_count"),
+        "seconds": round(seconds, 3),
+        "files_per_second": round(files / seconds, 2) if seconds else None,
+        "first_result_seconds": _round(min(latencies, default=None)),
+        "p50_seconds": _round(percentile(latencies, 0.5)),
+        "p99_seconds": _round(percentile(latencies, 0.99)),
+        "peak_rss_mb": peak_rss_mb(),
+    }
+
+def run_list_files(client, directory: str, files: int, repeat: int) -> dict:
+    """Run /list_files repeatedly and summarize request latency."""
+    latencies = []
+    status = None
+    for _ in range(repeat):
+        started = time.perf_counter()
+        response = client.post('/list_files', json={"directory_path": directory})
+        latencies.append(time.perf_counter() - started)
+        status = response.status_code
+    median = percentile(latencies, 0.5)
+    return {
+        "endpoint": "/list_files",
+        "order": None,
+        "files": files,
+        "status": status,
+        "processed": files,
+        "errors": 0,
+        "seconds": round(sum(latencies), 3),
+        "files_per_second": round(files / median, 2) if median else None,
+        "first_result_seconds": _round(min(latencies, default=None)),
+        "p50_seconds": _round(median),
+        "p99_seconds": _round(percentile(latencies, 0.99)),
+        "peak_rss_mb": peak_rss_mb(),
+    }
+
+def _round(value):
+    return round(value, 4) if value is not None else None
+
+def print_table(rows: list[dict]):
+    columns = ("endpoint", "order", "files", "processed", "errors", "seconds", "files_per_second",
+               "first_result_seconds", "p50_seconds", "p99_seconds", "peak_rss_mb")
+    widths = [max(len(column), *(len(str(row[column])) for row in rows)) for column in columns]
+    print("  ".join(column.ljust(width) for column, width in zip(columns, widths)))
+    for row in rows:
+        print("  ".join(str(row[column]).ljust(width) for column, width in zip(columns, widths)))
+
+def main():
+    parser = argparse.ArgumentParser(description="End-to-end DocPilot throughput benchmark against a fake Ollama server.")
+    parser.add_argument('--sizes', type=int, nargs='+', default=[50, 200, 1000], help="Corpus sizes (files) to run")
+    parser.add_argument('--repeat', type=int, default=1, help="Runs per corpus size and endpoint")
+    parser.add_argument('--list-repeat', type=int, default=20, help="Requests per /list_files measurement")
+    parser.add_argument('--kinds', nargs='+', choices=KINDS, default=list(KINDS))
+    # Not validated by argparse: the backend modules must not be imported before configure_backend
+    parser.add_argument('--orders', nargs='+', default=['smallest'],
+                        help="File ordering policies to run the organize endpoints with (walk, smallest, mtime, tokens)")
+    parser.add_argument('--latency', default='fixed:0.05', help="Fake server latency distribution")
+    parser.add_argument('--tokens-per-second', type=float, default=200.0)
+    parser.add_argument('--failure-rate', type=float, default=0.0)
+    parser.add_argument('--load-seconds', type=float, default=0.0)
+    parser.add_argument('--parallel', type=int, default=0, help="Concurrent generations the fake server serves; 0 for unlimited")
+    parser.add_argument('--use-caches', action='store_true',
+                        help="Keep the analysis cache, near-duplicate index and correction store on "
+                             "(kept in the work directory, so they start empty unless --work-dir is reused)")
+    parser.add_argument('--work-dir', help="Directory for corpora and caches (default: a temporary directory)")
+    parser.add_argument('--json', help="Also write the results to this JSON file")
+    args = parser.parse_args()
+
+    work_dir = args.work_dir or tempfile.mkdtemp(prefix='docpilot-bench-')
+    os.makedirs(work_dir, exist_ok=True)
+    server = FakeOllamaServer(latency=args.latency, tokens_per_second=args.tokens_per_second,
+                              failure_rate=args.failure_rate, load_seconds=args.load_seconds, seed=0,
+                              parallel=args.parallel).start()
+    configure_backend(work_dir, server.url, args.use_caches)
+
+    # Imported only now, since the backend reads its configuration at import time
+    import app as backend
+    from file_ordering import ORDER_POLICIES
+    unknown = [order for order in args.orders if order not in ORDER_POLICIES]
+    if unknown:
+        parser.error(f"unknown order(s): {', '.join(unknown)}")
+    while backend.ollama_handler.model_status == "warming":
+        time.sleep(0.05)
+    client = backend.app.test_client()
+    timer = MoveTimer(backend.file_operations)
+
+    rows = []
+    for size in args.sizes:
+        for run in range(args.repeat):
+            # Fresh corpora with distinct seeds, so no run benefits from an earlier one; every
+            # ordering policy gets an identical copy so the policies can be compared
+            seed = size * 1000 + run * 10
+            run_dir = os.path.join(work_dir, f"{size}-{run}")
+            run_rows = []
+            for order in args.orders:
+                source = os.path.join(run_dir, order, "organize")
+                generate_corpus(source, size, seed, tuple(args.kinds))
+                run_rows.append(run_organize(client, timer, '/analyze_and_organize', {
+                    "source_directory": source,
+                    "destination_base_directory": os.path.join(run_dir, order, "organized"),
+                    "rename_files": True,
+                    "order": order,
+                }, size))
+
+                in_place = os.path.join(run_dir, order, "in_place")
+                generate_corpus(in_place, size, seed + 1, tuple(args.kinds))
+                run_rows.append(run_organize(client, timer, '/auto_organize_in_place', {
+                    "source_directory": in_place,
+                    "rename_files": True,
+                    "order": order,
+                }, size))
+
+            listing = os.path.join(run_dir, "listing")
+            generate_corpus(listing, size, seed + 2, tuple(args.kinds))
+            run_rows.append(run_list_files(client, listing, size, args.list_repeat))
+            print_table(run_rows)
+            rows.extend(run_rows)
+
+    print()
+    print(f"Results ({work_dir}):")
+    print_table(rows)
+    print(f"Fake Ollama server: {server.stats()}")
+    print(f"Ollama concurrency: {backend.ollama_handler.concurrency.stats()}")
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump({"arguments": vars(args), "results": rows, "ollama": server.stats()}, f, indent=2)
+    server.stop()
+
+if __name__ == "__main__":
+    main()
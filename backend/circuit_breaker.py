@@ -0,0 +1,119 @@
+# circuit_breaker.py
+import threading
+import time
+from config import BREAKER_FAILURE_THRESHOLD, BREAKER_RESET_SECONDS
+
+class OllamaUnavailableError(Exception):
+    """Raised instead of sending a request while Ollama is considered unhealthy."""
+
+
+class CircuitBreaker:
+    """
+    Circuit breaker for Ollama calls.
+
+    'closed': requests flow normally. After failure_threshold consecutive failures the breaker
+    'open's and requests are refused for reset_seconds. It then goes 'half_open' and lets a single
+    trial request through: success closes the breaker, failure opens it again.
+    """
+
+    def __init__(self, failure_threshold=BREAKER_FAILURE_THRESHOLD, reset_seconds=BREAKER_RESET_SECONDS):
+        """
+        Args:
+            failure_threshold (int): Consecutive failed calls before the breaker opens.
+            reset_seconds (float): How long the breaker stays open before allowing a trial request.
+        """
+        self.failure_threshold = max(1, failure_threshold)
+        self.reset_seconds = reset_seconds
+        self.state = "closed"
+        self.consecutive_failures = 0
+        self._opened_at = None
+        self._trial_in_flight = False
+        self._condition = threading.Condition()
+        self._stats = {"opened": 0, "rejected": 0, "failures": 0, "successes": 0}
+
+    def allow(self) -> bool:
+        """Whether a request may be sent now. A True answer in half-open state reserves the trial request."""
+        with self._condition:
+            if self.state == "open" and time.monotonic() - self._opened_at >= self.reset_seconds:
+                self.state = "half_open"
+            if self.state == "closed":
+                return True
+            if self.state == "half_open" and not self._trial_in_flight:
+                self._trial_in_flight = True
+                return True
+            self._stats["rejected"] += 1
+            return False
+
+    def record_success(self):
+        """Record a successful call; closes the breaker."""
+        with self._condition:
+            self._stats["successes"] += 1
+            self.consecutive_failures = 0
+            self._trial_in_flight = False
+            if self.state != "closed":
+                print("Ollama circuit breaker closed; requests resume.")
+            self.state = "closed"
+            self._condition.notify_all()
+
+    def record_failure(self):
+        """Record a failed call; opens the breaker at the threshold or when a trial request fails."""
+        with self._condition:
+            self._stats["failures"] += 1
+            self.consecutive_failures += 1
+            trial_failed = self._trial_in_flight
+            self._trial_in_flight = False
+            if trial_failed or (self.state == "closed" and self.consecutive_failures >= self.failure_threshold):
+                if self.state == "closed":
+                    print(f"Ollama circuit breaker opened after {self.consecutive_failures} consecutive failures.")
+                self.state = "open"
+                self._opened_at = time.monotonic()
+                self._stats["opened"] += 1
+            self._condition.notify_all()
+
+    def abandon(self):
+        """
+        Give back a reserved trial request whose caller gave up without an outcome, e.g. because it
+        was cancelled. Says nothing about Ollama's health, so the state is left as it is and the next
+        caller gets the trial.
+        """
+        with self._condition:
+            if self._trial_in_flight:
+                self._trial_in_flight = False
+                self._condition.notify_all()
+
+    def wait_until_available(self, timeout: float) -> bool:
+        """
+        Block until a request would be allowed, or until timeout seconds have passed.
+
+        Returns:
+            bool: True if requests may be sent again, False on timeout.
+        """
+        deadline = time.monotonic() + timeout
+        with self._condition:
+            while True:
+                now = time.monotonic()
+                if self.state == "closed":
+                    return True
+                if self.state == "open" and now - self._opened_at >= self.reset_seconds:
+                    return True
+                if self.state == "half_open" and not self._trial_in_flight:
+                    return True
+                if now >= deadline:
+                    return False
+                wake_at = deadline
+                if self.state == "open":
+                    wake_at = min(wake_at, self._opened_at + self.reset_seconds)
+                # Woken early when a call finishes and the state changes
+                self._condition.wait(max(wake_at - now, 0.01))
+
+    def stats(self) -> dict:
+        """Return the breaker state and counters."""
+        with self._condition:
+            stats = dict(self._stats)
+            stats["state"] = self.state
+            stats["consecutive_failures"] = self.consecutive_failures
+            stats["retry_in_seconds"] = (
+                round(max(self._opened_at + self.reset_seconds - time.monotonic(), 0.0), 1)
+                if self.state == "open" else None
+            )
+        return stats
@@ -0,0 +1,153 @@
+# concurrency_controller.py
+import statistics
+import threading
+import time
+from config import (
+    ADAPTIVE_CONCURRENCY_ENABLED, ADAPTIVE_CONCURRENCY_MIN, ADAPTIVE_CONCURRENCY_MAX, ADAPTIVE_CONCURRENCY_WINDOW,
+    ADAPTIVE_CONCURRENCY_BACKOFF, ADAPTIVE_LATENCY_TOLERANCE, ADAPTIVE_THROUGHPUT_GAIN, ADAPTIVE_HOLD_WINDOWS,
+)
+
+# Per unsaturated window, how far the latency baseline may drift up towards slower observations
+BASELINE_DRIFT = 0.02
+
+class AIMDController:
+    """
+    Adjusts the scheduler's in-flight limit with additive increase / multiplicative decrease.
+
+    Completed calls are grouped into windows. At the end of a window in which the scheduler was
+    saturated (calls were waiting for slots), the limit grows by one, unless the previous increase
+    did not improve throughput, in which case it is undone and probing pauses for a few windows.
+    A window whose latency exceeds ADAPTIVE_LATENCY_TOLERANCE times the baseline cuts the limit by
+    ADAPTIVE_CONCURRENCY_BACKOFF, and so does a failed call, at most once per window.
+    Latency baselines are kept per call kind, since batch prompts take longer than single ones.
+    """
+
+    def __init__(self, scheduler, enabled=ADAPTIVE_CONCURRENCY_ENABLED, min_limit=ADAPTIVE_CONCURRENCY_MIN,
+                 max_limit=ADAPTIVE_CONCURRENCY_MAX, window=ADAPTIVE_CONCURRENCY_WINDOW,
+                 backoff=ADAPTIVE_CONCURRENCY_BACKOFF, latency_tolerance=ADAPTIVE_LATENCY_TOLERANCE):
+        """
+        Args:
+            scheduler (PriorityScheduler): The scheduler whose limit is controlled.
+            enabled (bool): When False, calls are only counted and the limit never changes.
+            min_limit (int): Lowest limit the controller sets.
+            max_limit (int): Highest limit the controller sets.
+            window (int): Minimum number of completed calls per adjustment.
+            backoff (float): Factor the limit is multiplied by on errors and latency spikes.
+            latency_tolerance (float): Multiple of the baseline latency that counts as a spike.
+        """
+        self.scheduler = scheduler
+        self.enabled = enabled
+        self.min_limit = max(1, min_limit)
+        self.max_limit = max(self.min_limit, max_limit)
+        self.window = max(1, window)
+        self.backoff = backoff
+        self.latency_tolerance = latency_tolerance
+        self._lock = threading.Lock()
+        self._baselines = {}
+        self._last_throughput = None
+        self._last_change = None
+        self._hold = 0
+        self._stats = {"increases": 0, "decreases": 0, "reverts": 0, "last_reason": None,
+                       "last_throughput": None, "last_latency_ratio": None}
+        if enabled:
+            scheduler.limit = min(max(scheduler.limit, self.min_limit), self.max_limit)
+        self._reset_window()
+
+    @property
+    def limit(self) -> int:
+        return self.scheduler.limit
+
+    def _reset_window(self):
+        self._window_started = time.monotonic()
+        self._latencies = {}
+        self._calls = 0
+        self._saturated = 0
+        self._decreased = False
+
+    def record(self, kind: str, seconds: float, ok: bool):
+        """
+        Record a completed call attempt. Call while the scheduler slot is still held.
+
+        Args:
+            kind (str): Call kind ('analyze', 'batch', 'rename', 'embed', ...).
+            seconds (float): Wall time of the attempt.
+            ok (bool): False for transient failures (timeouts, connection errors, 5xx/429 answers).
+        """
+        if not self.enabled:
+            return
+        saturated = self.scheduler.saturated()
+        with self._lock:
+            if not ok:
+                if not self._decreased:
+                    self._decrease("errors")
+                    self._decreased = True
+                return
+            self._calls += 1
+            self._saturated += int(saturated)
+            self._latencies.setdefault(kind, []).append(seconds)
+            if self._calls >= max(self.window, 2 * self.scheduler.limit):
+                self._adjust()
+
+    def _adjust(self):
+        """Close the current window and change the limit; callers hold self._lock."""
+        elapsed = max(time.monotonic() - self._window_started, 1e-6)
+        throughput = self._calls / elapsed
+        saturated = self._saturated * 2 >= self._calls
+        # Median latency per kind relative to its baseline, weighted by the number of calls.
+        # Queueing inflates latency in saturated windows, so only unsaturated ones may raise the baseline.
+        ratio = 0.0
+        for kind, latencies in self._latencies.items():
+            median = statistics.median(latencies)
+            baseline = self._baselines.get(kind, median)
+            ratio += len(latencies) * (median / baseline if baseline > 0 else 1.0)
+            ceiling = baseline if saturated else baseline * (1 + BASELINE_DRIFT)
+            self._baselines[kind] = min(median, ceiling)
+        ratio /= self._calls
+        self._stats["last_throughput"] = round(throughput, 3)
+        self._stats["last_latency_ratio"] = round(ratio, 3)
+
+        if ratio > self.latency_tolerance:
+            self._decrease("latency")
+        elif not saturated:
+            # Demand is below the limit, so this window says nothing about the best limit
+            self._last_change = None
+        elif self._last_change == "increase" and throughput < self._last_throughput * (1 + ADAPTIVE_THROUGHPUT_GAIN):
+            self._set_limit(self.scheduler.limit - 1, "no throughput gain")
+            self._stats["reverts"] += 1
+            self._last_change = "revert"
+            self._hold = ADAPTIVE_HOLD_WINDOWS
+        elif self._hold > 0:
+            self._hold -= 1
+            self._last_change = None
+        elif self.scheduler.limit < self.max_limit:
+            self._set_limit(self.scheduler.limit + 1, "throughput probe")
+            self._stats["increases"] += 1
+            self._last_change = "increase"
+        self._last_throughput = throughput
+        self._reset_window()
+
+    def _decrease(self, reason: str):
+        """Multiplicative decrease; callers hold self._lock."""
+        self._set_limit(int(self.scheduler.limit * self.backoff), reason)
+        self._stats["decreases"] += 1
+        self._last_change = "decrease"
+        self._hold = 0
+
+    def _set_limit(self, limit: int, reason: str):
+        limit = min(max(limit, self.min_limit), self.max_limit)
+        if limit != self.scheduler.limit:
+            print(f"Ollama concurrency limit {self.scheduler.limit} -> {limit} ({reason}).")
+            self.scheduler.limit = limit
+        self._stats["last_reason"] = reason
+
+    def stats(self) -> dict:
+        """Return the current limit, its bounds, adjustment counts and per-kind latency baselines."""
+        with self._lock:
+            return {
+                "enabled": self.enabled,
+                "limit": self.scheduler.limit,
+                "min_limit": self.min_limit,
+                "max_limit": self.max_limit,
+                **self._stats,
+                "latency_baselines_seconds": {kind: round(seconds, 4) for kind, seconds in self._baselines.items()},
+            }
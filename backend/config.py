@@ -3,7 +3,147 @@ import os
 
 # Ollama Configuration
 OLLAMA_HOST = os.getenv('OLLAMA_HOST', 'http://localhost:11434')
+# Comma-separated pool of Ollama hosts; requests go to the least-loaded healthy host
+OLLAMA_HOSTS = [host.strip() for host in os.getenv('OLLAMA_HOSTS', OLLAMA_HOST).split(',') if host.strip()]
+HOST_HEALTH_CHECK_INTERVAL = float(os.getenv('HOST_HEALTH_CHECK_INTERVAL', 10)) # Seconds between health checks
+HOST_FAILURE_THRESHOLD = int(os.getenv('HOST_FAILURE_THRESHOLD', 3)) # Consecutive failures before a host leaves rotation
+HOST_LATENCY_SMOOTHING = 0.3 # Weight of the newest sample in each host's latency moving average
 OLLAMA_MODEL = os.getenv('OLLAMA_MODEL', 'phi3:mini') # You can change this to a model you have pulled, e.g., 'llama2', 'mistral'
+# Ordered model cascade, fastest first; low-confidence or 'Miscellaneous' answers escalate to the next model
+OLLAMA_MODEL_CASCADE = [model.strip() for model in os.getenv('OLLAMA_MODEL_CASCADE', OLLAMA_MODEL).split(',') if model.strip()]
+CASCADE_CONFIDENCE_THRESHOLD = float(os.getenv('CASCADE_CONFIDENCE_THRESHOLD', 0.7))
+OLLAMA_NUM_PARALLEL = int(os.getenv('OLLAMA_NUM_PARALLEL', 4)) # Concurrent generations the Ollama server accepts per model
+# A fixed context size avoids model reloads between requests; it must fit the system prompt plus the largest content budget
+OLLAMA_NUM_CTX = int(os.getenv('OLLAMA_NUM_CTX', 4096))
+OLLAMA_KEEP_ALIVE = os.getenv('OLLAMA_KEEP_ALIVE', '30m') # How long Ollama keeps the model (and its prompt cache) loaded
+OLLAMA_WARM_UP = os.getenv('OLLAMA_WARM_UP', 'true').lower() == 'true' # Load the model at startup and before organize jobs
+OLLAMA_IDLE_UNLOAD_SECONDS = float(os.getenv('OLLAMA_IDLE_UNLOAD_SECONDS', 900)) # Unload models after this long idle; 0 disables
+MODEL_LOAD_EVENT_SECONDS = 0.5 # load_duration above this is reported as a model load
+# After a failed model check (e.g. Ollama was not up yet), /health probes and answered calls re-run it at most this often
+MODEL_RECHECK_SECONDS = float(os.getenv('MODEL_RECHECK_SECONDS', 30))
+
+# Ollama Request Resilience
+OLLAMA_REQUEST_TIMEOUT = float(os.getenv('OLLAMA_REQUEST_TIMEOUT', 120)) # Seconds without a response byte before a call fails
+OLLAMA_CONNECT_TIMEOUT = float(os.getenv('OLLAMA_CONNECT_TIMEOUT', 5))
+OLLAMA_MAX_RETRIES = int(os.getenv('OLLAMA_MAX_RETRIES', 2)) # Retries after a timeout, connection error or 5xx/429 answer
+OLLAMA_RETRY_BASE_DELAY = float(os.getenv('OLLAMA_RETRY_BASE_DELAY', 0.5)) # Backoff doubles per retry, with full jitter
+OLLAMA_RETRY_MAX_DELAY = float(os.getenv('OLLAMA_RETRY_MAX_DELAY', 8))
+BREAKER_FAILURE_THRESHOLD = int(os.getenv('BREAKER_FAILURE_THRESHOLD', 5)) # Consecutive failed calls before requests stop
+BREAKER_RESET_SECONDS = float(os.getenv('BREAKER_RESET_SECONDS', 30)) # Pause before a trial request is let through
+# How long an organize run waits for Ollama to recover before reporting the remaining files as errors
+PIPELINE_BREAKER_WAIT_SECONDS = float(os.getenv('PIPELINE_BREAKER_WAIT_SECONDS', 300))
+
+# Ollama Scheduling
+# All Ollama calls share one queue; interactive requests (e.g. /analyze_file_for_suggestions) go ahead of bulk organize jobs
+OLLAMA_MAX_IN_FLIGHT = int(os.getenv('OLLAMA_MAX_IN_FLIGHT', OLLAMA_NUM_PARALLEL * len(OLLAMA_HOSTS))) # Concurrent calls across all hosts
+SCHEDULER_AGING_SECONDS = float(os.getenv('SCHEDULER_AGING_SECONDS', 5)) # Waiting this long lifts a bulk call to interactive priority; 0 disables aging
+# AIMD controller for the in-flight limit: +1 while throughput improves, multiplicative cut on errors or latency spikes.
+# OLLAMA_MAX_IN_FLIGHT is then only the starting point.
+ADAPTIVE_CONCURRENCY_ENABLED = os.getenv('ADAPTIVE_CONCURRENCY_ENABLED', 'true').lower() == 'true'
+ADAPTIVE_CONCURRENCY_MIN = int(os.getenv('ADAPTIVE_CONCURRENCY_MIN', 1))
+ADAPTIVE_CONCURRENCY_MAX = int(os.getenv('ADAPTIVE_CONCURRENCY_MAX', 4 * OLLAMA_MAX_IN_FLIGHT))
+ADAPTIVE_CONCURRENCY_WINDOW = int(os.getenv('ADAPTIVE_CONCURRENCY_WINDOW', 16)) # Completed calls per adjustment (at least twice the limit)
+ADAPTIVE_CONCURRENCY_BACKOFF = float(os.getenv('ADAPTIVE_CONCURRENCY_BACKOFF', 0.7)) # Limit multiplier on errors or latency spikes
+ADAPTIVE_LATENCY_TOLERANCE = float(os.getenv('ADAPTIVE_LATENCY_TOLERANCE', 2.0)) # Latency above this multiple of the baseline is a spike
+ADAPTIVE_THROUGHPUT_GAIN = 0.05 # An increase is kept only if throughput grows by at least this fraction
+ADAPTIVE_HOLD_WINDOWS = 4 # Windows to wait after an unprofitable increase before probing again
+
+# Output caps (num_predict) per request type; the JSON answers only need a few dozen tokens
+ANALYSIS_NUM_PREDICT = int(os.getenv('ANALYSIS_NUM_PREDICT', 96))
+BATCH_NUM_PREDICT_PER_FILE = int(os.getenv('BATCH_NUM_PREDICT_PER_FILE', 64))
+RENAME_NUM_PREDICT = int(os.getenv('RENAME_NUM_PREDICT', 32))
+# Stream JSON responses and cancel the generation as soon as a complete object has arrived
+OLLAMA_STREAM_RESPONSES = os.getenv('OLLAMA_STREAM_RESPONSES', 'true').lower() == 'true'
+
+# Prompt Content Budget
+# File content is sampled (head/middle/tail) down to this many tokens before prompting
+CONTENT_TOKEN_BUDGET = int(os.getenv('CONTENT_TOKEN_BUDGET', 1500))
+CHARS_PER_TOKEN = 4 # Rough estimate used to turn token budgets into character budgets
+# Per-extension token budgets overriding CONTENT_TOKEN_BUDGET
+CONTENT_TOKEN_BUDGET_OVERRIDES = {
+    'log': 750, 'csv': 750, 'json': 750, 'xml': 750, # Repetitive structure; a small sample is enough
+    'pdf': 2000, 'docx': 2000,
+}
+# Rough characters of extracted text per file byte, for estimating prompt cost before a file is read
+EXTRACTED_TEXT_RATIOS = {'pdf': 0.2, 'docx': 0.4}
+
+# PDF Extraction Configuration
+# Pages are extracted lazily and extraction stops early, since prompts only use a budgeted sample anyway.
+# Modes: 'sampled' (PDF_SAMPLE_PAGES pages spread over the document, first pages weighted), 'first_pages'
+# (the first PDF_SAMPLE_PAGES pages), 'budget' (pages in order until the budget is reached) or 'full' (every page)
+PDF_EXTRACTION_MODE = os.getenv('PDF_EXTRACTION_MODE', 'sampled')
+PDF_SAMPLE_PAGES = int(os.getenv('PDF_SAMPLE_PAGES', 8))
+# Characters extracted per PDF; twice the PDF content budget leaves the head/middle/tail sampler something to choose from
+PDF_CHAR_BUDGET = int(os.getenv('PDF_CHAR_BUDGET', 2 * CONTENT_TOKEN_BUDGET_OVERRIDES['pdf'] * CHARS_PER_TOKEN))
+
+# Analysis Cache Configuration
+# On-disk cache of analysis results keyed by content hash, model and prompt version
+ANALYSIS_CACHE_PATH = os.getenv('ANALYSIS_CACHE_PATH', 'analysis_cache.sqlite3')
+ANALYSIS_CACHE_MAX_ENTRIES = int(os.getenv('ANALYSIS_CACHE_MAX_ENTRIES', 50000)) # Set to 0 to disable caching
+
+# Organize Pipeline Configuration
+# Worker threads per stage and the capacity of the queues between stages
+PIPELINE_QUEUE_SIZE = int(os.getenv('PIPELINE_QUEUE_SIZE', 32))
+PIPELINE_EXTRACT_WORKERS = int(os.getenv('PIPELINE_EXTRACT_WORKERS', 4))
+# Threads with an Ollama request pending; the scheduler decides how many are in flight, so keep enough to reach its maximum
+PIPELINE_CLASSIFY_WORKERS = int(os.getenv('PIPELINE_CLASSIFY_WORKERS', ADAPTIVE_CONCURRENCY_MAX if ADAPTIVE_CONCURRENCY_ENABLED else OLLAMA_MAX_IN_FLIGHT))
+PIPELINE_PLAN_WORKERS = int(os.getenv('PIPELINE_PLAN_WORKERS', 1))
+PIPELINE_MOVE_WORKERS = int(os.getenv('PIPELINE_MOVE_WORKERS', 2))
+# Order files are fed into the pipeline: 'walk', 'smallest', 'mtime' or 'tokens' (see file_ordering.py); requests may override it
+PIPELINE_ORDER_POLICY = os.getenv('PIPELINE_ORDER_POLICY', 'smallest')
+
+# Batch Classification Configuration
+# Small files waiting in the classify queue are packed into a single multi-document prompt
+BATCH_CLASSIFICATION_ENABLED = os.getenv('BATCH_CLASSIFICATION_ENABLED', 'true').lower() == 'true'
+BATCH_SMALL_FILE_CHARS = int(os.getenv('BATCH_SMALL_FILE_CHARS', 1500)) # Files up to this size are eligible for batching
+BATCH_MAX_CHARS = int(os.getenv('BATCH_MAX_CHARS', 6000)) # Total content per batch prompt
+BATCH_MAX_FILES = int(os.getenv('BATCH_MAX_FILES', 8))
+
+# Embedding Classifier Configuration
+# Confident embedding matches skip the chat model; requires the embedding model to be pulled
+EMBEDDING_CLASSIFIER_ENABLED = os.getenv('EMBEDDING_CLASSIFIER_ENABLED', 'false').lower() == 'true'
+EMBEDDING_MODEL = os.getenv('EMBEDDING_MODEL', 'nomic-embed-text')
+EMBEDDING_CONFIDENCE_MARGIN = float(os.getenv('EMBEDDING_CONFIDENCE_MARGIN', 0.05)) # Best minus second-best cosine similarity
+EMBEDDING_MIN_SIMILARITY = float(os.getenv('EMBEDDING_MIN_SIMILARITY', 0.5))
+
+# Near-Duplicate Detection Configuration
+# SimHash signatures of extracted text let near-identical files reuse an earlier classification
+NEAR_DUPLICATE_ENABLED = os.getenv('NEAR_DUPLICATE_ENABLED', 'true').lower() == 'true'
+NEAR_DUPLICATE_INDEX_PATH = os.getenv('NEAR_DUPLICATE_INDEX_PATH', 'near_duplicates.sqlite3')
+NEAR_DUPLICATE_MAX_ENTRIES = int(os.getenv('NEAR_DUPLICATE_MAX_ENTRIES', 50000))
+# Differing bits (out of 64) still counted as a near duplicate; at most 3 so the banded lookup finds every match
+NEAR_DUPLICATE_MAX_DISTANCE = min(int(os.getenv('NEAR_DUPLICATE_MAX_DISTANCE', 3)), 3)
+NEAR_DUPLICATE_MIN_CHARS = int(os.getenv('NEAR_DUPLICATE_MIN_CHARS', 200)) # Shorter texts give unreliable signatures
+# What a near duplicate inherits, per category of the file it matched:
+# 'name' reuses the category and a name templated from the earlier suggestion, 'category' reuses only the
+# category (the model still suggests a name when renaming), and categories not listed are never reused
+NEAR_DUPLICATE_REUSE = {
+    'Financial': 'name', # Invoice and statement variants
+    'Logs': 'name', # Daily logs
+    'Data': 'name',
+    'Business': 'category',
+    'Education': 'category',
+    'Legal': 'category', # Draft revisions
+    'Presentations': 'category',
+    'Creative': 'category',
+}
+
+# Exact-Duplicate Detection Configuration
+# Byte-identical files are found before classification and reuse the first copy's analysis
+DUPLICATE_DETECTION_ENABLED = os.getenv('DUPLICATE_DETECTION_ENABLED', 'true').lower() == 'true'
+DUPLICATE_PREFIX_BYTES = int(os.getenv('DUPLICATE_PREFIX_BYTES', 64 * 1024)) # Hashed first to rule out same-size files cheaply
+DUPLICATE_HASH_WORKERS = int(os.getenv('DUPLICATE_HASH_WORKERS', 4))
+DUPLICATE_HASH_CHUNK_BYTES = 1024 * 1024 # Read size when streaming whole files through BLAKE2
+
+# Correction Learning Configuration
+# Files the user moves into a category folder with /manual_file_action are remembered as labelled examples;
+# later files that closely resemble them take the user's category without a model call
+CORRECTION_LEARNING_ENABLED = os.getenv('CORRECTION_LEARNING_ENABLED', 'true').lower() == 'true'
+CORRECTIONS_PATH = os.getenv('CORRECTIONS_PATH', 'corrections.sqlite3')
+CORRECTIONS_MAX_ENTRIES = int(os.getenv('CORRECTIONS_MAX_ENTRIES', 2000)) # Oldest corrections are dropped beyond this
+CORRECTION_NEIGHBORS = int(os.getenv('CORRECTION_NEIGHBORS', 5)) # k of the nearest-neighbour vote
+CORRECTION_MIN_SIMILARITY = float(os.getenv('CORRECTION_MIN_SIMILARITY', 0.75)) # Cosine similarity for a correction to count as a neighbour
+CORRECTION_MIN_AGREEMENT = float(os.getenv('CORRECTION_MIN_AGREEMENT', 0.8)) # Share of the similarity-weighted vote the winning category needs
 
 # Flask Configuration
 FLASK_PORT = os.getenv('FLASK_PORT', 5000)
@@ -16,6 +156,33 @@ TEXT_FILE_TYPES = [
     'docx', 'pdf', # These will require text extraction logic
 ]
 
+# Source code and log extensions, used by the deterministic classification rules below
+CODE_FILE_TYPES = [
+    'py', 'js', 'java', 'c', 'cpp', 'h', 'hpp', 'php', 'rb', 'go', 'rs', 'sh', 'bat', 'ps1',
+]
+LOG_FILE_TYPES = ['log']
+
+# Deterministic classification rules applied before any model call.
+# A file matches a rule by extension or, if it has no extension, by MIME type prefix (from FileOperations.get_file_type).
+# 'rename_with_llm' controls whether the model is still asked for a name when renaming is requested;
+# when False, matched files keep their original names and are never read or sent to the model during bulk organizing
+# (/analyze_file_for_suggestions still asks for a name).
+CLASSIFICATION_RULES = [
+    {
+        'category': 'Code',
+        'extensions': CODE_FILE_TYPES,
+        'mime_types': ['text/x-python', 'text/x-script.python', 'text/x-shellscript', 'text/x-c',
+                       'text/x-c++', 'text/x-java', 'text/x-php', 'text/x-ruby', 'application/javascript'],
+        'rename_with_llm': False, # Renaming source files would break imports and references
+    },
+    {
+        'category': 'Logs',
+        'extensions': LOG_FILE_TYPES,
+        'mime_types': [],
+        'rename_with_llm': False,
+    },
+]
+
 # File types to ignore (e.g., executables, system files)
 IGNORE_FILE_TYPES = [
     'exe', 'dll', 'sys', 'ini', 'lnk', 'tmp', 'DS_Store',
@@ -0,0 +1,283 @@
+# correction_classifier.py
+import hashlib
+import math
+import os
+import re
+import sqlite3
+import threading
+import time
+from config import (
+    CORRECTION_LEARNING_ENABLED, CORRECTIONS_PATH, CORRECTIONS_MAX_ENTRIES,
+    CORRECTION_NEIGHBORS, CORRECTION_MIN_SIMILARITY, CORRECTION_MIN_AGREEMENT,
+)
+from ollama_handler import CATEGORY_RULES
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+    print("numpy not installed. Learning from manual corrections is disabled.")
+
+FEATURE_DIMENSIONS = 2048
+EXTENSION_WEIGHT = 0.3 # Weight of the file extension relative to the (unit-length) word features
+# Words too common to tell documents apart
+STOP_WORDS = frozenset(
+    "the and for are but not you all any can had her was one our out has have this that with from they "
+    "will would there their what about which when into than then them these some been were more also".split()
+)
+
+def content_hash(content: str) -> str:
+    """Return the BLAKE2b hex digest of extracted file content."""
+    return hashlib.blake2b(content.encode('utf-8', 'ignore'), digest_size=16).hexdigest()
+
+def _bucket(feature: str):
+    """Hash a feature to a (dimension, sign) pair; the sign keeps collisions from only adding up."""
+    value = int.from_bytes(hashlib.blake2b(feature.encode('utf-8'), digest_size=8).digest(), 'big')
+    return value % FEATURE_DIMENSIONS, 1.0 if value >> 63 else -1.0
+
+def text_features(text: str, extension: str = None):
+    """
+    Hash the words and word bigrams of text (log-scaled counts, digits dropped) plus the file
+    extension into a unit-length vector of FEATURE_DIMENSIONS floats.
+    """
+    words = [word for word in re.findall(r'[a-z]{3,}', text.lower()) if word not in STOP_WORDS]
+    counts = {}
+    for feature in words + [f"{first} {second}" for first, second in zip(words, words[1:])]:
+        counts[feature] = counts.get(feature, 0) + 1
+    vector = np.zeros(FEATURE_DIMENSIONS, dtype=np.float32)
+    for feature, count in counts.items():
+        index, sign = _bucket(feature)
+        vector[index] += sign * (1.0 + math.log(count))
+    norm = np.linalg.norm(vector)
+    if norm > 0:
+        vector /= norm
+    if extension:
+        index, sign = _bucket(f"extension:{extension.lower()}")
+        vector[index] += sign * EXTENSION_WEIGHT
+    norm = np.linalg.norm(vector)
+    return vector / norm if norm > 0 else vector
+
+
+class _Model:
+    """Immutable snapshot of the trained neighbours; replaced as a whole when retraining."""
+
+    def __init__(self, matrix, labels: list[str], rows: dict, last_id: int):
+        self.matrix = matrix
+        self.labels = labels
+        self.rows = rows # content hash -> row index, for exact matches and replaced corrections
+        self.last_id = last_id
+
+
+class CorrectionClassifier:
+    """
+    Learns from files the user moves into category folders by hand. Each correction is stored in
+    SQLite with the file's content hash, extension and hashed word features, and later files are
+    classified by a similarity-weighted vote of their nearest stored corrections. Only files with
+    an identical content hash or a clear, close majority are answered; everything else is left to
+    the other classifiers.
+
+    New corrections are folded into the in-memory model by a background thread, so recording a
+    correction never waits for training and classification never waits for the database.
+    """
+
+    def __init__(self, ollama_handler, path=CORRECTIONS_PATH, max_entries=CORRECTIONS_MAX_ENTRIES,
+                 neighbors=CORRECTION_NEIGHBORS, min_similarity=CORRECTION_MIN_SIMILARITY,
+                 min_agreement=CORRECTION_MIN_AGREEMENT, enabled=CORRECTION_LEARNING_ENABLED):
+        """
+        Open (or create) the correction store and start the background trainer.
+
+        Args:
+            ollama_handler (OllamaHandler): Used to budget content the same way prompts are.
+            path (str): Path to the SQLite database file.
+            max_entries (int): Maximum number of stored corrections; the oldest are dropped.
+            neighbors (int): Number of nearest corrections that vote.
+            min_similarity (float): Minimum cosine similarity for a correction to vote.
+            min_agreement (float): Share of the weighted vote the winning category needs.
+            enabled (bool): Whether corrections are recorded and used at all.
+        """
+        self.ollama_handler = ollama_handler
+        self.max_entries = max_entries
+        self.neighbors = max(1, neighbors)
+        self.min_similarity = min_similarity
+        self.min_agreement = min_agreement
+        # Folder names are matched to categories case-insensitively
+        self.categories = {category.lower(): category for category in CATEGORY_RULES}
+        self._lock = threading.Lock()
+        self._conn = None
+        self._model = None
+        self._reload = True
+        self._changed = threading.Event()
+        self._stats = {"recorded": 0, "hits": 0, "exact_hits": 0, "ambiguous": 0, "misses": 0,
+                       "trainings": 0, "last_training_seconds": None}
+
+        if not enabled or np is None or max_entries <= 0:
+            return
+        try:
+            # The connection is shared between request and trainer threads and guarded by self._lock
+            self._conn = sqlite3.connect(path, check_same_thread=False)
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS corrections ("
+                " id INTEGER PRIMARY KEY AUTOINCREMENT,"
+                " content_hash TEXT NOT NULL UNIQUE,"
+                " extension TEXT,"
+                " features BLOB NOT NULL,"
+                " category TEXT NOT NULL,"
+                " created_at REAL NOT NULL)"
+            )
+            self._conn.commit()
+        except Exception as e:
+            # A broken store must never prevent classification; run without it instead
+            print(f"Could not open correction store at {path}: {e}")
+            self._conn = None
+            return
+        threading.Thread(target=self._train_loop, daemon=True).start()
+        self._changed.set()
+
+    def category_for_folder(self, folder: str):
+        """Return the category a folder stands for, going by its name, or None if it is not a category folder."""
+        if self._conn is None:
+            return None
+        return self.categories.get(os.path.basename(os.path.normpath(folder)).lower())
+
+    def record(self, content: str, extension: str, category: str) -> bool:
+        """
+        Store a manual correction; the model picks it up in the background. A later correction of
+        the same content replaces the earlier one.
+
+        Args:
+            content (str): Extracted text of the corrected file.
+            extension (str): File extension (without dot).
+            category (str): The category the user chose.
+
+        Returns:
+            bool: Whether the correction was stored.
+        """
+        if self._conn is None or not content.strip():
+            return False
+        features = text_features(self.ollama_handler.budget_content(content, extension), extension)
+        with self._lock:
+            try:
+                self._conn.execute(
+                    "INSERT OR REPLACE INTO corrections (content_hash, extension, features, category, created_at)"
+                    " VALUES (?, ?, ?, ?, ?)",
+                    (content_hash(content), extension, features.tobytes(), category, time.time()),
+                )
+                size = self._conn.execute("SELECT COUNT(*) FROM corrections").fetchone()[0]
+                if size > self.max_entries:
+                    self._conn.execute(
+                        "DELETE FROM corrections WHERE id IN (SELECT id FROM corrections ORDER BY id ASC LIMIT ?)",
+                        (size - self.max_entries,),
+                    )
+                    # Deleted rows cannot be picked up incrementally
+                    self._reload = True
+                self._conn.commit()
+            except Exception as e:
+                print(f"Error writing correction store: {e}")
+                return False
+            self._stats["recorded"] += 1
+        self._changed.set()
+        return True
+
+    def classify(self, content: str, extension: str = None):
+        """
+        Classify content from the stored corrections.
+
+        Args:
+            content (str): Extracted text of the file.
+            extension (str, optional): File extension (without dot).
+
+        Returns:
+            str or None: The learned category, or None without an exact or confident match.
+        """
+        model = self._model
+        if model is None or not model.labels or not content.strip():
+            return None
+        exact = model.rows.get(content_hash(content))
+        if exact is not None:
+            self._count("exact_hits")
+            return model.labels[exact]
+
+        vector = text_features(self.ollama_handler.budget_content(content, extension), extension)
+        similarities = model.matrix @ vector
+        count = min(self.neighbors, len(model.labels))
+        nearest = np.argpartition(-similarities, count - 1)[:count]
+        votes = {}
+        for index in nearest:
+            if similarities[index] >= self.min_similarity:
+                label = model.labels[index]
+                votes[label] = votes.get(label, 0.0) + float(similarities[index])
+        if not votes:
+            self._count("misses")
+            return None
+        best = max(votes, key=votes.get)
+        if votes[best] < self.min_agreement * sum(votes.values()):
+            self._count("ambiguous")
+            return None
+        self._count("hits")
+        return best
+
+    def _count(self, key: str):
+        with self._lock:
+            self._stats[key] += 1
+
+    def _train_loop(self):
+        while True:
+            self._changed.wait()
+            self._changed.clear()
+            try:
+                self._train()
+            except Exception as e:
+                print(f"Error training correction classifier: {e}")
+
+    def _train(self):
+        """Fold corrections added since the last training into a new model snapshot."""
+        started = time.perf_counter()
+        with self._lock:
+            reload = self._reload or self._model is None
+            self._reload = False
+            last_id = 0 if reload else self._model.last_id
+            rows = self._conn.execute(
+                "SELECT id, content_hash, features, category FROM corrections WHERE id > ? ORDER BY id", (last_id,)
+            ).fetchall()
+        if not rows and not reload:
+            return
+
+        if reload:
+            matrix, labels, indices = np.zeros((0, FEATURE_DIMENSIONS), dtype=np.float32), [], {}
+        else:
+            matrix, labels, indices = self._model.matrix, list(self._model.labels), dict(self._model.rows)
+        added = []
+        replaced = {}
+        for row_id, row_hash, features, category in rows:
+            vector = np.frombuffer(features, dtype=np.float32)
+            last_id = max(last_id, row_id)
+            if row_hash in indices:
+                # A newer correction of the same content replaces the old one
+                replaced[indices[row_hash]] = vector
+                labels[indices[row_hash]] = category
+            else:
+                indices[row_hash] = len(labels)
+                labels.append(category)
+                added.append(vector)
+        if replaced:
+            matrix = matrix.copy()
+            for index, vector in replaced.items():
+                matrix[index] = vector
+        if added:
+            matrix = np.vstack([matrix, np.stack(added)])
+        self._model = _Model(matrix, labels, indices, last_id)
+
+        with self._lock:
+            self._stats["trainings"] += 1
+            self._stats["last_training_seconds"] = round(time.perf_counter() - started, 4)
+
+    def stats(self) -> dict:
+        """Return recorded corrections, the trained model size and hit counters."""
+        with self._lock:
+            stats = dict(self._stats)
+        model = self._model
+        lookups = stats["hits"] + stats["exact_hits"] + stats["ambiguous"] + stats["misses"]
+        stats["enabled"] = self._conn is not None
+        stats["entries"] = len(model.labels) if model is not None else 0
+        stats["hit_rate"] = round((stats["hits"] + stats["exact_hits"]) / lookups, 4) if lookups else 0.0
+        return stats
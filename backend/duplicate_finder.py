@@ -0,0 +1,77 @@
+# duplicate_finder.py
+import hashlib
+import os
+from concurrent.futures import ThreadPoolExecutor
+from config import DUPLICATE_PREFIX_BYTES, DUPLICATE_HASH_WORKERS, DUPLICATE_HASH_CHUNK_BYTES
+
+def find_duplicate_groups(file_paths: list[str], prefix_bytes=DUPLICATE_PREFIX_BYTES,
+                          workers=DUPLICATE_HASH_WORKERS) -> list[list[str]]:
+    """
+    Find files with identical bytes. Files are bucketed by size first, so unique sizes are never
+    read. Within a bucket, files are told apart by a hash of their first prefix_bytes bytes, and
+    only files whose prefixes also match get a full streaming BLAKE2 hash. Hashing runs on a
+    thread pool. Empty and unreadable files are never reported as duplicates.
+
+    Args:
+        file_paths (list[str]): Files to compare.
+        prefix_bytes (int): Bytes hashed in the prefix pass.
+        workers (int): Threads hashing files.
+
+    Returns:
+        list[list[str]]: Groups of two or more identical files, each in file_paths order.
+    """
+    sizes = {}
+    by_size = {}
+    for file_path in file_paths:
+        try:
+            sizes[file_path] = os.path.getsize(file_path)
+        except OSError:
+            continue
+        if sizes[file_path] > 0:
+            by_size.setdefault(sizes[file_path], []).append(file_path)
+    candidates = [group for group in by_size.values() if len(group) > 1]
+    if not candidates:
+        return []
+
+    with ThreadPoolExecutor(max_workers=max(1, workers)) as executor:
+        candidates = _split_by_hash(candidates, executor, lambda file_path: _hash_file(file_path, prefix_bytes))
+        # Files no larger than the prefix were hashed whole already
+        duplicates = [group for group in candidates if sizes[group[0]] <= prefix_bytes]
+        remaining = [group for group in candidates if sizes[group[0]] > prefix_bytes]
+        if remaining:
+            duplicates.extend(_split_by_hash(remaining, executor, _hash_file))
+
+    # Report groups in listing order so the first copy is the one that gets classified
+    order = {file_path: index for index, file_path in enumerate(file_paths)}
+    return sorted((sorted(group, key=order.get) for group in duplicates), key=lambda group: order[group[0]])
+
+def _split_by_hash(groups: list[list[str]], executor, hash_file) -> list[list[str]]:
+    """Split each group by the hash of its files, keeping only subgroups of two or more."""
+    paths = [file_path for group in groups for file_path in group]
+    hashes = dict(zip(paths, executor.map(hash_file, paths)))
+    split = []
+    for group in groups:
+        by_hash = {}
+        for file_path in group:
+            if hashes[file_path] is not None:
+                by_hash.setdefault(hashes[file_path], []).append(file_path)
+        split.extend(same for same in by_hash.values() if len(same) > 1)
+    return split
+
+def _hash_file(file_path: str, limit: int = None):
+    """Return the BLAKE2b digest of a file (or of its first limit bytes), read in chunks; None on error."""
+    digest = hashlib.blake2b()
+    remaining = limit
+    try:
+        with open(file_path, 'rb') as f:
+            while remaining is None or remaining > 0:
+                chunk = f.read(DUPLICATE_HASH_CHUNK_BYTES if remaining is None else min(remaining, DUPLICATE_HASH_CHUNK_BYTES))
+                if not chunk:
+                    break
+                digest.update(chunk)
+                if remaining is not None:
+                    remaining -= len(chunk)
+    except OSError as e:
+        print(f"Error hashing file {file_path}: {e}")
+        return None
+    return digest.digest()
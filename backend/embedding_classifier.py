@@ -0,0 +1,149 @@
+# embedding_classifier.py
+import threading
+import time
+from config import (
+    EMBEDDING_CLASSIFIER_ENABLED, EMBEDDING_CONFIDENCE_MARGIN, EMBEDDING_MIN_SIMILARITY,
+)
+from ollama_handler import CATEGORY_RULES
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+    print("numpy not installed. Embedding-based classification is disabled.")
+
+class EmbeddingClassifier:
+    """
+    Fast classifier that embeds file content with Ollama's embed endpoint and matches it against
+    per-category centroids using cosine similarity. Only confident matches are returned; everything
+    else is left for the chat model.
+
+    Centroids are seeded from the category descriptions and refined with confirmed results.
+    """
+
+    def __init__(self, ollama_handler, enabled=EMBEDDING_CLASSIFIER_ENABLED,
+                 margin=EMBEDDING_CONFIDENCE_MARGIN, min_similarity=EMBEDDING_MIN_SIMILARITY):
+        """
+        Args:
+            ollama_handler (OllamaHandler): Used to compute embeddings and budget content.
+            enabled (bool): Whether the classifier is used at all.
+            margin (float): Minimum gap between the best and second-best category similarity.
+            min_similarity (float): Minimum cosine similarity of the best category.
+        """
+        self.ollama_handler = ollama_handler
+        self.enabled = enabled and np is not None
+        self.margin = margin
+        self.min_similarity = min_similarity
+        # 'Miscellaneous' is what the chat model answers when nothing fits, so it gets no centroid
+        self.categories = [category for category in CATEGORY_RULES if category != 'Miscellaneous']
+        self._lock = threading.Lock()
+        self._sums = None  # Un-normalized sum of member embeddings per category
+        self._centroids = None  # Row-normalized copy of _sums used for matching
+        self._stats = {"hits": 0, "fallbacks": 0, "embed_seconds": 0.0, "fallback_llm_seconds": 0.0, "confirmations": 0}
+
+    def classify(self, content: str, extension: str = None):
+        """
+        Try to classify content without the chat model.
+
+        Args:
+            content (str): The textual content of the file.
+            extension (str, optional): File extension (without dot), used to pick the content budget.
+
+        Returns:
+            tuple: (category or None, embedding or None). The category is None when the match is
+                   not confident enough; pass the embedding to confirm() once the chat model has answered.
+        """
+        if not self.enabled or not content.strip():
+            return None, None
+
+        started = time.perf_counter()
+        embedding = self._embed([self.ollama_handler.budget_content(content, extension)])
+        if embedding is None or not self._ensure_centroids():
+            return None, None
+        embedding = embedding[0]
+
+        with self._lock:
+            similarities = self._centroids @ embedding
+        # Take the best two categories without a full sort
+        top_two = np.argpartition(-similarities, 1)[:2]
+        best, runner_up = sorted(top_two, key=lambda index: -similarities[index])
+        confident = (similarities[best] >= self.min_similarity
+                     and similarities[best] - similarities[runner_up] >= self.margin)
+
+        with self._lock:
+            self._stats["embed_seconds"] += time.perf_counter() - started
+            if confident:
+                self._stats["hits"] += 1
+            else:
+                self._stats["fallbacks"] += 1
+        return (self.categories[best] if confident else None), embedding
+
+    def confirm(self, category: str, embedding, llm_seconds: float = None):
+        """
+        Fold a confirmed classification into its category centroid.
+
+        Args:
+            category (str): The category assigned by the chat model.
+            embedding: The embedding returned by classify() for the same content.
+            llm_seconds (float, optional): How long the chat model took, used to report savings.
+        """
+        if embedding is None:
+            return
+        with self._lock:
+            if llm_seconds is not None:
+                self._stats["fallback_llm_seconds"] += llm_seconds
+            if category not in self.categories or self._sums is None:
+                return
+            index = self.categories.index(category)
+            self._sums[index] += embedding
+            self._centroids[index] = self._sums[index] / np.linalg.norm(self._sums[index])
+            self._stats["confirmations"] += 1
+
+    def stats(self) -> dict:
+        """Return hit rate and estimated latency savings."""
+        with self._lock:
+            stats = dict(self._stats)
+        lookups = stats["hits"] + stats["fallbacks"]
+        avg_embed = stats["embed_seconds"] / lookups if lookups else 0.0
+        avg_llm = stats["fallback_llm_seconds"] / stats["fallbacks"] if stats["fallbacks"] else 0.0
+        return {
+            "enabled": self.enabled,
+            "hits": stats["hits"],
+            "fallbacks": stats["fallbacks"],
+            "hit_rate": round(stats["hits"] / lookups, 4) if lookups else 0.0,
+            "confirmations": stats["confirmations"],
+            "avg_embed_seconds": round(avg_embed, 4),
+            "avg_llm_seconds": round(avg_llm, 4),
+            # Each hit skipped a chat call but still paid for an embedding
+            "estimated_seconds_saved": round(stats["hits"] * max(avg_llm - avg_embed, 0.0), 2),
+        }
+
+    def _ensure_centroids(self) -> bool:
+        """
+        Seed centroids from the category descriptions on first use. The embedding call runs outside
+        the lock so classify and confirm calls are not stuck behind it; if two callers seed at once,
+        the first to finish wins.
+        """
+        if self._centroids is not None:
+            return True
+        seeds = self._embed([
+            f"{category}: {CATEGORY_RULES[category][0]}" for category in self.categories
+        ])
+        if seeds is None:
+            return False
+        with self._lock:
+            if self._centroids is None:
+                self._sums = seeds.copy()
+                self._centroids = seeds
+        return True
+
+    def _embed(self, texts):
+        """Embed texts and return a row-normalized float32 matrix, or None on failure."""
+        try:
+            vectors = np.asarray(self.ollama_handler.embed(texts), dtype=np.float32)
+        except Exception as e:
+            print(f"Error computing embeddings with Ollama: {e}")
+            return None
+        norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+        norms[norms == 0] = 1.0
+        return vectors / norms
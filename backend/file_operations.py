@@ -3,7 +3,7 @@ import os
 import shutil
 import mimetypes
 import magic # python-magic
-from config import TEXT_FILE_TYPES, IGNORE_FILE_TYPES
+from config import TEXT_FILE_TYPES, IGNORE_FILE_TYPES, PDF_EXTRACTION_MODE, PDF_SAMPLE_PAGES, PDF_CHAR_BUDGET
 
 # Attempt to import document parsers
 try:
@@ -18,6 +18,43 @@ except ImportError:
     PyPDF2 = None
     print("PyPDF2 not installed. PDF file content will not be extracted.")
 
+PDF_MODES = ('sampled', 'first_pages', 'budget', 'full')
+
+def pdf_page_numbers(page_count: int, mode: str, sample_pages: int = PDF_SAMPLE_PAGES) -> list[int]:
+    """
+    Choose which pages of a PDF to extract, in reading order.
+
+    Args:
+        page_count (int): Number of pages in the PDF.
+        mode (str): 'sampled' takes the first half of sample_pages from the start and spreads the rest
+                    evenly over the remaining pages, ending on the last one; 'first_pages' takes the first
+                    sample_pages pages; 'budget' and 'full' take every page.
+        sample_pages (int): Pages to take in the 'sampled' and 'first_pages' modes.
+
+    Returns:
+        list[int]: Zero-based page numbers.
+    """
+    if mode not in PDF_MODES:
+        raise ValueError(f"Unknown PDF extraction mode '{mode}'")
+    if mode in ('budget', 'full') or page_count <= sample_pages:
+        return list(range(page_count))
+    if mode == 'first_pages':
+        return list(range(sample_pages))
+    head = max(1, sample_pages // 2)
+    rest = sample_pages - head
+    spread = {round(head + (page_count - 1 - head) * (step + 1) / rest) for step in range(rest)}
+    return sorted(set(range(head)) | spread)
+
+def iter_pdf_pages(reader, page_numbers):
+    """Yield the text of the given pages one at a time, so callers can stop extracting early."""
+    for page_number in page_numbers:
+        try:
+            yield reader.pages[page_number].extract_text() or ""
+        except Exception as e:
+            # One unreadable page should not cost the text of the others
+            print(f"Could not extract text from PDF page {page_number + 1}: {e}")
+            yield ""
+
 class FileOperations:
     def __init__(self):
         # Define custom MIME type mappings for common file extensions
@@ -62,10 +99,11 @@ class FileOperations:
             return mimetypes.guess_type(file_path)[0] or "application/octet-stream"
 
 
-    def read_file_content(self, file_path: str) -> str:
+    def read_file_content(self, file_path: str, pdf_mode: str = PDF_EXTRACTION_MODE) -> str:
         """
         Extracts text content from supported files.
-        For DOCX and PDF files, uses specialized libraries to extract text.
+        For DOCX and PDF files, uses specialized libraries to extract text; PDFs are sampled
+        according to pdf_mode (see read_pdf_text).
         Returns an empty string if the file type is unsupported or unreadable.
         """
         file_extension = os.path.splitext(file_path)[1].lstrip('.').lower()
@@ -79,20 +117,7 @@ class FileOperations:
                     doc = Document(file_path)
                     return "\n".join([paragraph.text for paragraph in doc.paragraphs])
                 elif file_extension == 'pdf' and PyPDF2:
-                    # Extract text from PDF pages, handling encrypted PDFs
-                    with open(file_path, 'rb') as f:
-                        reader = PyPDF2.PdfReader(f)
-                        if reader.is_encrypted:
-                            try:
-                                # Attempt to decrypt with empty password
-                                reader.decrypt('')
-                            except Exception as decrypt_e:
-                                print(f"Could not decrypt PDF {file_path}: {decrypt_e}")
-                                return ""  # Return empty if decryption fails
-                        text = ""
-                        for page_num in range(len(reader.pages)):
-                            text += reader.pages[page_num].extract_text() or ""
-                        return text
+                    return self.read_pdf_text(file_path, pdf_mode)
                 else:
                     # Read other text files with UTF-8 encoding, ignoring errors
                     with open(file_path, 'r', encoding='utf-8', errors='ignore') as f:
@@ -102,11 +127,54 @@ class FileOperations:
                 return ""
         return ""
 
-    def move_file(self, source_path: str, destination_folder: str, new_name: str = None) -> bool:
+    def read_pdf_text(self, file_path: str, mode: str = PDF_EXTRACTION_MODE, char_budget: int = PDF_CHAR_BUDGET,
+                      sample_pages: int = PDF_SAMPLE_PAGES) -> str:
+        """
+        Extract text from a PDF page by page, stopping as soon as char_budget characters are collected.
+        Only the chosen pages are parsed (see pdf_page_numbers), so a classification sample of a
+        thousand-page PDF costs a handful of pages. In 'sampled' mode the budget is shared between the
+        sampled pages, with characters a short page leaves unused handed on to the following ones.
+
+        Args:
+            file_path (str): Path to the PDF.
+            mode (str): 'sampled', 'first_pages', 'budget' or 'full'; 'full' ignores the budget.
+            char_budget (int): Maximum characters to extract; 0 or less means no limit.
+            sample_pages (int): Pages to take in the 'sampled' and 'first_pages' modes.
+
+        Returns:
+            str: The extracted page texts joined by newlines; empty if the PDF cannot be decrypted.
+        """
+        if mode == 'full':
+            char_budget = 0
+        with open(file_path, 'rb') as f:
+            reader = PyPDF2.PdfReader(f)
+            if reader.is_encrypted:
+                try:
+                    # Attempt to decrypt with empty password
+                    reader.decrypt('')
+                except Exception as decrypt_e:
+                    print(f"Could not decrypt PDF {file_path}: {decrypt_e}")
+                    return ""  # Return empty if decryption fails
+            page_numbers = pdf_page_numbers(len(reader.pages), mode, sample_pages)
+            # Collect page texts in a list and join once; repeated += copies the text over and over
+            parts = []
+            remaining = char_budget
+            for index, text in enumerate(iter_pdf_pages(reader, page_numbers)):
+                if char_budget > 0:
+                    share = remaining // (len(page_numbers) - index) if mode == 'sampled' else remaining
+                    text = text[:share]
+                    remaining -= len(text)
+                parts.append(text)
+                if char_budget > 0 and remaining <= 0:
+                    break
+            return "\n".join(parts)
+
+    def move_file(self, source_path: str, destination_folder: str, new_name: str = None):
         """
         Moves a file to the specified folder, optionally renaming it.
         Creates the destination folder if it doesn't exist.
         Handles filename conflicts by appending a number suffix.
+        Returns the path the file was moved to, or None if the move failed.
         """
         try:
             if not os.path.exists(destination_folder):
@@ -128,10 +196,10 @@ class FileOperations:
 
             shutil.move(source_path, destination_path)
             print(f"Moved '{source_path}' to '{destination_path}'")
-            return True
+            return destination_path
         except Exception as e:
             print(f"Error moving file {source_path}: {e}")
-            return False
+            return None
 
     def get_files_in_directory(self, directory: str) -> list[str]:
         """
@@ -0,0 +1,66 @@
+# file_ordering.py
+import os
+from config import CONTENT_TOKEN_BUDGET, CONTENT_TOKEN_BUDGET_OVERRIDES, CHARS_PER_TOKEN, EXTRACTED_TEXT_RATIOS
+
+# Orders the organize pipeline can process a listing in:
+#   walk     - os.walk order, as listed
+#   smallest - smallest files first, so many small results arrive before a few huge files are parsed
+#   mtime    - most recently modified first
+#   tokens   - lowest estimated prompt tokens first, then smallest
+ORDER_POLICIES = ('walk', 'smallest', 'mtime', 'tokens')
+
+def estimate_tokens(file_path: str, size: int) -> int:
+    """
+    Estimate the prompt tokens a file will cost: its extracted text, capped by the content
+    budget for its extension.
+
+    Args:
+        file_path (str): Path to the file; only the extension is used.
+        size (int): File size in bytes.
+
+    Returns:
+        int: Estimated prompt tokens.
+    """
+    extension = os.path.splitext(file_path)[1].lstrip('.').lower()
+    text_chars = size * EXTRACTED_TEXT_RATIOS.get(extension, 1.0)
+    budget_chars = CONTENT_TOKEN_BUDGET_OVERRIDES.get(extension, CONTENT_TOKEN_BUDGET) * CHARS_PER_TOKEN
+    return int(min(text_chars, budget_chars) / CHARS_PER_TOKEN)
+
+def order_files(file_paths: list[str], policy: str) -> list[str]:
+    """
+    Return file_paths in the order given by policy. Sorting is stable, so ties keep listing order.
+    Files that cannot be stat'ed go last; they are reported as errors when read.
+
+    Args:
+        file_paths (list[str]): Files as listed.
+        policy (str): One of ORDER_POLICIES.
+
+    Returns:
+        list[str]: The reordered paths.
+
+    Raises:
+        ValueError: Unknown policy.
+    """
+    if policy not in ORDER_POLICIES:
+        raise ValueError(f"Unknown order '{policy}'; expected one of {', '.join(ORDER_POLICIES)}.")
+    if policy == 'walk':
+        return list(file_paths)
+
+    stats = {}
+    for file_path in file_paths:
+        try:
+            stats[file_path] = os.stat(file_path)
+        except OSError:
+            stats[file_path] = None
+
+    def key(file_path):
+        stat = stats[file_path]
+        if stat is None:
+            return (1, 0, 0)
+        if policy == 'smallest':
+            return (0, stat.st_size, 0)
+        if policy == 'mtime':
+            return (0, -stat.st_mtime, 0)
+        return (0, estimate_tokens(file_path, stat.st_size), stat.st_size)
+
+    return sorted(file_paths, key=key)
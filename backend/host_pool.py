@@ -0,0 +1,167 @@
+# host_pool.py
+import asyncio
+import threading
+import time
+import weakref
+from contextlib import contextmanager
+import httpx
+import ollama
+from config import (
+    HOST_HEALTH_CHECK_INTERVAL, HOST_FAILURE_THRESHOLD, HOST_LATENCY_SMOOTHING,
+    OLLAMA_REQUEST_TIMEOUT, OLLAMA_CONNECT_TIMEOUT,
+)
+
+# Without a timeout a stuck server hangs the calling thread forever
+REQUEST_TIMEOUT = httpx.Timeout(OLLAMA_REQUEST_TIMEOUT, connect=OLLAMA_CONNECT_TIMEOUT)
+
+def is_transient_error(error: Exception) -> bool:
+    """Whether a failed Ollama call is worth retrying: timeouts, connection problems and 5xx/429 answers."""
+    if isinstance(error, ollama.ResponseError):
+        return error.status_code >= 500 or error.status_code == 429
+    return isinstance(error, (httpx.TimeoutException, httpx.TransportError, ConnectionError))
+
+class OllamaHost:
+    """
+    One Ollama server in the pool, with its clients and load/health bookkeeping.
+    """
+
+    def __init__(self, url: str):
+        self.url = url
+        self.client = ollama.Client(host=url, timeout=REQUEST_TIMEOUT)
+        # AsyncClient connections are bound to an event loop, so keep one client per loop
+        self._async_clients = weakref.WeakKeyDictionary()
+        self.in_flight = 0
+        self.latency = None  # Exponentially weighted moving average of request seconds
+        self.healthy = True
+        self.consecutive_failures = 0
+        self.requests = 0
+        self.failures = 0
+
+    def async_client(self) -> ollama.AsyncClient:
+        """Return the AsyncClient for this host bound to the currently running event loop."""
+        loop = asyncio.get_running_loop()
+        client = self._async_clients.get(loop)
+        if client is None:
+            client = ollama.AsyncClient(host=self.url, timeout=REQUEST_TIMEOUT)
+            self._async_clients[loop] = client
+        return client
+
+
+class HostPool:
+    """
+    Pool of Ollama hosts. Each request goes to the healthy host with the lowest expected wait,
+    estimated from its in-flight requests and observed latency. Hosts that keep failing are taken
+    out of rotation, and a background health check brings them back once they respond again.
+    """
+
+    def __init__(self, urls: list[str], health_check_interval=HOST_HEALTH_CHECK_INTERVAL,
+                 failure_threshold=HOST_FAILURE_THRESHOLD, smoothing=HOST_LATENCY_SMOOTHING):
+        """
+        Args:
+            urls (list[str]): Ollama server URLs.
+            health_check_interval (float): Seconds between health checks; 0 disables them.
+            failure_threshold (int): Consecutive failures before a host is taken out of rotation.
+            smoothing (float): Weight of the newest sample in the latency moving average.
+        """
+        self.hosts = [OllamaHost(url) for url in urls]
+        self.health_check_interval = health_check_interval
+        self.failure_threshold = max(1, failure_threshold)
+        self.smoothing = smoothing
+        self._lock = threading.Lock()
+        self._health_thread = None
+
+    @contextmanager
+    def acquire(self):
+        """
+        Reserve the least-loaded healthy host for one request.
+        Latency is recorded on success; transient errors (see is_transient_error) count as a failure
+        for that host. Anything else, such as a 4xx answer or a cancelled request, only gives the slot back:
+        the host answered, or was never at fault.
+
+        Yields:
+            OllamaHost: The host to send the request to.
+        """
+        with self._lock:
+            host = self._pick()
+            host.in_flight += 1
+            host.requests += 1
+        started = time.perf_counter()
+        try:
+            yield host
+        except Exception as e:
+            if not is_transient_error(e):
+                raise
+            with self._lock:
+                host.failures += 1
+                host.consecutive_failures += 1
+                if host.healthy and host.consecutive_failures >= self.failure_threshold:
+                    host.healthy = False
+                    print(f"Ollama host {host.url} taken out of rotation after {host.consecutive_failures} failures.")
+            raise
+        else:
+            with self._lock:
+                host.consecutive_failures = 0
+                elapsed = time.perf_counter() - started
+                host.latency = elapsed if host.latency is None else (
+                    self.smoothing * elapsed + (1 - self.smoothing) * host.latency
+                )
+        finally:
+            # Also reached on cancellation (CancelledError, GeneratorExit), which must not leak the slot
+            with self._lock:
+                host.in_flight -= 1
+
+    def _pick(self) -> OllamaHost:
+        """Choose a host; callers hold self._lock."""
+        candidates = [host for host in self.hosts if host.healthy] or self.hosts
+        # Hosts without samples yet are assumed as fast as the fastest known host
+        known = [host.latency for host in candidates if host.latency is not None]
+        default_latency = min(known) if known else 1.0
+        return min(
+            candidates,
+            key=lambda host: (host.in_flight + 1) * (host.latency if host.latency is not None else default_latency),
+        )
+
+    def start_health_checks(self):
+        """Start the background health check thread (once)."""
+        if self.health_check_interval <= 0 or self._health_thread is not None:
+            return
+        self._health_thread = threading.Thread(target=self._health_loop, daemon=True)
+        self._health_thread.start()
+
+    def _health_loop(self):
+        while True:
+            time.sleep(self.health_check_interval)
+            for host in self.hosts:
+                self.check_host(host)
+
+    def check_host(self, host: OllamaHost) -> bool:
+        """Probe a host and update its rotation state; returns whether it is healthy."""
+        try:
+            host.client.list()
+            healthy = True
+        except Exception as e:
+            healthy = False
+            if host.healthy:
+                print(f"Health check failed for Ollama host {host.url}: {e}")
+        with self._lock:
+            if healthy and not host.healthy:
+                print(f"Ollama host {host.url} is back in rotation.")
+            if healthy:
+                host.consecutive_failures = 0
+            host.healthy = healthy
+        return healthy
+
+    def stats(self) -> list[dict]:
+        """Return per-host load and health information."""
+        with self._lock:
+            return [
+                {
+                    "host": host.url,
+                    "healthy": host.healthy,
+                    "in_flight": host.in_flight,
+                    "avg_latency_seconds": round(host.latency, 4) if host.latency is not None else None,
+                    "requests": host.requests,
+                    "failures": host.failures,
+                }
+                for host in self.hosts
+            ]
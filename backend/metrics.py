@@ -0,0 +1,122 @@
+# metrics.py
+import math
+import threading
+
+# Bucket upper bounds shared by the histograms below
+SECONDS_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120)
+TOKEN_BUCKETS = (8, 16, 32, 64, 128, 256, 512, 1024, 2048, 4096, 8192)
+
+class Histogram:
+    """
+    Cumulative histogram with optional labels, rendered in the Prometheus text exposition format.
+    """
+
+    def __init__(self, name: str, help_text: str, buckets=SECONDS_BUCKETS, label_names=()):
+        """
+        Args:
+            name (str): Metric name.
+            help_text (str): One-line description shown in the HELP line.
+            buckets (tuple): Increasing bucket upper bounds; +Inf is added automatically.
+            label_names (tuple): Names of the labels passed to observe().
+        """
+        self.name = name
+        self.help_text = help_text
+        self.buckets = tuple(sorted(buckets))
+        self.label_names = tuple(label_names)
+        self._lock = threading.Lock()
+        # Label values -> [per-bucket counts..., +Inf count, sum]
+        self._series = {}
+
+    def observe(self, value: float, **labels):
+        """Record one observation for the given label values."""
+        key = tuple(str(labels.get(label_name, "")) for label_name in self.label_names)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = [0] * (len(self.buckets) + 1) + [0.0]
+            for index, bound in enumerate(self.buckets):
+                if value <= bound:
+                    series[index] += 1
+            series[len(self.buckets)] += 1
+            series[-1] += value
+
+    def render(self) -> list[str]:
+        """Return the exposition lines for this histogram."""
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            series = {key: list(values) for key, values in self._series.items()}
+        for key, values in sorted(series.items()):
+            labels = [f'{label_name}="{_escape(value)}"' for label_name, value in zip(self.label_names, key)]
+            for bound, count in zip(self.buckets + (math.inf,), values):
+                le = "+Inf" if bound == math.inf else f"{bound:g}"
+                bucket_labels = ",".join(labels + ['le="' + le + '"'])
+                lines.append(f"{self.name}_bucket{{{bucket_labels}}} {count}")
+            label_text = f"{{{','.join(labels)}}}" if labels else ""
+            lines.append(f"{self.name}_sum{label_text} {values[-1]:.6g}")
+            lines.append(f"{self.name}_count{label_text} {values[len(self.buckets)]}")
+        return lines
+
+
+class MetricsRegistry:
+    """Collection of histograms rendered together by the /metrics endpoint."""
+
+    def __init__(self):
+        self._metrics = {}
+        self._lock = threading.Lock()
+
+    def histogram(self, name: str, help_text: str, buckets=SECONDS_BUCKETS, label_names=()) -> Histogram:
+        """Return the histogram with the given name, creating it on first use."""
+        with self._lock:
+            metric = self._metrics.get(name)
+            if metric is None:
+                metric = self._metrics[name] = Histogram(name, help_text, buckets, label_names)
+            return metric
+
+    def render(self) -> str:
+        """Return every metric in the Prometheus text exposition format."""
+        with self._lock:
+            metrics = list(self._metrics.values())
+        lines = []
+        for metric in metrics:
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+def _escape(value: str) -> str:
+    """Escape a label value for the exposition format."""
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+# Process-wide registry used by the Ollama handler, the pipeline and the Flask app
+REGISTRY = MetricsRegistry()
+
+OLLAMA_CALL_SECONDS = REGISTRY.histogram(
+    "docpilot_ollama_call_seconds", "Wall time of Ollama calls as seen by the backend.",
+    label_names=("kind", "model"))
+OLLAMA_LOAD_SECONDS = REGISTRY.histogram(
+    "docpilot_ollama_load_seconds", "Model load time reported by Ollama (load_duration).",
+    label_names=("kind", "model"))
+OLLAMA_PROMPT_EVAL_SECONDS = REGISTRY.histogram(
+    "docpilot_ollama_prompt_eval_seconds", "Prompt evaluation time reported by Ollama (prompt_eval_duration).",
+    label_names=("kind", "model"))
+OLLAMA_EVAL_SECONDS = REGISTRY.histogram(
+    "docpilot_ollama_eval_seconds", "Decoding time reported by Ollama (eval_duration).",
+    label_names=("kind", "model"))
+OLLAMA_PROMPT_EVAL_TOKENS = REGISTRY.histogram(
+    "docpilot_ollama_prompt_eval_tokens", "Prompt tokens Ollama evaluated per call (prompt_eval_count).",
+    buckets=TOKEN_BUCKETS, label_names=("kind", "model"))
+OLLAMA_EVAL_TOKENS = REGISTRY.histogram(
+    "docpilot_ollama_eval_tokens", "Tokens Ollama generated per call (eval_count).",
+    buckets=TOKEN_BUCKETS, label_names=("kind", "model"))
+HTTP_REQUEST_SECONDS = REGISTRY.histogram(
+    "docpilot_http_request_seconds", "Latency of backend HTTP requests.",
+    label_names=("endpoint", "method", "status"))
+PIPELINE_STAGE_SECONDS = REGISTRY.histogram(
+    "docpilot_pipeline_stage_seconds", "Time spent in each organize pipeline stage per work item.",
+    label_names=("stage",))
+PIPELINE_FIRST_RESULT_SECONDS = REGISTRY.histogram(
+    "docpilot_pipeline_first_result_seconds", "Time from the start of an organize run to its first organized file.",
+    label_names=("order",))
+SCHEDULER_WAIT_SECONDS = REGISTRY.histogram(
+    "docpilot_scheduler_wait_seconds", "Time Ollama calls waited in the scheduler queue before being sent.",
+    label_names=("lane",))
@@ -0,0 +1,221 @@
+# near_duplicate_index.py
+import hashlib
+import re
+import sqlite3
+import threading
+import time
+from config import (
+    NEAR_DUPLICATE_ENABLED, NEAR_DUPLICATE_INDEX_PATH, NEAR_DUPLICATE_MAX_ENTRIES,
+    NEAR_DUPLICATE_MAX_DISTANCE, NEAR_DUPLICATE_MIN_CHARS, NEAR_DUPLICATE_REUSE,
+)
+
+SIGNATURE_BITS = 64
+BAND_BITS = 16 # Four bands: two signatures within 3 bits of each other always share at least one band
+
+def simhash(text: str) -> int:
+    """
+    Compute a 64-bit SimHash of text from word bigrams. Digit runs are collapsed first, so
+    variants that differ only in dates, amounts or IDs get (nearly) the same signature.
+    """
+    words = re.findall(r'\w+', re.sub(r'\d+', '0', text.lower()))
+    features = {}
+    for feature in zip(words, words[1:]) if len(words) > 1 else [(word,) for word in words]:
+        features[feature] = features.get(feature, 0) + 1
+
+    weights = [0] * SIGNATURE_BITS
+    for feature, count in features.items():
+        digest = hashlib.blake2b(" ".join(feature).encode('utf-8'), digest_size=8).digest()
+        value = int.from_bytes(digest, 'big')
+        for bit in range(SIGNATURE_BITS):
+            weights[bit] += count if value >> bit & 1 else -count
+    return sum(1 << bit for bit, weight in enumerate(weights) if weight > 0)
+
+def template_name(name: str, file_name: str) -> str:
+    """
+    Adapt an inherited name suggestion to a new file: the numbers in the suggestion ('Server Log
+    2025 07 10') are replaced, in order, by the last numbers in the new file's own name
+    ('app_2025-07-11' -> 'Server Log 2025 07 11'). Without enough numbers the name is kept as is.
+    """
+    name_numbers = re.findall(r'\d+', name)
+    file_numbers = re.findall(r'\d+', file_name)
+    if not name_numbers or len(file_numbers) < len(name_numbers):
+        return name
+    replacements = iter(file_numbers[len(file_numbers) - len(name_numbers):])
+    return re.sub(r'\d+', lambda match: next(replacements), name)
+
+def _to_signed(value: int) -> int:
+    """SQLite integers are signed 64-bit; store signatures in that range."""
+    return value - (1 << SIGNATURE_BITS) if value >= 1 << (SIGNATURE_BITS - 1) else value
+
+def _bands(signature: int) -> list[int]:
+    mask = (1 << BAND_BITS) - 1
+    return [signature >> shift & mask for shift in range(0, SIGNATURE_BITS, BAND_BITS)]
+
+
+class NearDuplicateIndex:
+    """
+    Persistent SQLite index of SimHash signatures of classified files. A file whose signature is
+    within max_distance bits of a stored one inherits that file's classification, as allowed by the
+    per-category reuse settings, instead of being sent to the model.
+    Like the analysis cache, entries are keyed by model and prompt version, so switching either
+    stops old classifications from being inherited.
+    """
+
+    def __init__(self, model: str, prompt_version, path=NEAR_DUPLICATE_INDEX_PATH, max_entries=NEAR_DUPLICATE_MAX_ENTRIES,
+                 max_distance=NEAR_DUPLICATE_MAX_DISTANCE, min_chars=NEAR_DUPLICATE_MIN_CHARS,
+                 reuse=NEAR_DUPLICATE_REUSE, enabled=NEAR_DUPLICATE_ENABLED):
+        """
+        Open (or create) the index database.
+
+        Args:
+            model (str): Key of the model cascade producing the stored classifications.
+            prompt_version: Version of the analysis prompt producing them.
+            path (str): Path to the SQLite database file.
+            max_entries (int): Maximum number of stored signatures; the least recently matched are evicted.
+            max_distance (int): Maximum Hamming distance between near-duplicate signatures (at most 3).
+            min_chars (int): Texts shorter than this are neither looked up nor stored.
+            reuse (dict): Category -> 'name' or 'category', controlling what near duplicates inherit.
+            enabled (bool): Whether the index is used at all.
+        """
+        self.key = (model, str(prompt_version))
+        self.max_entries = max_entries
+        self.max_distance = min(max_distance, 3)
+        self.min_chars = min_chars
+        self.reuse = reuse
+        self._lock = threading.Lock()
+        self._conn = None
+        self._size = 0
+        self._stats = {"hits": 0, "misses": 0, "skipped": 0, "added": 0}
+
+        if not enabled or max_entries <= 0:
+            return
+        try:
+            # The connection is shared between pipeline threads and guarded by self._lock
+            self._conn = sqlite3.connect(path, check_same_thread=False)
+            columns = [row[1] for row in self._conn.execute("PRAGMA table_info(near_duplicates)")]
+            if columns and "model" not in columns:
+                # Entries from before model keying cannot be attributed to a model; start over
+                self._conn.execute("DROP TABLE near_duplicates")
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS near_duplicates ("
+                " signature INTEGER NOT NULL,"
+                " model TEXT NOT NULL,"
+                " prompt_version TEXT NOT NULL,"
+                " band0 INTEGER NOT NULL, band1 INTEGER NOT NULL, band2 INTEGER NOT NULL, band3 INTEGER NOT NULL,"
+                " category TEXT NOT NULL,"
+                " new_name_suggestion TEXT,"
+                " last_used REAL NOT NULL,"
+                " PRIMARY KEY (signature, model, prompt_version))"
+            )
+            for band in range(4):
+                self._conn.execute(
+                    f"CREATE INDEX IF NOT EXISTS idx_near_duplicates_band{band} ON near_duplicates (band{band})"
+                )
+            self._conn.commit()
+            self._size = self._conn.execute("SELECT COUNT(*) FROM near_duplicates").fetchone()[0]
+        except Exception as e:
+            # A broken index must never prevent classification; run without it instead
+            print(f"Could not open near-duplicate index at {path}: {e}")
+            self._conn = None
+
+    def signature(self, text: str):
+        """Return the SimHash signature of text, or None if the index is off or the text is too short."""
+        if self._conn is None or len(text.strip()) < self.min_chars:
+            return None
+        return simhash(text)
+
+    def find(self, signature: int, file_name: str):
+        """
+        Look up the closest stored near duplicate whose category allows reuse.
+
+        Args:
+            signature (int): Signature from signature().
+            file_name (str): Base name (without extension) of the new file, used to template names.
+
+        Returns:
+            tuple: (analysis, needs_name), or (None, False) without a usable match. The analysis holds the
+                   inherited category and, for 'name' reuse, a templated new_name_suggestion;
+                   needs_name is True when only the category was inherited.
+        """
+        if self._conn is None or signature is None:
+            return None, False
+        bands = _bands(signature)
+        with self._lock:
+            try:
+                rows = self._conn.execute(
+                    "SELECT signature, category, new_name_suggestion FROM near_duplicates"
+                    " WHERE model = ? AND prompt_version = ? AND (band0 = ? OR band1 = ? OR band2 = ? OR band3 = ?)",
+                    (*self.key, *bands),
+                ).fetchall()
+            except Exception as e:
+                print(f"Error reading near-duplicate index: {e}")
+                rows = []
+            best = None
+            for stored, category, name in rows:
+                distance = bin((stored ^ _to_signed(signature)) & ((1 << SIGNATURE_BITS) - 1)).count("1")
+                if distance <= self.max_distance and (best is None or distance < best[0]):
+                    best = (distance, stored, category, name)
+            if best is None:
+                self._stats["misses"] += 1
+                return None, False
+            distance, stored, category, name = best
+            mode = self.reuse.get(category)
+            if mode not in ('name', 'category'):
+                self._stats["skipped"] += 1
+                return None, False
+            self._stats["hits"] += 1
+            try:
+                self._conn.execute(
+                    "UPDATE near_duplicates SET last_used = ? WHERE signature = ? AND model = ? AND prompt_version = ?",
+                    (time.time(), stored, *self.key),
+                )
+                self._conn.commit()
+            except Exception as e:
+                print(f"Error updating near-duplicate index: {e}")
+
+        if mode == 'name' and name:
+            return {"category": category, "new_name_suggestion": template_name(name, file_name)}, False
+        return {"category": category, "new_name_suggestion": None}, True
+
+    def add(self, signature: int, analysis: dict):
+        """
+        Store a model classification so later near duplicates can reuse it.
+        'Miscellaneous' results are not stored since they carry no information.
+        """
+        category = analysis.get("category")
+        if self._conn is None or signature is None or not category or category == 'Miscellaneous':
+            return
+        with self._lock:
+            try:
+                cursor = self._conn.execute(
+                    "INSERT OR REPLACE INTO near_duplicates"
+                    " (signature, model, prompt_version, band0, band1, band2, band3, category, new_name_suggestion, last_used)"
+                    " VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                    (_to_signed(signature), *self.key, *_bands(signature), category,
+                     analysis.get("new_name_suggestion"), time.time()),
+                )
+                self._size += cursor.rowcount
+                self._stats["added"] += 1
+                if self._size > self.max_entries:
+                    self._size = self._conn.execute("SELECT COUNT(*) FROM near_duplicates").fetchone()[0]
+                    overflow = self._size - self.max_entries
+                    if overflow > 0:
+                        self._conn.execute(
+                            "DELETE FROM near_duplicates WHERE rowid IN"
+                            " (SELECT rowid FROM near_duplicates ORDER BY last_used ASC LIMIT ?)",
+                            (overflow,),
+                        )
+                        self._size -= overflow
+                self._conn.commit()
+            except Exception as e:
+                print(f"Error writing near-duplicate index: {e}")
+
+    def stats(self) -> dict:
+        """Return lookup counters and the number of stored signatures."""
+        with self._lock:
+            stats = dict(self._stats)
+        lookups = stats["hits"] + stats["misses"] + stats["skipped"]
+        stats["hit_rate"] = round(stats["hits"] / lookups, 4) if lookups else 0.0
+        stats["enabled"] = self._conn is not None
+        stats["entries"] = self._size
+        return stats
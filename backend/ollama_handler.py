@@ -1,144 +1,1156 @@
 # ollama_handler.py
 import ollama
-import subprocess
-from config import OLLAMA_HOST, OLLAMA_MODEL
+import asyncio
+import difflib
+import json
+import random
+import re
+import threading
+import time
+import httpx
+from config import (
+    OLLAMA_HOSTS, OLLAMA_MODEL, OLLAMA_MODEL_CASCADE, CASCADE_CONFIDENCE_THRESHOLD,
+    OLLAMA_NUM_PARALLEL, OLLAMA_NUM_CTX, OLLAMA_KEEP_ALIVE,
+    OLLAMA_WARM_UP, OLLAMA_IDLE_UNLOAD_SECONDS, MODEL_LOAD_EVENT_SECONDS, MODEL_RECHECK_SECONDS,
+    OLLAMA_MAX_RETRIES, OLLAMA_RETRY_BASE_DELAY, OLLAMA_RETRY_MAX_DELAY,
+    EMBEDDING_MODEL, EMBEDDING_CLASSIFIER_ENABLED,
+    OLLAMA_STREAM_RESPONSES, ANALYSIS_NUM_PREDICT, BATCH_NUM_PREDICT_PER_FILE, RENAME_NUM_PREDICT,
+    CONTENT_TOKEN_BUDGET, CONTENT_TOKEN_BUDGET_OVERRIDES, CHARS_PER_TOKEN,
+)
+from analysis_cache import AnalysisCache
+from circuit_breaker import CircuitBreaker, OllamaUnavailableError
+from concurrency_controller import AIMDController
+from host_pool import HostPool, is_transient_error
+from scheduler import PriorityScheduler
+from single_flight import SingleFlight, LeaderAbandoned
+import metrics
+
+# Bump whenever the analysis prompt changes so stale cached results are not reused
+ANALYSIS_PROMPT_VERSION = 4
+
+# Predefined categories: (description, naming guideline)
+CATEGORY_RULES = {
+    'Business': (
+        "Business plans, reports, proposals, meeting minutes, strategies, marketing materials.",
+        "Focus on type and topic (e.g., 'Q3 Business Review', 'Marketing Strategy Plan')."),
+    'Code': (
+        "Programming source code (Python, JavaScript, C++, Java, etc.), scripts, configuration files, algorithms.",
+        "Based on function, language, or project part (e.g., 'Python API Handler', 'Web Component Logic', 'Database Schema')."),
+    'Creative': (
+        "Articles, stories, poems, scripts (film/play), design briefs, artistic concepts, personal journals.",
+        "Reflect the creative work's title or main theme (e.g., 'SciFi Short Story Draft', 'Poetry Collection Ideas')."),
+    'Data': (
+        "Spreadsheets, CSVs, JSON, XML, database dumps, statistical reports, analytical data sets.",
+        "Describe the data's content or source (e.g., 'Sales Data Q1', 'Customer Survey Results', 'Website Traffic Log')."),
+    'Education': (
+        "Lecture notes, assignments, research papers, study guides, course materials, educational articles.",
+        "Based on subject, course, or assignment (e.g., 'Calculus Lecture 5', 'History Essay Civil War', 'Biology Study Notes')."),
+    'Financial': (
+        "Budgets, invoices, receipts, expense reports, tax documents, bank statements, investment summaries.",
+        "Specific to the financial transaction/period (e.g., 'Monthly Budget July 2025', 'Invoice Client X', 'Tax Returns 2024')."),
+    'Images': (
+        "Descriptions or metadata about images, image lists, photo albums (not the image data itself).",
+        "Describe the subject or event (e.g., 'Vacation Photos Italy', 'Product Shots Catalog')."),
+    'Legal': (
+        "Contracts, agreements, policies, legal briefs, court documents, terms of service.",
+        "Reflect parties and type of document (e.g., 'Client Service Agreement', 'NDA Draft')."),
+    'Logs': (
+        "System logs, application logs, error reports, debugging output.",
+        "Reflect origin and date/time (e.g., 'Server Error Log 2025-07-10', 'App Crash Report')."),
+    'Personal': (
+        "Resumes, cover letters, personal notes, health records, medical information, diaries, family documents.",
+        "Specific and personal (e.g., 'My Resume Updated', 'Doctor Visit Summary', 'Family Photo Album Notes')."),
+    'Presentations': (
+        "Outlines, scripts, or content for slideshows/presentations.",
+        "Title of presentation (e.g., 'Annual Sales Pitch', 'Project Status Meeting Slides')."),
+    'Miscellaneous': (
+        "For content that is empty, too brief, cannot be clearly identified, or does not fit any other category.",
+        "In this case, `new_name_suggestion` MUST be `null`."),
+}
+
+CATEGORIES = list(CATEGORY_RULES)
+
+CATEGORY_GUIDE = "\n".join(
+    f"- '{category}': {description}\n    - Name Suggestion: {naming}"
+    for category, (description, naming) in CATEGORY_RULES.items()
+)
+
+# Static instructions are sent as the system prompt and built once, so every request shares
+# a byte-identical prefix that Ollama can serve from its prompt cache instead of re-evaluating
+ANALYSIS_SYSTEM_PROMPT = """You are a highly skilled AI assistant specializing in file organization. Your primary task is to carefully analyze the provided "File Content" and assign it the single most appropriate category from the predefined list below. In addition, you must suggest a concise and descriptive new file name (without extension) that accurately reflects the content.
+
+**Predefined Categories & Naming Guidelines:**
+""" + CATEGORY_GUIDE + """
+
+**Output Format:**
+Your response MUST be a valid JSON object. Do not include any extra text, comments, or markdown outside the JSON.
+The JSON object MUST contain exactly these three keys:
+- `"category"`: (string) The determined category (e.g., 'Code', 'Financial', 'Business').
+- `"new_name_suggestion"`: (string or null) A suggested new file name (maximum 7 words, no file extension). If the category is 'Miscellaneous', this value MUST be `null`.
+- `"confidence"`: (number) How confident you are in the category, from 0.0 (guess) to 1.0 (certain)."""
+
+BATCH_ANALYSIS_SYSTEM_PROMPT = """You are a highly skilled AI assistant specializing in file organization. You will receive several numbered documents. For EACH document, assign the single most appropriate category from the predefined list below and suggest a concise and descriptive new file name (without extension) that accurately reflects its content. Treat every document independently.
+
+**Predefined Categories & Naming Guidelines:**
+""" + CATEGORY_GUIDE + """
+
+**Output Format:**
+Your response MUST be a valid JSON object. Do not include any extra text, comments, or markdown outside the JSON.
+The JSON object MUST contain exactly one key, `"results"`, holding an array with one entry per document. Each entry MUST contain:
+- `"id"`: (integer) The document number.
+- `"category"`: (string) The determined category (e.g., 'Code', 'Financial', 'Business').
+- `"new_name_suggestion"`: (string or null) A suggested new file name (maximum 7 words, no file extension). If the category is 'Miscellaneous', this value MUST be `null`.
+- `"confidence"`: (number) How confident you are in the category, from 0.0 (guess) to 1.0 (certain)."""
+
+# Structured-output schemas: Ollama constrains decoding to them, so the category is always one of CATEGORIES
+ANALYSIS_RESPONSE_SCHEMA = {
+    "type": "object",
+    "properties": {
+        "category": {"type": "string", "enum": CATEGORIES},
+        "new_name_suggestion": {"type": ["string", "null"]},
+        "confidence": {"type": "number", "minimum": 0, "maximum": 1},
+    },
+    "required": ["category", "new_name_suggestion", "confidence"],
+    "additionalProperties": False,
+}
+
+BATCH_RESPONSE_SCHEMA = {
+    "type": "object",
+    "properties": {
+        "results": {
+            "type": "array",
+            "items": {
+                "type": "object",
+                "properties": {
+                    "id": {"type": "integer"},
+                    "category": {"type": "string", "enum": CATEGORIES},
+                    "new_name_suggestion": {"type": ["string", "null"]},
+                    "confidence": {"type": "number", "minimum": 0, "maximum": 1},
+                },
+                "required": ["id", "category", "new_name_suggestion", "confidence"],
+                "additionalProperties": False,
+            },
+        },
+    },
+    "required": ["results"],
+}
+
+RENAME_SYSTEM_PROMPT = """You are a file naming assistant. Your goal is to generate a new, highly descriptive, and concise name for a file based on its content.
+
+**Guidelines:**
+- The new name MUST be no more than 7 words.
+- The new name MUST NOT include any file extension.
+- Focus on the main topic, purpose, or key entities described in the file content.
+- If the content is too generic, short, or does not provide enough information for a meaningful new name, you MAY suggest the provided `current_name`.
+- The output MUST be ONLY the suggested file name. DO NOT include any other text, explanations, or markdown."""
+
+# Marker inserted between the sampled head, middle and tail of truncated content
+TRUNCATION_MARKER = "\n[...]\n"
+
+def sample_content(content: str, char_budget: int) -> str:
+    """
+    Reduce content to at most char_budget characters by keeping a slice of its head, middle and tail.
+    The head gets half of the budget since titles and headers usually say the most about a file.
+
+    Args:
+        content (str): The full file content.
+        char_budget (int): Maximum number of characters to keep; 0 or less disables sampling.
+
+    Returns:
+        str: The content unchanged if it fits, otherwise the sampled content.
+    """
+    if char_budget <= 0 or len(content) <= char_budget:
+        return content
+    available = max(char_budget - 2 * len(TRUNCATION_MARKER), 3)
+    head_size = available // 2
+    middle_size = available // 4
+    tail_size = available - head_size - middle_size
+    middle_start = (len(content) - middle_size) // 2
+    return (
+        content[:head_size]
+        + TRUNCATION_MARKER
+        + content[middle_start:middle_start + middle_size]
+        + TRUNCATION_MARKER
+        + content[len(content) - tail_size:]
+    )
+
+def parse_json_object(text: str) -> dict:
+    """
+    Parse a model response as a JSON object, tolerating surrounding prose or markdown fences
+    by falling back to the outermost {...} span.
+
+    Raises:
+        ValueError: No JSON object could be parsed.
+    """
+    try:
+        value = json.loads(text)
+    except json.JSONDecodeError:
+        start, end = text.find('{'), text.rfind('}')
+        if start < 0 or end <= start:
+            raise ValueError(f"No JSON object in response: {text[:100]!r}")
+        value = json.loads(text[start:end + 1])
+    if not isinstance(value, dict):
+        raise ValueError(f"Expected a JSON object, got {type(value).__name__}")
+    return value
+
+def match_category(category) -> str:
+    """
+    Map a category answered by the model onto CATEGORIES: exact match, then case and punctuation
+    insensitive match, then a known category the answer starts with ('Legal Docs'), then the closest
+    fuzzy match. Anything else becomes 'Miscellaneous'.
+    """
+    if not isinstance(category, str):
+        return 'Miscellaneous'
+    if category in CATEGORY_RULES:
+        return category
+    normalized = re.sub(r'[^a-z]', '', category.lower())
+    by_normalized = {known.lower(): known for known in CATEGORIES}
+    if normalized in by_normalized:
+        return by_normalized[normalized]
+    for known in by_normalized:
+        if normalized.startswith(known):
+            return by_normalized[known]
+    close = difflib.get_close_matches(normalized, list(by_normalized), n=1, cutoff=0.75)
+    return by_normalized[close[0]] if close else 'Miscellaneous'
+
+def repair_analysis(analysis: dict) -> tuple[dict, bool]:
+    """
+    Normalize a parsed analysis to exactly category, new_name_suggestion and confidence, with a
+    known category, a string or null name and a confidence between 0 and 1. Extra keys are dropped.
+
+    Returns:
+        tuple: (normalized analysis, whether anything had to be changed).
+    """
+    category = match_category(analysis.get("category"))
+    name = analysis.get("new_name_suggestion")
+    name = (name.strip() or None) if isinstance(name, str) else None
+    if category == 'Miscellaneous':
+        name = None
+    try:
+        confidence = min(max(float(analysis.get("confidence", 0.0)), 0.0), 1.0)
+    except (TypeError, ValueError):
+        confidence = 0.0
+    repaired = {"category": category, "new_name_suggestion": name, "confidence": confidence}
+    changed = (category != analysis.get("category") or set(analysis) - set(repaired)
+               or name != analysis.get("new_name_suggestion") or confidence != analysis.get("confidence"))
+    return repaired, bool(changed)
+
+def parse_keep_alive(keep_alive) -> float:
+    """
+    Convert an Ollama keep_alive value ('30m', '1h', '90s', 300, '-1') into seconds.
+    Negative values mean 'keep loaded forever' and map to infinity.
+    """
+    match = re.fullmatch(r'\s*(-?\d+(?:\.\d+)?)\s*(ms|s|m|h)?\s*', str(keep_alive))
+    if not match:
+        return 0.0
+    value = float(match.group(1))
+    if value < 0:
+        return float('inf')
+    return value * {'ms': 0.001, 's': 1, 'm': 60, 'h': 3600, None: 1}[match.group(2)]
+
+def retry_delay(attempt: int) -> float:
+    """Exponential backoff with full jitter for the given retry attempt (1-based)."""
+    return random.uniform(0, min(OLLAMA_RETRY_MAX_DELAY, OLLAMA_RETRY_BASE_DELAY * 2 ** (attempt - 1)))
+
+def observe_call(kind: str, model: str, response, seconds: float = None):
+    """
+    Record an Ollama call in the metrics histograms: our wall time plus whichever of Ollama's
+    counters and durations (nanoseconds) the response carries.
+    """
+    labels = {"kind": kind, "model": model}
+    if seconds is not None:
+        metrics.OLLAMA_CALL_SECONDS.observe(seconds, **labels)
+    for field, histogram in (('load_duration', metrics.OLLAMA_LOAD_SECONDS),
+                             ('prompt_eval_duration', metrics.OLLAMA_PROMPT_EVAL_SECONDS),
+                             ('eval_duration', metrics.OLLAMA_EVAL_SECONDS)):
+        if response.get(field) is not None:
+            histogram.observe(response.get(field) / 1e9, **labels)
+    for field, histogram in (('prompt_eval_count', metrics.OLLAMA_PROMPT_EVAL_TOKENS),
+                             ('eval_count', metrics.OLLAMA_EVAL_TOKENS)):
+        if response.get(field) is not None:
+            histogram.observe(response.get(field), **labels)
+
+class JsonObjectTracker:
+    """
+    Incrementally scans streamed text and reports when the first top-level JSON object is complete,
+    so a streaming generation can be cancelled instead of running on to the output cap.
+    """
+
+    def __init__(self):
+        self.depth = 0
+        self.started = False
+        self.in_string = False
+        self.escaped = False
+
+    def feed(self, text: str) -> bool:
+        """Consume the next chunk of text; returns True once a complete object has been seen."""
+        for char in text:
+            if self.in_string:
+                if self.escaped:
+                    self.escaped = False
+                elif char == '\\':
+                    self.escaped = True
+                elif char == '"':
+                    self.in_string = False
+            elif char == '"':
+                self.in_string = self.started
+            elif char == '{':
+                self.started = True
+                self.depth += 1
+            elif char == '}' and self.started:
+                self.depth -= 1
+                if self.depth == 0:
+                    return True
+        return False
+
+class StreamCollector:
+    """
+    Collects a streamed chat response and decides when to stop reading it: at Ollama's final chunk,
+    or as soon as a complete JSON object has arrived.
+    """
+
+    def __init__(self):
+        self.tracker = JsonObjectTracker()
+        self.parts = []
+        self.tokens = 0
+        self.final = None
+
+    def add(self, chunk) -> bool:
+        """Consume the next chunk; returns True once the stream should be closed."""
+        self.tokens += 1
+        self.parts.append(chunk['message']['content'])
+        if chunk.get('done'):
+            self.final = chunk
+            return True
+        return self.tracker.feed(self.parts[-1])
+
+    @property
+    def text(self) -> str:
+        return "".join(self.parts)
 
 class OllamaHandler:
     """
     Handler class for interacting with the Ollama API to analyze file content and suggest file names.
     """
 
-    def __init__(self, host=OLLAMA_HOST, model=OLLAMA_MODEL):
+    def __init__(self, host=None, model=OLLAMA_MODEL, cascade=OLLAMA_MODEL_CASCADE, hosts=OLLAMA_HOSTS):
         """
-        Initialize the Ollama client with the specified host and model.
-        Ensures the required model is available locally.
+        Initialize the Ollama clients with the specified hosts and model.
+        Starts a background check that the required models are available; see model_status and
+        recheck_models.
 
         Args:
-            host (str): The Ollama server host.
-            model (str): The Ollama model to use.
+            host (str, optional): A single Ollama server host; overrides hosts.
+            hosts (list[str]): Ollama server hosts to balance requests across.
+            model (str): The Ollama model to use first.
+            cascade (list[str]): Models to escalate low-confidence analyses to, in order.
         """
-        self.client = ollama.Client(host=host)
+        # Requests are spread over a pool of hosts; a single host is just a pool of one
+        self.pool = HostPool([host] if host else hosts)
+        self.pool.start_health_checks()
+        # Stops requests while Ollama keeps failing; callers get OllamaUnavailableError instead
+        self.breaker = CircuitBreaker()
+        # Every Ollama call waits for a slot here, so interactive requests skip ahead of bulk jobs
+        self.scheduler = PriorityScheduler()
+        # Tunes the scheduler's in-flight limit from observed throughput, latency and errors
+        self.concurrency = AIMDController(self.scheduler)
         self.model = model
-        self.ensure_model()
+        self.models = [model] + [cascade_model for cascade_model in cascade if cascade_model != model]
+        # Cached results depend on every model in the cascade, not just the first
+        self.cache_model_key = ">".join(self.models)
+        self._tier_stats = [{"calls": 0, "escalations": 0, "seconds": 0.0} for _ in self.models]
+        self.cache = AnalysisCache()
+        # Concurrent analyses of the same content share one Ollama call
+        self._inflight = SingleFlight()
+        # Running totals of prompt tokens Ollama had to evaluate (cached prefix tokens are not counted)
+        self._usage_lock = threading.Lock()
+        self._usage = {"calls": 0, "prompt_eval_count": 0, "last_prompt_eval_count": None,
+                       "eval_count": 0, "output_tokens_saved": 0, "cancelled_streams": 0,
+                       "repaired_responses": 0}
+        # Model residency: when the loaded model is expected to expire, and the last request time
+        self._keep_alive_seconds = parse_keep_alive(OLLAMA_KEEP_ALIVE)
+        self._loaded_until = 0.0
+        self._last_activity = time.monotonic()
+        self._warm_lock = threading.Lock()
+        self._loads = {"events": 0, "seconds": 0.0, "last_seconds": None, "last_model": None, "unloads": 0}
+        if OLLAMA_IDLE_UNLOAD_SECONDS > 0:
+            threading.Thread(target=self._idle_unload_loop, daemon=True).start()
+        # 'warming' until the background model check finishes, then 'ready' or 'degraded'
+        self.model_status = "warming"
+        self.model_status_message = "Checking that Ollama models are available."
+        self._model_check_lock = threading.Lock()
+        self._model_check_running = True
+        self._model_checked_at = time.monotonic()
+        # Checking (and possibly pulling) models can take minutes, so never block startup on it
+        threading.Thread(target=self.ensure_model, daemon=True).start()
 
     def ensure_model(self):
         """
-        Ensure the specified Ollama model is pulled and ready for use.
-        Pulls the model via subprocess; logs errors if any occur.
+        Ensure the required Ollama models are available on every host, pulling only the missing ones.
+        Presence is checked through the client API, so nothing touches the registry when the models
+        are already there. Progress is reported through model_status and model_status_message.
         """
         try:
-            # Use subprocess to pull the model to ensure it's downloaded locally
-            subprocess.run(["ollama", "pull", self.model], check=True)
-            print(f"Ollama model '{self.model}' is ready.")
-        except Exception as e:
-            # Log any errors during model pulling; client may fail if model is missing
-            print(f"Error pulling model '{self.model}': {e}")
+            self._check_models()
+        finally:
+            with self._model_check_lock:
+                self._model_check_running = False
+                self._model_checked_at = time.monotonic()
+
+    def recheck_models(self):
+        """
+        Re-run the model check in the background if the last one failed, for instance because Ollama
+        was not up yet when the backend started. Runs at most once per MODEL_RECHECK_SECONDS and never
+        twice at the same time, so it is cheap to call on every health probe.
+        """
+        with self._model_check_lock:
+            if (self.model_status != "degraded" or self._model_check_running
+                    or time.monotonic() - self._model_checked_at < MODEL_RECHECK_SECONDS):
+                return
+            self._model_check_running = True
+        print("Re-checking Ollama models after a failed check.")
+        threading.Thread(target=self.ensure_model, daemon=True).start()
+
+    def _check_models(self):
+        """Check and pull the required models; see ensure_model."""
+        required = list(self.models)
+        if EMBEDDING_CLASSIFIER_ENABLED:
+            required.append(EMBEDDING_MODEL)
+
+        problems = []
+        for host in self.pool.hosts:
+            for model in required:
+                try:
+                    try:
+                        host.client.show(model)
+                    except ollama.ResponseError as e:
+                        if e.status_code != 404:
+                            raise
+                        self.model_status_message = f"Pulling Ollama model '{model}' on {host.url}."
+                        print(f"Ollama model '{model}' is missing on {host.url}; pulling it.")
+                        # Streamed so the request timeout applies per progress update, not to the whole download
+                        for _ in host.client.pull(model, stream=True):
+                            pass
+                    print(f"Ollama model '{model}' is ready on {host.url}.")
+                except Exception as e:
+                    # Log any errors; requests to this host may fail until the model is available
+                    print(f"Error preparing model '{model}' on {host.url}: {e}")
+                    problems.append(f"'{model}' on {host.url}: {e}")
+
+        if problems:
+            self.model_status = "degraded"
+            self.model_status_message = "Some Ollama models are unavailable: " + "; ".join(problems)
+        else:
+            self.model_status = "ready"
+            self.model_status_message = "Ollama models are ready."
+        if OLLAMA_WARM_UP:
+            # Load the model now so the first organize run does not pay for it
+            self.warm_up()
+
+    def warm_up(self, background: bool = False):
+        """
+        Load the first cascade model on every healthy host with a tiny request, unless it
+        should still be resident from recent activity.
+
+        Args:
+            background (bool): Return immediately and warm up on a separate thread.
+        """
+        if background:
+            threading.Thread(target=self.warm_up, daemon=True).start()
+            return
+        with self._warm_lock:
+            if time.monotonic() < self._loaded_until:
+                return
+            loaded = False
+            for host in self.pool.hosts:
+                if not host.healthy:
+                    continue
+                try:
+                    # An empty prompt loads the model without generating anything
+                    started = time.perf_counter()
+                    response = host.client.generate(model=self.model, prompt="", keep_alive=OLLAMA_KEEP_ALIVE)
+                    observe_call("warm_up", self.model, response, time.perf_counter() - started)
+                    self._record_load(response)
+                    loaded = True
+                except Exception as e:
+                    print(f"Error warming up model '{self.model}' on {host.url}: {e}")
+            if loaded:
+                # Only a model that actually loaded is resident; otherwise the next job tries again
+                self._touch()
+
+    def unload(self):
+        """Ask every host to unload the cascade models now, giving their memory back."""
+        with self._warm_lock:
+            for host in self.pool.hosts:
+                for model in self.models:
+                    try:
+                        host.client.generate(model=model, prompt="", keep_alive=0)
+                    except Exception as e:
+                        print(f"Error unloading model '{model}' on {host.url}: {e}")
+            self._loaded_until = 0.0
+            self._loads["unloads"] += 1
+        print(f"Unloaded Ollama models after {OLLAMA_IDLE_UNLOAD_SECONDS}s idle.")
+
+    def _idle_unload_loop(self):
+        """Unload the models once no request has been made for OLLAMA_IDLE_UNLOAD_SECONDS."""
+        interval = max(1.0, min(60.0, OLLAMA_IDLE_UNLOAD_SECONDS / 4))
+        while True:
+            time.sleep(interval)
+            idle = time.monotonic() - self._last_activity
+            if self._loaded_until > 0 and idle >= OLLAMA_IDLE_UNLOAD_SECONDS:
+                self.unload()
+
+    def _touch(self):
+        """Record request activity, which extends how long the model stays resident."""
+        now = time.monotonic()
+        self._last_activity = now
+        self._loaded_until = now + self._keep_alive_seconds
+
+    def _record_load(self, response):
+        """Count a model load event when Ollama reports a noticeable load_duration (nanoseconds)."""
+        load_seconds = (response.get('load_duration') or 0) / 1e9
+        if load_seconds < MODEL_LOAD_EVENT_SECONDS:
+            return
+        with self._usage_lock:
+            self._loads["events"] += 1
+            self._loads["seconds"] += load_seconds
+            self._loads["last_seconds"] = round(load_seconds, 3)
+            self._loads["last_model"] = response.get('model')
+        print(f"Ollama loaded model '{response.get('model')}' in {load_seconds:.2f}s.")
+
+    def load_stats(self) -> dict:
+        """Return model load events reported by Ollama, and whether the model is expected to be resident."""
+        with self._usage_lock:
+            stats = dict(self._loads)
+        stats["seconds"] = round(stats["seconds"], 3)
+        stats["resident"] = time.monotonic() < self._loaded_until
+        stats["idle_seconds"] = round(time.monotonic() - self._last_activity, 1)
+        return stats
+
+    def _chat_request(self, messages: list[dict], format=None, num_predict: int = None, stop: list[str] = None,
+                      model: str = None) -> dict:
+        """
+        Build the keyword arguments for a chat request. A fixed num_ctx keeps the model from being
+        reloaded with a different context size, keep_alive keeps it (and its prompt cache) resident,
+        and num_predict caps how many tokens a rambling model can generate.
+        """
+        options = {"num_ctx": OLLAMA_NUM_CTX}
+        if num_predict:
+            options["num_predict"] = num_predict
+        if stop:
+            options["stop"] = stop
+        request = {"model": model or self.model, "messages": messages, "options": options, "keep_alive": OLLAMA_KEEP_ALIVE}
+        if format is not None:
+            request["format"] = format
+        return request
 
-    def analyze_content(self, content: str) -> dict:
+    def _chat(self, kind: str, messages: list[dict], format=None, num_predict: int = None, stop: list[str] = None,
+              model: str = None) -> str:
+        """
+        Send a chat request to the least-loaded host and return the generated text.
+        JSON requests are streamed when OLLAMA_STREAM_RESPONSES is set and the stream is closed as
+        soon as a complete object has arrived, which makes Ollama stop generating.
+        Transient failures are retried with jittered backoff, each attempt on a freshly picked host.
+        """
+        request = self._chat_request(messages, format, num_predict, stop, model)
+        stream = OLLAMA_STREAM_RESPONSES and format is not None
+        return self._with_retries(kind, lambda: self._chat_once(kind, request, num_predict, stream))
+
+    def _with_retries(self, kind: str, send):
+        """
+        Call send() through the circuit breaker, retrying transient failures with jittered backoff.
+        Each attempt waits for a scheduler slot in the caller's lane (see scheduler.lane); the slot is
+        not held while backing off.
+
+        Raises:
+            OllamaUnavailableError: The breaker is open or every attempt failed.
+        """
+        last_error = None
+        for attempt in range(OLLAMA_MAX_RETRIES + 1):
+            if attempt:
+                time.sleep(retry_delay(attempt))
+            with self.scheduler.slot():
+                started = self._begin_attempt(kind)
+                try:
+                    result = send()
+                except BaseException as e:
+                    if self._settle_attempt(kind, attempt, started, e):
+                        last_error = e
+                        continue
+                    raise
+                self._settle_attempt(kind, attempt, started)
+                return result
+        raise OllamaUnavailableError(f"Ollama {kind} request failed after {OLLAMA_MAX_RETRIES + 1} attempts.") from last_error
+
+    def _begin_attempt(self, kind: str) -> float:
+        """
+        Let one attempt through the circuit breaker; callers hold a scheduler slot.
+
+        Returns:
+            float: The attempt's start time (perf_counter), for _settle_attempt.
+
+        Raises:
+            OllamaUnavailableError: The breaker is open.
+        """
+        if not self.breaker.allow():
+            raise OllamaUnavailableError(f"Ollama is unavailable; {kind} request not sent.")
+        return time.perf_counter()
+
+    def _settle_attempt(self, kind: str, attempt: int, started: float, error: BaseException = None) -> bool:
+        """
+        Report the outcome of one attempt to the circuit breaker and the concurrency controller.
+
+        Returns:
+            bool: True if error is transient and the call should be retried; otherwise the caller
+                  returns its result, or re-raises error.
+        """
+        if error is None:
+            self.breaker.record_success()
+            self.concurrency.record(kind, time.perf_counter() - started, ok=True)
+            # Ollama answers again, so a model check that failed while it was down is worth repeating
+            self.recheck_models()
+            return False
+        if not isinstance(error, Exception):
+            # Cancelled or interrupted: no verdict on Ollama, but a reserved trial must be given back
+            self.breaker.abandon()
+            return False
+        if not is_transient_error(error):
+            # Ollama answered, so it is healthy; the request itself was bad
+            self.breaker.record_success()
+            return False
+        self.breaker.record_failure()
+        self.concurrency.record(kind, time.perf_counter() - started, ok=False)
+        print(f"Ollama {kind} call failed (attempt {attempt + 1} of {OLLAMA_MAX_RETRIES + 1}): {error!r}")
+        return True
+
+    def _chat_once(self, kind: str, request: dict, num_predict: int, stream: bool) -> str:
+        """Send one chat request attempt; see _chat."""
+        started = time.perf_counter()
+        with self.pool.acquire() as host:
+            if not stream:
+                return self._response_text(kind, request, host.client.chat(**request), num_predict, started)
+            chunks = host.client.chat(stream=True, **request)
+            collector = StreamCollector()
+            try:
+                for chunk in chunks:
+                    if collector.add(chunk):
+                        break
+            finally:
+                # Closing the stream drops the connection, which cancels the generation server-side
+                chunks.close()
+        return self._stream_text(kind, request, collector, num_predict, started)
+
+    def _response_text(self, kind: str, request: dict, response, num_predict: int, started: float) -> str:
+        """Record usage for a complete chat response and return its text."""
+        self._record_usage(kind, response, num_predict, seconds=time.perf_counter() - started, model=request["model"])
+        return response['message']['content']
+
+    def _stream_text(self, kind: str, request: dict, collector: StreamCollector, num_predict: int, started: float) -> str:
+        """Record usage for a streamed chat response and return its text."""
+        self._record_usage(kind, collector.final or {"eval_count": collector.tokens}, num_predict,
+                           cancelled=collector.final is None, seconds=time.perf_counter() - started,
+                           model=request["model"])
+        return collector.text
+
+    async def _chat_async(self, kind: str, messages: list[dict], format=None, num_predict: int = None,
+                          stop: list[str] = None, model: str = None) -> str:
+        """Async variant of _chat built on ollama.AsyncClient."""
+        request = self._chat_request(messages, format, num_predict, stop, model)
+        stream = OLLAMA_STREAM_RESPONSES and format is not None
+        return await self._with_retries_async(kind, lambda: self._chat_once_async(kind, request, num_predict, stream))
+
+    async def _with_retries_async(self, kind: str, send):
+        """Async variant of _with_retries; send() returns an awaitable."""
+        last_error = None
+        for attempt in range(OLLAMA_MAX_RETRIES + 1):
+            if attempt:
+                await asyncio.sleep(retry_delay(attempt))
+            async with self.scheduler.slot_async():
+                started = self._begin_attempt(kind)
+                try:
+                    result = await send()
+                except BaseException as e:
+                    if self._settle_attempt(kind, attempt, started, e):
+                        last_error = e
+                        continue
+                    raise
+                self._settle_attempt(kind, attempt, started)
+                return result
+        raise OllamaUnavailableError(f"Ollama {kind} request failed after {OLLAMA_MAX_RETRIES + 1} attempts.") from last_error
+
+    async def _chat_once_async(self, kind: str, request: dict, num_predict: int, stream: bool) -> str:
+        """Async variant of _chat_once."""
+        started = time.perf_counter()
+        with self.pool.acquire() as host:
+            client = host.async_client()
+            if not stream:
+                return self._response_text(kind, request, await client.chat(**request), num_predict, started)
+            chunks = await client.chat(stream=True, **request)
+            collector = StreamCollector()
+            try:
+                async for chunk in chunks:
+                    if collector.add(chunk):
+                        break
+            finally:
+                await chunks.aclose()
+        return self._stream_text(kind, request, collector, num_predict, started)
+
+    def _drive(self, steps):
+        """
+        Run a conversation generator such as _cascade: send each chat request (_chat keyword
+        arguments) it yields and hand back the reply, or throw the error into it.
+
+        Returns:
+            The generator's return value.
+        """
+        reply, error = None, None
+        while True:
+            try:
+                request = steps.throw(error) if error is not None else steps.send(reply)
+            except StopIteration as stop:
+                return stop.value
+            reply, error = None, None
+            try:
+                reply = self._chat(**request)
+            except Exception as e:
+                error = e
+
+    async def _drive_async(self, steps):
+        """Async variant of _drive."""
+        reply, error = None, None
+        while True:
+            try:
+                request = steps.throw(error) if error is not None else steps.send(reply)
+            except StopIteration as stop:
+                return stop.value
+            reply, error = None, None
+            try:
+                reply = await self._chat_async(**request)
+            except Exception as e:
+                error = e
+
+    def _analysis_messages(self, content: str) -> list[dict]:
+        """Build the chat messages for categorizing the given file content."""
+        return [
+            {'role': 'system', 'content': ANALYSIS_SYSTEM_PROMPT},
+            {'role': 'user', 'content': f"File Content to Analyze:\n{content}"},
+        ]
+
+    def _batch_messages(self, contents: list[str]) -> list[dict]:
+        """Build the chat messages for categorizing several numbered documents at once."""
+        documents = "\n\n".join(
+            f"### Document {document_id}\n{content}" for document_id, content in enumerate(contents, start=1)
+        )
+        return [
+            {'role': 'system', 'content': BATCH_ANALYSIS_SYSTEM_PROMPT},
+            {'role': 'user', 'content': f"Documents to Analyze:\n{documents}"},
+        ]
+
+    def _rename_messages(self, content: str, current_name: str) -> list[dict]:
+        """Build the chat messages for renaming the given file content."""
+        return [
+            {'role': 'system', 'content': RENAME_SYSTEM_PROMPT},
+            {'role': 'user', 'content': (
+                f"Current File Name (for context, but focus on content): '{current_name}'\n"
+                f"File Content:\n{content}"
+            )},
+        ]
+
+    def _record_usage(self, kind: str, response, num_predict: int = None, cancelled: bool = False,
+                      seconds: float = None, model: str = None):
+        """
+        Log and tally token counts for a call, and feed Ollama's timings into the metrics histograms.
+        prompt_eval_count stays close to the size of the file content alone when the static system
+        prompt is served from Ollama's prompt cache. Output tokens saved are measured against the
+        num_predict cap. Cancelled streams never receive Ollama's final counters, so their
+        prompt_eval_count is unknown and eval_count is the number of chunks received.
+        """
+        self._touch()
+        self._record_load(response)
+        observe_call(kind, model or self.model, response, seconds)
+        prompt_eval_count = response.get('prompt_eval_count')
+        eval_count = response.get('eval_count') or 0
+        saved = max(num_predict - eval_count, 0) if num_predict else 0
+        with self._usage_lock:
+            self._usage["calls"] += 1
+            self._usage["prompt_eval_count"] += prompt_eval_count or 0
+            self._usage["last_prompt_eval_count"] = prompt_eval_count
+            self._usage["eval_count"] += eval_count
+            self._usage["output_tokens_saved"] += saved
+            self._usage["cancelled_streams"] += int(cancelled)
+        print(
+            f"Ollama {kind} call: prompt_eval_count={prompt_eval_count if prompt_eval_count is not None else 'n/a'}, "
+            f"eval_count={eval_count}, output tokens saved={saved}{' (stream cancelled)' if cancelled else ''}"
+        )
+
+    def _parse_analysis(self, response_text: str) -> dict:
+        """Parse and repair a single-file analysis response; raises ValueError if it is not JSON at all."""
+        return self._repair(parse_json_object(response_text))
+
+    def _repair(self, analysis: dict) -> dict:
+        """Normalize an analysis locally and count the ones that needed fixing."""
+        repaired, changed = repair_analysis(analysis)
+        if changed:
+            with self._usage_lock:
+                self._usage["repaired_responses"] += 1
+            print(f"Repaired Ollama analysis {analysis!r} -> {repaired!r}")
+        return repaired
+
+    def usage_stats(self) -> dict:
+        """Return prompt and output token counters across all calls."""
+        with self._usage_lock:
+            stats = dict(self._usage)
+        stats["avg_prompt_eval_count"] = round(stats["prompt_eval_count"] / stats["calls"], 1) if stats["calls"] else 0.0
+        return stats
+
+    def budget_content(self, content: str, extension: str = None) -> str:
+        """
+        Sample content down to the token budget for its file extension so prompt size,
+        and therefore classification latency, stays bounded regardless of file size.
+
+        Args:
+            content (str): The full file content.
+            extension (str, optional): File extension (without dot) used to pick a budget override.
+
+        Returns:
+            str: The content to put into the prompt.
+        """
+        token_budget = CONTENT_TOKEN_BUDGET_OVERRIDES.get((extension or '').lower(), CONTENT_TOKEN_BUDGET)
+        return sample_content(content, token_budget * CHARS_PER_TOKEN)
+
+    def analyze_content(self, content: str, extension: str = None) -> dict:
         """
         Analyze the given file content to determine its category and suggest a new file name.
 
         Args:
             content (str): The textual content of the file to analyze.
+            extension (str, optional): File extension (without dot), used to pick the content budget.
 
         Returns:
             dict: A dictionary with keys 'category' (str) and 'new_name_suggestion' (str or None).
                   If category is 'Miscellaneous', 'new_name_suggestion' will be None.
+
+        Raises:
+            OllamaUnavailableError: Ollama is unreachable, so no category could be determined.
+        """
+        content, content_hash, cached = self._lookup(content, extension)
+        if cached is not None:
+            return cached
+        # Copies, since callers may annotate the result they get back
+        return dict(self._inflight.do(self._flight_key(content_hash),
+                                      lambda: self._analyze_uncached(content, content_hash)))
+
+    def _lookup(self, content: str, extension: str = None) -> tuple:
+        """
+        Budget content for its extension and look it up in the analysis cache.
+
+        Returns:
+            tuple: (budgeted content, its hash, the cached analysis or None).
         """
-        category_rules = """
-        - 'Business': Business plans, reports, proposals, meeting minutes, strategies, marketing materials.
-            - Name Suggestion: Focus on type and topic (e.g., 'Q3 Business Review', 'Marketing Strategy Plan').
-        - 'Code': Programming source code (Python, JavaScript, C++, Java, etc.), scripts, configuration files, algorithms.
-            - Name Suggestion: Based on function, language, or project part (e.g., 'Python API Handler', 'Web Component Logic', 'Database Schema').
-        - 'Creative': Articles, stories, poems, scripts (film/play), design briefs, artistic concepts, personal journals.
-            - Name Suggestion: Reflect the creative work's title or main theme (e.g., 'SciFi Short Story Draft', 'Poetry Collection Ideas').
-        - 'Data': Spreadsheets, CSVs, JSON, XML, database dumps, statistical reports, analytical data sets.
-            - Name Suggestion: Describe the data's content or source (e.g., 'Sales Data Q1', 'Customer Survey Results', 'Website Traffic Log').
-        - 'Education': Lecture notes, assignments, research papers, study guides, course materials, educational articles.
-            - Name Suggestion: Based on subject, course, or assignment (e.g., 'Calculus Lecture 5', 'History Essay Civil War', 'Biology Study Notes').
-        - 'Financial': Budgets, invoices, receipts, expense reports, tax documents, bank statements, investment summaries.
-            - Name Suggestion: Specific to the financial transaction/period (e.g., 'Monthly Budget July 2025', 'Invoice Client X', 'Tax Returns 2024').
-        - 'Images': Descriptions or metadata about images, image lists, photo albums (not the image data itself).
-            - Name Suggestion: Describe the subject or event (e.g., 'Vacation Photos Italy', 'Product Shots Catalog').
-        - 'Legal': Contracts, agreements, policies, legal briefs, court documents, terms of service.
-            - Name Suggestion: Reflect parties and type of document (e.g., 'Client Service Agreement', 'NDA Draft').
-        - 'Logs': System logs, application logs, error reports, debugging output.
-            - Name Suggestion: Reflect origin and date/time (e.g., 'Server Error Log 2025-07-10', 'App Crash Report').
-        - 'Personal': Resumes, cover letters, personal notes, health records, medical information, diaries, family documents.
-            - Name Suggestion: Specific and personal (e.g., 'My Resume Updated', 'Doctor Visit Summary', 'Family Photo Album Notes').
-        - 'Presentations': Outlines, scripts, or content for slideshows/presentations.
-            - Name Suggestion: Title of presentation (e.g., 'Annual Sales Pitch', 'Project Status Meeting Slides').
-        - 'Miscellaneous': For content that is empty, too brief, cannot be clearly identified, or does not fit any other category.
-            - Name Suggestion: In this case, `new_name_suggestion` MUST be `null`.
-        """
-
-        prompt = f"""
-        You are a highly skilled AI assistant specializing in file organization. Your primary task is to carefully analyze the provided "File Content" and assign it the single most appropriate category from the predefined list below. In addition, you must suggest a concise and descriptive new file name (without extension) that accurately reflects the content.
-
-        **Predefined Categories & Naming Guidelines:**
-        {category_rules.strip()}
-
-        **Output Format:**
-        Your response MUST be a valid JSON object. Do not include any extra text, comments, or markdown outside the JSON.
-        The JSON object MUST contain exactly these two keys:
-        - `"category"`: (string) The determined category (e.g., 'Code', 'Financial', 'Business').
-        - `"new_name_suggestion"`: (string or null) A suggested new file name (maximum 7 words, no file extension). If the category is 'Miscellaneous', this value MUST be `null`.
-
-        ---
-        File Content to Analyze:
-        {content}
-        ---
+        content = self.budget_content(content, extension)
+        # Serve repeat analyses of identical content from the on-disk cache
+        content_hash = AnalysisCache.hash_content(content)
+        return content, content_hash, self.cache.get(content_hash, self.cache_model_key, ANALYSIS_PROMPT_VERSION)
+
+    def _flight_key(self, content_hash: str) -> tuple:
+        """Key identifying one analysis: the same content, cascade and prompt give the same answer."""
+        return (content_hash, self.cache_model_key, ANALYSIS_PROMPT_VERSION)
+
+    def coalescing_stats(self) -> dict:
+        """Return how many analyses joined an identical one already in flight."""
+        return self._inflight.stats()
+
+    def _analyze_uncached(self, content: str, content_hash: str, start_tier: int = 0, previous: dict = None) -> dict:
+        """Run the model cascade for already budgeted content; see _cascade."""
+        return self._drive(self._cascade(content, content_hash, start_tier, previous))
+
+    async def _analyze_uncached_async(self, content: str, content_hash: str, start_tier: int = 0,
+                                      previous: dict = None) -> dict:
+        """Async variant of _analyze_uncached."""
+        return await self._drive_async(self._cascade(content, content_hash, start_tier, previous))
+
+    def _cascade(self, content: str, content_hash: str, start_tier: int = 0, previous: dict = None):
         """
+        Model cascade for already budgeted content, as a generator run by _drive or _drive_async:
+        it yields chat requests and receives their replies. The final result is cached.
+        Each tier answers in turn until one is confident; if a later tier fails, the previous
+        tier's answer is returned but not cached.
+
+        Raises:
+            OllamaUnavailableError: Ollama is unreachable and no tier has answered.
+        """
+        analysis = previous
+        complete = True
+        for tier in range(start_tier, len(self.models)):
+            started = time.perf_counter()
+            try:
+                # Send the prompt to Ollama API requesting JSON output for easier parsing
+                response_text = yield {"kind": "analyze", "messages": self._analysis_messages(content),
+                                       "format": ANALYSIS_RESPONSE_SCHEMA, "num_predict": ANALYSIS_NUM_PREDICT,
+                                       "model": self.models[tier]}
+                analysis = self._parse_analysis(response_text)
+            except OllamaUnavailableError:
+                self._record_tier(tier, time.perf_counter() - started, escalated=False)
+                if analysis is None:
+                    # Nothing to fall back on; let the caller wait for Ollama instead of guessing
+                    raise
+                complete = False
+                break
+            except Exception as e:
+                print(f"Error communicating with Ollama model '{self.models[tier]}': {e}")
+                self._record_tier(tier, time.perf_counter() - started, escalated=False)
+                complete = False
+                break
+            escalated = self._needs_escalation(tier, analysis)
+            self._record_tier(tier, time.perf_counter() - started, escalated)
+            if not escalated:
+                break
+
+        if analysis is None:
+            # On failure, return default category with no suggestion
+            return {"category": "Miscellaneous", "new_name_suggestion": None}
+        if complete:
+            # Cache the final answer for future runs
+            self.cache.put(content_hash, self.cache_model_key, ANALYSIS_PROMPT_VERSION, analysis)
+        return analysis
+
+    def _needs_escalation(self, tier: int, analysis: dict) -> bool:
+        """Whether an answer from the given tier should be handed to the next model in the cascade."""
+        if tier + 1 >= len(self.models):
+            return False
         try:
-            # Send the prompt to Ollama API requesting JSON output for easier parsing
-            response = self.client.chat(
-                model=self.model,
-                messages=[{'role': 'user', 'content': prompt}],
-                format='json'  # Request JSON output from Ollama
-            )
-            import json
-            # Parse and return the JSON response from Ollama
-            return json.loads(response['message']['content'])
+            confidence = float(analysis.get("confidence", 0.0))
+        except (TypeError, ValueError):
+            confidence = 0.0
+        return analysis.get("category") == "Miscellaneous" or confidence < CASCADE_CONFIDENCE_THRESHOLD
+
+    def _record_tier(self, tier: int, seconds: float, escalated: bool, calls: int = 1):
+        """Tally calls, latency and escalations for one cascade tier."""
+        with self._usage_lock:
+            stats = self._tier_stats[tier]
+            stats["calls"] += calls
+            stats["seconds"] += seconds
+            stats["escalations"] += int(escalated)
+
+    def cascade_stats(self) -> list[dict]:
+        """Return per-tier call counts, escalation rates and average latency."""
+        with self._usage_lock:
+            tiers = [dict(stats) for stats in self._tier_stats]
+        return [
+            {
+                "model": model,
+                "calls": stats["calls"],
+                "escalations": stats["escalations"],
+                "escalation_rate": round(stats["escalations"] / stats["calls"], 4) if stats["calls"] else 0.0,
+                "avg_seconds": round(stats["seconds"] / stats["calls"], 4) if stats["calls"] else 0.0,
+            }
+            for model, stats in zip(self.models, tiers)
+        ]
+
+    def analyze_batch(self, contents: list[str], extensions: list[str] = None) -> list[dict]:
+        """
+        Classify several small documents with a single Ollama request, amortizing the
+        per-request overhead that dominates for short files.
+        Documents missing from the returned array, or with malformed entries, fall back to
+        single-file classification. Documents already being analyzed elsewhere are not sent again;
+        their result is taken from the call in flight.
+
+        Args:
+            contents (list[str]): File contents to analyze.
+            extensions (list[str], optional): File extension for each content, used to pick content budgets.
+
+        Returns:
+            list[dict]: Analysis results in the same order as contents, each in the analyze_content format.
+
+        Raises:
+            OllamaUnavailableError: Ollama is unreachable.
+        """
+        extensions = extensions or [None] * len(contents)
+        results = [None] * len(contents)
+
+        # Serve what we can from the cache; only the misses go into the batch prompt
+        pending = []
+        joined = []
+        for index, (content, extension) in enumerate(zip(contents, extensions)):
+            content = self.budget_content(content, extension)
+            content_hash = AnalysisCache.hash_content(content)
+            cached = self.cache.get(content_hash, self.cache_model_key, ANALYSIS_PROMPT_VERSION)
+            if cached is not None:
+                results[index] = cached
+                continue
+            call, leader = self._inflight.begin(self._flight_key(content_hash))
+            if leader:
+                pending.append((index, content, content_hash))
+            else:
+                joined.append((index, call, content, content_hash))
+
+        try:
+            self._analyze_batch_uncached(pending, results)
+        except BaseException as e:
+            for index, content, content_hash in pending:
+                self._inflight.fail(self._flight_key(content_hash), e)
+            raise
+        for index, content, content_hash in pending:
+            self._inflight.finish(self._flight_key(content_hash), results[index])
+            results[index] = dict(results[index])
+        for index, call, content, content_hash in joined:
+            try:
+                results[index] = dict(call.wait())
+            except LeaderAbandoned:
+                # The other caller was cancelled; analyze this content ourselves (or join a new leader)
+                results[index] = dict(self._inflight.do(self._flight_key(content_hash),
+                                                        lambda: self._analyze_uncached(content, content_hash)))
+        return results
+
+    def _analyze_batch_uncached(self, pending: list[tuple], results: list):
+        """
+        Classify (index, budgeted content, content hash) entries with one batch request and
+        store each analysis in results[index].
+        """
+        if len(pending) == 1:
+            index, content, content_hash = pending[0]
+            results[index] = self._analyze_uncached(content, content_hash)
+            return
+        if not pending:
+            return
+
+        batch_results = {}
+        started = time.perf_counter()
+        try:
+            response_text = self._chat("batch", self._batch_messages([content for _, content, _ in pending]),
+                                       format=BATCH_RESPONSE_SCHEMA,
+                                       num_predict=BATCH_NUM_PREDICT_PER_FILE * len(pending))
+            entries = parse_json_object(response_text).get("results", [])
+            for entry in entries:
+                # Keep only entries that refer to a document in this batch and name some category
+                if (isinstance(entry, dict) and isinstance(entry.get("id"), int)
+                        and 1 <= entry["id"] <= len(pending) and isinstance(entry.get("category"), str)):
+                    document_id = entry.pop("id")
+                    batch_results[document_id] = self._repair(entry)
+        except OllamaUnavailableError:
+            self._record_tier(0, time.perf_counter() - started, escalated=False, calls=len(pending))
+            raise
         except Exception as e:
-            # On failure, log error and return default category with no suggestion
-            print(f"Error communicating with Ollama: {e}")
-            return {"category": "Miscellaneous", "new_name_suggestion": None}
+            print(f"Error communicating with Ollama for batch of {len(pending)} files: {e}")
+        # A batch counts as one first-tier call per file
+        self._record_tier(0, time.perf_counter() - started, escalated=False, calls=len(pending))
 
-    def suggest_rename(self, content: str, current_name: str) -> str:
+        fallbacks = 0
+        for document_id, (index, content, content_hash) in enumerate(pending, start=1):
+            analysis = batch_results.get(document_id)
+            if analysis is None:
+                # Missing or malformed entry: classify this file on its own
+                fallbacks += 1
+                results[index] = self._analyze_uncached(content, content_hash)
+            elif self._needs_escalation(0, analysis):
+                # Low-confidence batch answer: continue the cascade from the second model
+                self._record_tier(0, 0.0, escalated=True, calls=0)
+                results[index] = self._analyze_uncached(content, content_hash, start_tier=1, previous=analysis)
+            else:
+                self.cache.put(content_hash, self.cache_model_key, ANALYSIS_PROMPT_VERSION, analysis)
+                results[index] = analysis
+        if fallbacks:
+            print(f"Batch classification fell back to single-file analysis for {fallbacks} of {len(pending)} files.")
+
+    async def analyze_content_async(self, content: str, extension: str = None) -> dict:
+        """
+        Async variant of analyze_content built on ollama.AsyncClient.
+
+        Args:
+            content (str): The textual content of the file to analyze.
+            extension (str, optional): File extension (without dot), used to pick the content budget.
+
+        Returns:
+            dict: Same format as analyze_content.
+        """
+        content, content_hash, cached = self._lookup(content, extension)
+        if cached is not None:
+            return cached
+        return dict(await self._inflight.do_async(self._flight_key(content_hash),
+                                                  lambda: self._analyze_uncached_async(content, content_hash)))
+
+    async def analyze_many(self, contents: list[str], concurrency: int = OLLAMA_NUM_PARALLEL,
+                           extensions: list[str] = None) -> list[dict]:
+        """
+        Analyze many contents concurrently on a single event loop.
+        At most `concurrency` generations are in flight at once, so the Ollama server's
+        OLLAMA_NUM_PARALLEL slots stay busy without a thread per file.
+
+        Args:
+            contents (list[str]): File contents to analyze.
+            concurrency (int): Maximum number of concurrent Ollama requests.
+            extensions (list[str], optional): File extension for each content, used to pick content budgets.
+
+        Returns:
+            list[dict]: Analysis results in the same order as contents.
+        """
+        semaphore = asyncio.Semaphore(max(1, concurrency))
+        extensions = extensions or [None] * len(contents)
+
+        async def analyze_one(content, extension):
+            async with semaphore:
+                return await self.analyze_content_async(content, extension)
+
+        return await asyncio.gather(*(analyze_one(content, extension) for content, extension in zip(contents, extensions)))
+
+    def embed(self, texts: list[str]) -> list[list[float]]:
+        """
+        Compute embeddings for the given texts with the configured embedding model.
+        Errors are raised to the caller, which decides how to fall back.
+        """
+        def send():
+            started = time.perf_counter()
+            with self.pool.acquire() as host:
+                response = host.client.embed(model=EMBEDDING_MODEL, input=texts, keep_alive=OLLAMA_KEEP_ALIVE)
+            observe_call("embed", EMBEDDING_MODEL, response, time.perf_counter() - started)
+            self._touch()
+            return response
+
+        return self._with_retries("embed", send)['embeddings']
+
+    def suggest_rename(self, content: str, current_name: str, extension: str = None) -> str:
         """
         Suggest a new, concise, and descriptive file name based on file content.
 
         Args:
             content (str): The textual content of the file.
             current_name (str): The current file name (without extension) used as fallback.
+            extension (str, optional): File extension (without dot), used to pick the content budget.
 
         Returns:
             str: A suggested new file name (max 7 words, no extension). Returns current_name if unable to suggest.
+
+        Raises:
+            OllamaUnavailableError: Ollama is unreachable.
+        """
+        return self._drive(self._rename(content, current_name, extension))
+
+    async def suggest_rename_async(self, content: str, current_name: str, extension: str = None) -> str:
         """
-        prompt = f"""
-                You are a file naming assistant. Your goal is to generate a new, highly descriptive, and concise name for a file based on its content.
-
-                **Guidelines:**
-                - The new name MUST be no more than 7 words.
-                - The new name MUST NOT include any file extension.
-                - Focus on the main topic, purpose, or key entities described in the file content.
-                - If the content is too generic, short, or does not provide enough information for a meaningful new name, you MAY suggest the provided `current_name`.
-                - The output MUST be ONLY the suggested file name. DO NOT include any other text, explanations, or markdown.
-
-                ---
-                Current File Name (for context, but focus on content): '{current_name}'
-                File Content:
-                {content}
-                ---
-                """
+        Async variant of suggest_rename built on ollama.AsyncClient.
+
+        Args:
+            content (str): The textual content of the file.
+            current_name (str): The current file name (without extension) used as fallback.
+            extension (str, optional): File extension (without dot), used to pick the content budget.
+
+        Returns:
+            str: Same as suggest_rename.
+        """
+        return await self._drive_async(self._rename(content, current_name, extension))
+
+    def _rename(self, content: str, current_name: str, extension: str = None):
+        """Rename conversation for suggest_rename and suggest_rename_async, run by _drive or _drive_async."""
+        content = self.budget_content(content, extension)
         try:
-            # Request a simple text response with the suggested new name
-            response = self.client.chat(
-                model=self.model,
-                messages=[{'role': 'user', 'content': prompt}],
-            )
-            # Return the text content of the response as the new file name suggestion
-            return response['message']['content'].strip()
+            # Request a simple single-line text response with the suggested new name
+            response_text = yield {"kind": "rename", "messages": self._rename_messages(content, current_name),
+                                   "num_predict": RENAME_NUM_PREDICT, "stop": ["\n"]}
+            # Return the text content of the response as the new file name suggestion; a blank
+            # answer (e.g. the model opened with a newline and hit the stop sequence) keeps the current name
+            return response_text.strip() or current_name
+        except OllamaUnavailableError:
+            raise
         except Exception as e:
             # On failure, log error and fallback to current name
             print(f"Error suggesting rename with Ollama: {e}")
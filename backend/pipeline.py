@@ -0,0 +1,456 @@
+# pipeline.py
+import os
+import re
+import queue
+import threading
+import time
+from config import (
+    PIPELINE_QUEUE_SIZE, PIPELINE_EXTRACT_WORKERS, PIPELINE_CLASSIFY_WORKERS,
+    PIPELINE_PLAN_WORKERS, PIPELINE_MOVE_WORKERS,
+    BATCH_CLASSIFICATION_ENABLED, BATCH_SMALL_FILE_CHARS, BATCH_MAX_CHARS, BATCH_MAX_FILES,
+    PIPELINE_BREAKER_WAIT_SECONDS, OLLAMA_WARM_UP, DUPLICATE_DETECTION_ENABLED, PIPELINE_ORDER_POLICY,
+)
+from circuit_breaker import OllamaUnavailableError
+from duplicate_finder import find_duplicate_groups
+from file_ordering import ORDER_POLICIES, order_files
+from metrics import PIPELINE_STAGE_SECONDS, PIPELINE_FIRST_RESULT_SECONDS
+
+# Sentinel passed down the queues once a stage has no more work
+_DONE = object()
+
+class OrganizePipeline:
+    """
+    Pipelined organize engine shared by the bulk organize endpoints.
+
+    Files flow through scan -> extract -> classify -> plan -> move stages connected by bounded
+    queues, each stage with its own worker threads, so file reads and PDF/DOCX parsing overlap
+    with in-flight Ollama requests instead of waiting for them.
+    """
+
+    def __init__(self, file_operations, ollama_handler, embedding_classifier=None, rule_classifier=None,
+                 near_duplicate_index=None, correction_classifier=None, detect_duplicates=DUPLICATE_DETECTION_ENABLED,
+                 order_policy=PIPELINE_ORDER_POLICY,
+                 extract_workers=PIPELINE_EXTRACT_WORKERS,
+                 classify_workers=PIPELINE_CLASSIFY_WORKERS,
+                 plan_workers=PIPELINE_PLAN_WORKERS,
+                 move_workers=PIPELINE_MOVE_WORKERS,
+                 queue_size=PIPELINE_QUEUE_SIZE):
+        """
+        Args:
+            file_operations (FileOperations): Used to list, read and move files.
+            ollama_handler (OllamaHandler): Used to classify file content.
+            embedding_classifier (EmbeddingClassifier, optional): Fast classifier tried before the chat model.
+            rule_classifier (RuleClassifier, optional): Extension/MIME rules tried before reading the file.
+            near_duplicate_index (NearDuplicateIndex, optional): Reuses classifications of near-identical files.
+            correction_classifier (CorrectionClassifier, optional): Applies categories learned from manual moves.
+            detect_duplicates (bool): Whether byte-identical files are classified once per run.
+            order_policy (str): Default order files are processed in; one of file_ordering.ORDER_POLICIES.
+            extract_workers (int): Threads reading and parsing file content.
+            classify_workers (int): Threads with an Ollama request in flight.
+            plan_workers (int): Threads computing destination folders and names.
+            move_workers (int): Threads moving files into place.
+            queue_size (int): Capacity of each queue between stages.
+        """
+        self.file_operations = file_operations
+        self.ollama_handler = ollama_handler
+        self.embedding_classifier = embedding_classifier
+        self.rule_classifier = rule_classifier
+        self.near_duplicate_index = near_duplicate_index
+        self.correction_classifier = correction_classifier
+        self.detect_duplicates = detect_duplicates
+        self.order_policy = order_policy
+        self.extract_workers = max(1, extract_workers)
+        self.classify_workers = max(1, classify_workers)
+        self.plan_workers = max(1, plan_workers)
+        self.move_workers = max(1, move_workers)
+        self.queue_size = max(1, queue_size)
+        # Moves into the same folder are serialized so conflict renaming stays race-free
+        self._folder_locks = {}
+        self._folder_locks_guard = threading.Lock()
+
+    def run(self, source_directory: str, destination_base_directory: str, rename_files: bool = False,
+            order: str = None) -> dict:
+        """
+        Organize every file under source_directory into category folders under destination_base_directory.
+
+        Args:
+            source_directory (str): Directory containing files to organize.
+            destination_base_directory (str): Base directory where categorized folders will be created.
+            rename_files (bool): Whether to rename files based on suggestions.
+            order (str, optional): Order to process files in (see file_ordering.ORDER_POLICIES);
+                                   defaults to the pipeline's order_policy.
+
+        Returns:
+            dict: 'processed_files' and 'errors' lists in the format returned by the organize endpoints,
+                  'duplicate_groups', the lists of byte-identical files that shared one analysis, and
+                  'timing', with the order used, total seconds, time to the first organized file and files/sec.
+
+        Raises:
+            ValueError: Unknown order.
+        """
+        order = order or self.order_policy
+        if order not in ORDER_POLICIES:
+            raise ValueError(f"Unknown order '{order}'; expected one of {', '.join(ORDER_POLICIES)}.")
+        run_started = time.perf_counter()
+        first_result = []
+        processed_files = []
+        errors = []
+        # First copy of each group of identical files -> the other copies
+        duplicates = {}
+        classified_originals = set()
+
+        if OLLAMA_WARM_UP:
+            # Make sure the model is loaded while the first files are being read
+            self.ollama_handler.warm_up(background=True)
+
+        scanned = queue.Queue(maxsize=self.queue_size)
+        extracted = queue.Queue(maxsize=self.queue_size)
+        classified = queue.Queue(maxsize=self.queue_size)
+        planned = queue.Queue(maxsize=self.queue_size)
+
+        def classify(items):
+            results = self._classify(items)
+            # Identical copies skip extraction and classification and take the first copy's analysis
+            for item in list(results):
+                classified_originals.add(item["file_path"])
+                for duplicate_path in duplicates.get(item["file_path"], []):
+                    results.append({
+                        "file_path": duplicate_path,
+                        "rename": item["rename"],
+                        "extension": _extension(duplicate_path),
+                        "analysis": dict(item["analysis"]),
+                    })
+            return results
+
+        def plan(item):
+            return self._plan(item, destination_base_directory, rename_files)
+
+        def move(item):
+            self._move(item, processed_files, errors)
+            if not first_result and processed_files:
+                first_result.append(time.perf_counter() - run_started)
+
+        threads = []
+        threads.extend(self._start_stage("extract", self._extract, scanned, extracted, self.extract_workers, errors))
+        # Classify workers take whatever small files are already queued and classify them together
+        threads.extend(self._start_stage("classify", classify, extracted, classified, self.classify_workers,
+                                         errors, collect=self._collect_batch))
+        threads.extend(self._start_stage("plan", plan, classified, planned, self.plan_workers, errors))
+        threads.extend(self._start_stage("move", move, planned, None, self.move_workers, errors))
+
+        # Scan stage: snapshot the listing up front, since in-place organizing creates
+        # category folders inside the directory being scanned
+        started = time.perf_counter()
+        duplicate_groups = []
+        try:
+            file_paths = self.file_operations.get_files_in_directory(source_directory)
+            PIPELINE_STAGE_SECONDS.observe(time.perf_counter() - started, stage="scan")
+            # Ordering before deduplication makes the first copy of each group the one processed first
+            started = time.perf_counter()
+            file_paths = order_files(file_paths, order)
+            PIPELINE_STAGE_SECONDS.observe(time.perf_counter() - started, stage="order")
+            if self.detect_duplicates:
+                started = time.perf_counter()
+                duplicate_groups = find_duplicate_groups(file_paths)
+                for first, *copies in duplicate_groups:
+                    duplicates[first] = copies
+                PIPELINE_STAGE_SECONDS.observe(time.perf_counter() - started, stage="deduplicate")
+            skipped = {copy for copies in duplicates.values() for copy in copies}
+            for file_path in file_paths:
+                if file_path not in skipped:
+                    scanned.put({"file_path": file_path, "rename": rename_files})
+        finally:
+            scanned.put(_DONE)
+
+        for thread in threads:
+            thread.join()
+
+        for first, copies in duplicates.items():
+            if first not in classified_originals:
+                # The first copy failed before classification, so its copies were never organized either
+                for copy in copies:
+                    errors.append({"file": copy, "message": f"Not organized: identical to '{first}', which failed."})
+
+        seconds = time.perf_counter() - run_started
+        if first_result:
+            PIPELINE_FIRST_RESULT_SECONDS.observe(first_result[0], order=order)
+        timing = {
+            "order": order,
+            "seconds": round(seconds, 3),
+            "time_to_first_result_seconds": round(first_result[0], 3) if first_result else None,
+            "files_per_second": round(len(processed_files) / seconds, 2) if seconds > 0 else None,
+        }
+        return {"processed_files": processed_files, "errors": errors, "duplicate_groups": duplicate_groups,
+                "timing": timing}
+
+    def analyze_file(self, file_path: str) -> dict:
+        """
+        Run the extract and classify stages for a single file, including a name suggestion.
+
+        Returns:
+            dict: The analysis in the analyze_content format.
+        """
+        # The user asked for suggestions, so rules that skip the model's name still get one here
+        item = self._extract({"file_path": file_path, "rename": True, "always_name": True})
+        # Interactive callers get OllamaUnavailableError right away instead of waiting for recovery
+        return self._classify_once([item])[0]["analysis"]
+
+    def _start_stage(self, name, handler, inbox, outbox, workers, errors, collect=None):
+        """
+        Start the worker threads for one stage and return them.
+        Handler time is recorded per file in the pipeline stage histogram under the stage name;
+        a group handled together is split evenly between its files.
+
+        By default the handler is called with one item and returns one item (or None to drop it).
+        If collect is given, it is called with the first item and the inbox to gather a group of
+        items, and the handler is called with that list and returns a list of results.
+        """
+        remaining = [workers]
+        remaining_lock = threading.Lock()
+
+        def worker():
+            try:
+                while True:
+                    item = inbox.get()
+                    if item is _DONE:
+                        # Hand the sentinel on to sibling workers of this stage
+                        inbox.put(_DONE)
+                        break
+                    items = collect(item, inbox) if collect else [item]
+                    started = time.perf_counter()
+                    try:
+                        results = handler(items) if collect else [handler(item)]
+                    except BaseException as e:
+                        # Log individual file errors but keep the stage running. That includes a
+                        # cancellation leaking out of a coroutine: a dead worker would leave the run hanging.
+                        for failed in items:
+                            errors.append({"file": failed["file_path"], "message": str(e) or type(e).__name__})
+                        if isinstance(e, (KeyboardInterrupt, SystemExit)):
+                            raise
+                        continue
+                    finally:
+                        per_item_seconds = (time.perf_counter() - started) / len(items)
+                        for _ in items:
+                            PIPELINE_STAGE_SECONDS.observe(per_item_seconds, stage=name)
+                    if outbox is not None:
+                        for result in results:
+                            if result is not None:
+                                outbox.put(result)
+            finally:
+                with remaining_lock:
+                    remaining[0] -= 1
+                    last_worker = remaining[0] == 0
+                # The last worker to finish tells the next stage there is no more work
+                if last_worker and outbox is not None:
+                    outbox.put(_DONE)
+
+        threads = [threading.Thread(target=worker, daemon=True) for _ in range(workers)]
+        for thread in threads:
+            thread.start()
+        return threads
+
+    def _extract(self, item):
+        """Extract stage: apply deterministic rules, then read each file's text content if still needed."""
+        item["extension"] = _extension(item["file_path"])
+        rule = self.rule_classifier.match(item["file_path"]) if self.rule_classifier else None
+        if rule is not None:
+            item["analysis"] = {"category": rule["category"], "new_name_suggestion": None}
+            # rename_with_llm only limits bulk organizing
+            item["needs_name"] = rule["rename_with_llm"] or item.pop("always_name", False)
+            if not (item["rename"] and item["needs_name"]):
+                # Nothing left for a model to do, so skip reading the file entirely
+                item["content"] = ""
+                return item
+        item["content"] = self.file_operations.read_file_content(item["file_path"])
+        return item
+
+    def _collect_batch(self, first, inbox):
+        """
+        Gather small files that are already waiting in the inbox to classify alongside first.
+        Never blocks: the group is whatever is queued right now, up to the batch limits.
+        """
+        items = [first]
+        if not BATCH_CLASSIFICATION_ENABLED or len(first["content"]) > BATCH_SMALL_FILE_CHARS:
+            return items
+        total_chars = len(first["content"])
+        while len(items) < BATCH_MAX_FILES and total_chars < BATCH_MAX_CHARS:
+            try:
+                item = inbox.get_nowait()
+            except queue.Empty:
+                break
+            if item is _DONE:
+                inbox.put(_DONE)
+                break
+            items.append(item)
+            # A large file ends the group; it is classified on its own
+            if len(item["content"]) > BATCH_SMALL_FILE_CHARS:
+                break
+            total_chars += len(item["content"])
+        return items
+
+    def _classify(self, items):
+        """
+        Classify stage. While Ollama is unavailable the stage pauses and retries the same items
+        rather than guessing a category; after PIPELINE_BREAKER_WAIT_SECONDS without recovery the
+        items are reported as errors and left where they are.
+        """
+        deadline = time.monotonic() + PIPELINE_BREAKER_WAIT_SECONDS
+        while True:
+            try:
+                return self._classify_once(items)
+            except OllamaUnavailableError:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0 or not self.ollama_handler.breaker.wait_until_available(remaining):
+                    raise
+                # Items keep the analyses they already got, so only the unfinished work is redone
+
+    def _classify_once(self, items):
+        """Analyze content for category and new name suggestion."""
+        for item in items:
+            self._fast_classify(item)
+
+        pending = [item for item in items if "analysis" not in item]
+        small = [item for item in pending if len(item["content"]) <= BATCH_SMALL_FILE_CHARS]
+        for batch in (_pack_batches(small) if BATCH_CLASSIFICATION_ENABLED else []):
+            if len(batch) < 2:
+                continue
+            started = time.perf_counter()
+            analyses = self.ollama_handler.analyze_batch(
+                [item["content"] for item in batch], [item["extension"] for item in batch]
+            )
+            per_file_seconds = (time.perf_counter() - started) / len(batch)
+            for item, analysis in zip(batch, analyses):
+                item["analysis"] = analysis
+                self._confirm(item, per_file_seconds)
+
+        for item in pending:
+            if "analysis" not in item:
+                started = time.perf_counter()
+                item["analysis"] = self.ollama_handler.analyze_content(item["content"], item["extension"])
+                self._confirm(item, time.perf_counter() - started)
+
+        for item in items:
+            if item.get("needs_name") and item["rename"]:
+                # The fast path only yields a category; ask the model for a name on its own
+                current_name = os.path.splitext(os.path.basename(item["file_path"]))[0]
+                item["analysis"]["new_name_suggestion"] = self.ollama_handler.suggest_rename(
+                    item["content"], current_name, item["extension"]
+                )
+            item.pop("needs_name", None)
+            item.pop("always_name", None)
+
+        for item in items:
+            item.pop("embedding", None)
+            item.pop("signature", None)
+            del item["content"]
+        return items
+
+    def _fast_classify(self, item):
+        """Try the classifiers that avoid a full chat completion; sets item['analysis'] on success."""
+        if "analysis" in item:
+            # Already classified by a deterministic rule during extraction
+            return
+        if self.correction_classifier is not None:
+            # The user's own corrections outrank anything learned from the model's answers
+            category = self.correction_classifier.classify(item["content"], item["extension"])
+            if category:
+                item["analysis"] = {"category": category, "new_name_suggestion": None}
+                item["needs_name"] = True
+                return
+        if self.near_duplicate_index is not None:
+            if "signature" not in item:
+                item["signature"] = self.near_duplicate_index.signature(
+                    self.ollama_handler.budget_content(item["content"], item["extension"])
+                )
+            file_name = os.path.splitext(os.path.basename(item["file_path"]))[0]
+            analysis, needs_name = self.near_duplicate_index.find(item["signature"], file_name)
+            if analysis:
+                item["analysis"] = analysis
+                item["needs_name"] = needs_name
+                return
+        if self.embedding_classifier is not None:
+            category, item["embedding"] = self.embedding_classifier.classify(item["content"], item["extension"])
+            if category:
+                item["analysis"] = {"category": category, "new_name_suggestion": None}
+                item["needs_name"] = True
+
+    def _confirm(self, item, llm_seconds):
+        """Feed a chat model result back into the near-duplicate index and the embedding classifier."""
+        if self.near_duplicate_index is not None:
+            self.near_duplicate_index.add(item.get("signature"), item["analysis"])
+        if self.embedding_classifier is not None and item.get("embedding") is not None:
+            self.embedding_classifier.confirm(item["analysis"].get("category"), item["embedding"], llm_seconds)
+
+    def _plan(self, item, destination_base_directory, rename_files):
+        """Plan stage: decide the destination folder and (optionally) the cleaned new name."""
+        analysis = item["analysis"]
+        category = analysis.get("category", "Miscellaneous")
+        new_name_suggestion = analysis.get("new_name_suggestion")
+
+        final_new_name = None
+        if rename_files and new_name_suggestion:
+            final_new_name = clean_file_name(new_name_suggestion)
+
+        item["category"] = category
+        item["destination_folder"] = os.path.join(destination_base_directory, category)
+        item["new_name"] = final_new_name
+        return item
+
+    def _move(self, item, processed_files, errors):
+        """Move stage: move (and optionally rename) the file and record the outcome."""
+        file_path = item["file_path"]
+        destination_folder = item["destination_folder"]
+        final_new_name = item["new_name"]
+
+        with self._folder_lock(destination_folder):
+            new_path = self.file_operations.move_file(file_path, destination_folder, final_new_name)
+
+        if new_path:
+            processed_files.append({
+                "original_path": file_path,
+                # Report where the file really went: name conflicts (e.g. duplicates sharing a suggested
+                # name) get a numeric suffix
+                "new_path": new_path,
+                "category": item["category"],
+                "renamed": bool(final_new_name)
+            })
+        else:
+            errors.append({"file": file_path, "message": "Failed to move file."})
+
+    def _folder_lock(self, folder):
+        """Return the lock guarding moves into the given folder."""
+        with self._folder_locks_guard:
+            return self._folder_locks.setdefault(folder, threading.Lock())
+
+
+def _extension(file_path: str) -> str:
+    """Return the lowercase extension of file_path without the dot."""
+    return os.path.splitext(file_path)[1].lstrip('.').lower()
+
+
+def _pack_batches(items):
+    """Greedily pack items into batches bounded by BATCH_MAX_CHARS and BATCH_MAX_FILES."""
+    batches = []
+    current = []
+    current_chars = 0
+    for item in items:
+        size = len(item["content"])
+        if current and (len(current) >= BATCH_MAX_FILES or current_chars + size > BATCH_MAX_CHARS):
+            batches.append(current)
+            current = []
+            current_chars = 0
+        current.append(item)
+        current_chars += size
+    if current:
+        batches.append(current)
+    return batches
+
+
+def clean_file_name(new_name_suggestion: str):
+    """
+    Sanitize a suggested file name: strip unsafe characters, use underscores for whitespace, lowercase.
+    Returns None if nothing usable is left.
+    """
+    cleaned_name = re.sub(r'[^\w\s.-]', '', new_name_suggestion).strip()
+    cleaned_name = re.sub(r'\s+', '_', cleaned_name)
+    return cleaned_name.lower() if cleaned_name else None
@@ -0,0 +1,69 @@
+# rule_classifier.py
+import os
+import threading
+from config import CLASSIFICATION_RULES
+
+class RuleClassifier:
+    """
+    Deterministic pre-classifier that assigns categories from file extensions and MIME types,
+    so files whose category is obvious never need a model call.
+    """
+
+    def __init__(self, file_operations, rules=CLASSIFICATION_RULES):
+        """
+        Args:
+            file_operations (FileOperations): Used to determine MIME types.
+            rules (list[dict]): Rules with 'category', 'extensions', 'mime_types' and 'rename_with_llm' keys.
+        """
+        self.file_operations = file_operations
+        self.rules = rules
+        # Extension lookups are the common case, so index them once
+        self._by_extension = {}
+        for rule in rules:
+            for extension in rule.get('extensions', []):
+                self._by_extension.setdefault(extension.lower(), rule)
+        self._has_mime_rules = any(rule.get('mime_types') for rule in rules)
+        self._lock = threading.Lock()
+        self._hits = {}
+        self._misses = 0
+
+    def match(self, file_path: str):
+        """
+        Find the rule that applies to a file.
+
+        Args:
+            file_path (str): Path to the file.
+
+        Returns:
+            dict or None: The matching rule, or None if the file needs a model to classify it.
+        """
+        extension = os.path.splitext(file_path)[1].lstrip('.').lower()
+        rule = self._by_extension.get(extension)
+        if rule is None and not extension and self._has_mime_rules:
+            # Extensionless files (e.g. shell scripts) are matched on their detected MIME type
+            mime_type = self.file_operations.get_file_type(file_path)
+            rule = next(
+                (candidate for candidate in self.rules
+                 if any(mime_type.startswith(prefix) for prefix in candidate.get('mime_types', []))),
+                None,
+            )
+        with self._lock:
+            if rule is None:
+                self._misses += 1
+            else:
+                self._hits[rule['category']] = self._hits.get(rule['category'], 0) + 1
+        return rule
+
+    def stats(self) -> dict:
+        """Return how many files each rule classified and how many needed a model."""
+        with self._lock:
+            hits = dict(self._hits)
+            misses = self._misses
+        total_hits = sum(hits.values())
+        lookups = total_hits + misses
+        return {
+            "hits": total_hits,
+            "hits_by_category": hits,
+            "misses": misses,
+            "hit_rate": round(total_hits / lookups, 4) if lookups else 0.0,
+        }
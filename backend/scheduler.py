@@ -0,0 +1,178 @@
+# scheduler.py
+import asyncio
+import contextvars
+import threading
+import time
+from contextlib import contextmanager, asynccontextmanager
+from config import OLLAMA_MAX_IN_FLIGHT, SCHEDULER_AGING_SECONDS
+import metrics
+
+# Lanes in priority order: interactive requests from the UI first, bulk organize jobs second
+INTERACTIVE = "interactive"
+BULK = "bulk"
+LANES = (INTERACTIVE, BULK)
+
+# Lane of the Ollama work started from the current thread or task; bulk unless a caller says otherwise
+_current_lane = contextvars.ContextVar("ollama_lane", default=BULK)
+
+@contextmanager
+def lane(name: str):
+    """Run the enclosed Ollama calls in the given lane."""
+    token = _current_lane.set(name)
+    try:
+        yield
+    finally:
+        _current_lane.reset(token)
+
+def current_lane() -> str:
+    """Return the lane Ollama calls made here are scheduled in."""
+    return _current_lane.get()
+
+
+class _Ticket:
+    """One caller waiting for a slot."""
+
+    def __init__(self, lane_name: str, wake):
+        self.lane = lane_name
+        self.enqueued = time.monotonic()
+        self.wake = wake
+        self.granted = False
+
+
+class PriorityScheduler:
+    """
+    Shared admission queue for Ollama calls. At most `limit` calls run at once; when a slot frees
+    up it goes to the waiting call with the best priority. A call's priority is its lane's rank,
+    improved by one rank for every `aging_seconds` it has waited, so bulk work still gets through
+    while interactive requests keep arriving. Ties go to the call that has waited longest.
+    """
+
+    def __init__(self, limit=OLLAMA_MAX_IN_FLIGHT, aging_seconds=SCHEDULER_AGING_SECONDS):
+        """
+        Args:
+            limit (int): Maximum number of calls in flight.
+            aging_seconds (float): Waiting time that raises a call by one lane; 0 disables aging.
+        """
+        self._lock = threading.Lock()
+        self._limit = max(1, int(limit))
+        self.aging_seconds = aging_seconds
+        self._waiting = []
+        self._in_flight = 0
+        self._lanes = {
+            name: {"running": 0, "granted": 0, "wait_seconds": 0.0, "max_wait_seconds": 0.0, "aged_grants": 0}
+            for name in LANES
+        }
+
+    @property
+    def limit(self) -> int:
+        return self._limit
+
+    @limit.setter
+    def limit(self, value: int):
+        """Change the number of concurrent calls; waiting calls are admitted right away if it grew."""
+        with self._lock:
+            self._limit = max(1, int(value))
+            self._dispatch()
+
+    def saturated(self) -> bool:
+        """Whether every slot is taken or calls are waiting for one."""
+        with self._lock:
+            return bool(self._waiting) or self._in_flight >= self._limit
+
+    @contextmanager
+    def slot(self, lane_name: str = None):
+        """
+        Block until a slot is granted in the given lane (default: the current lane), and hold it
+        for the duration of the block.
+        """
+        event = threading.Event()
+        ticket = self._enqueue(lane_name or current_lane(), event.set)
+        event.wait()
+        try:
+            yield
+        finally:
+            self._release(ticket)
+
+    @asynccontextmanager
+    async def slot_async(self, lane_name: str = None):
+        """Async variant of slot; waits without blocking the event loop."""
+        loop = asyncio.get_running_loop()
+        granted = loop.create_future()
+
+        def wake():
+            loop.call_soon_threadsafe(lambda: granted.done() or granted.set_result(None))
+
+        ticket = self._enqueue(lane_name or current_lane(), wake)
+        try:
+            await granted
+        except asyncio.CancelledError:
+            # Give the slot back if it was granted, or leave the queue if it was not
+            with self._lock:
+                if not ticket.granted:
+                    self._waiting.remove(ticket)
+                    raise
+            self._release(ticket)
+            raise
+        try:
+            yield
+        finally:
+            self._release(ticket)
+
+    def _enqueue(self, lane_name: str, wake) -> _Ticket:
+        if lane_name not in self._lanes:
+            raise ValueError(f"Unknown scheduler lane '{lane_name}'")
+        ticket = _Ticket(lane_name, wake)
+        with self._lock:
+            self._waiting.append(ticket)
+            self._dispatch()
+        return ticket
+
+    def _release(self, ticket: _Ticket):
+        with self._lock:
+            self._in_flight -= 1
+            self._lanes[ticket.lane]["running"] -= 1
+            self._dispatch()
+
+    def _priority(self, ticket: _Ticket, now: float) -> tuple:
+        rank = LANES.index(ticket.lane)
+        if self.aging_seconds > 0:
+            rank -= (now - ticket.enqueued) / self.aging_seconds
+        return rank, ticket.enqueued
+
+    def _dispatch(self):
+        """Grant free slots to the best waiting tickets; callers hold self._lock."""
+        while self._waiting and self._in_flight < self._limit:
+            now = time.monotonic()
+            ticket = min(self._waiting, key=lambda waiting: self._priority(waiting, now))
+            self._waiting.remove(ticket)
+            ticket.granted = True
+            self._in_flight += 1
+            waited = now - ticket.enqueued
+            stats = self._lanes[ticket.lane]
+            stats["running"] += 1
+            stats["granted"] += 1
+            stats["wait_seconds"] += waited
+            stats["max_wait_seconds"] = max(stats["max_wait_seconds"], waited)
+            if any(LANES.index(other.lane) < LANES.index(ticket.lane) for other in self._waiting):
+                # Aging let this call overtake a higher-priority lane
+                stats["aged_grants"] += 1
+            metrics.SCHEDULER_WAIT_SECONDS.observe(waited, lane=ticket.lane)
+            ticket.wake()
+
+    def stats(self) -> dict:
+        """Return the limit, calls in flight, and per-lane queue depth and wait times."""
+        with self._lock:
+            now = time.monotonic()
+            lanes = {}
+            for name, stats in self._lanes.items():
+                waiting = [ticket for ticket in self._waiting if ticket.lane == name]
+                lanes[name] = {
+                    "depth": len(waiting),
+                    "running": stats["running"],
+                    "granted": stats["granted"],
+                    "avg_wait_seconds": round(stats["wait_seconds"] / stats["granted"], 4) if stats["granted"] else None,
+                    "max_wait_seconds": round(stats["max_wait_seconds"], 4),
+                    "oldest_wait_seconds": round(max((now - ticket.enqueued for ticket in waiting), default=0.0), 4),
+                    "aged_grants": stats["aged_grants"],
+                }
+            return {"limit": self._limit, "in_flight": self._in_flight, "lanes": lanes}
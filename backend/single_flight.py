@@ -0,0 +1,165 @@
+# single_flight.py
+import asyncio
+import threading
+
+class LeaderAbandoned(Exception):
+    """Raised to callers waiting on a computation whose leader was cancelled before finishing."""
+
+
+class _Call:
+    """One in-flight computation and the callers waiting for its outcome."""
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+        self._lock = threading.Lock()
+        self._callbacks = []
+
+    def outcome(self):
+        """
+        Return the leader's result or raise its error; only valid once done is set.
+
+        Raises:
+            LeaderAbandoned: The leader gave up without an outcome; the caller should start over.
+        """
+        if self.error is not None:
+            raise self.error
+        return self.result
+
+    def wait(self):
+        """Block until the leader finishes, then return its outcome()."""
+        self.done.wait()
+        return self.outcome()
+
+    async def wait_async(self):
+        """
+        Await the leader's outcome() without tying up a thread: the leader wakes the loop when it settles.
+        A cancelled waiter just drops its wake-up.
+        """
+        loop = asyncio.get_running_loop()
+        waiter = loop.create_future()
+
+        def wake():
+            loop.call_soon_threadsafe(lambda: waiter.done() or waiter.set_result(None))
+
+        with self._lock:
+            settled = self.done.is_set()
+            if not settled:
+                self._callbacks.append(wake)
+        if not settled:
+            try:
+                await waiter
+            finally:
+                with self._lock:
+                    if wake in self._callbacks:
+                        self._callbacks.remove(wake)
+        return self.outcome()
+
+    def settle(self, result=None, error=None):
+        """Record the outcome and wake every waiter, blocked or async."""
+        self.result, self.error = result, error
+        with self._lock:
+            self.done.set()
+            callbacks, self._callbacks = self._callbacks, []
+        for callback in callbacks:
+            callback()
+
+
+class SingleFlight:
+    """
+    Coalesces concurrent computations for the same key: the first caller (the leader) does the
+    work, and callers arriving while it is in flight wait for and share its outcome.
+    Nothing is remembered once the leader finishes; that is the analysis cache's job.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls = {}
+        self.leaders = 0
+        self.coalesced = 0
+
+    def begin(self, key):
+        """
+        Join or start the computation for key.
+
+        Returns:
+            tuple: (call, leader). A leader must call finish() or fail() for the key;
+                   everyone else waits on call.wait().
+        """
+        with self._lock:
+            call = self._calls.get(key)
+            if call is not None:
+                self.coalesced += 1
+                return call, False
+            call = self._calls[key] = _Call()
+            self.leaders += 1
+            return call, True
+
+    def finish(self, key, result):
+        """Publish the leader's result to waiting callers and close the computation."""
+        with self._lock:
+            call = self._calls.pop(key)
+        call.settle(result=result)
+
+    def fail(self, key, error: BaseException):
+        """
+        Raise the leader's error in waiting callers and close the computation. Cancellation and
+        other BaseExceptions belong to the leader alone; waiting callers get LeaderAbandoned instead.
+        """
+        with self._lock:
+            call = self._calls.pop(key)
+        call.settle(error=error if isinstance(error, Exception) else LeaderAbandoned(f"Leader gave up: {error!r}"))
+
+    def do(self, key, compute):
+        """
+        Return compute() for key, sharing one call between concurrent callers. If the leader is
+        cancelled, the callers waiting on it start over, and one of them becomes the new leader.
+        """
+        while True:
+            call, leader = self.begin(key)
+            if leader:
+                break
+            try:
+                return call.wait()
+            except LeaderAbandoned:
+                continue
+        try:
+            result = compute()
+        except BaseException as e:
+            # Includes cancellation, so waiters are never left hanging on an abandoned key
+            self.fail(key, e)
+            raise
+        self.finish(key, result)
+        return result
+
+    async def do_async(self, key, compute):
+        """Async variant of do(); compute() returns an awaitable. Waiting does not block the event loop or hold a thread."""
+        while True:
+            call, leader = self.begin(key)
+            if leader:
+                break
+            try:
+                return await call.wait_async()
+            except LeaderAbandoned:
+                continue
+        try:
+            result = await compute()
+        except BaseException as e:
+            # Includes cancellation, so waiters are never left hanging on an abandoned key
+            self.fail(key, e)
+            raise
+        self.finish(key, result)
+        return result
+
+    def stats(self) -> dict:
+        """Return how many computations ran and how many callers shared one instead."""
+        with self._lock:
+            in_flight = len(self._calls)
+        total = self.leaders + self.coalesced
+        return {
+            "calls": self.leaders,
+            "coalesced": self.coalesced,
+            "coalesced_rate": round(self.coalesced / total, 4) if total else 0.0,
+            "in_flight": in_flight,
+        }
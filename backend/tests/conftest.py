@@ -0,0 +1,39 @@
+# tests/conftest.py
+# The backend reads its configuration from the environment at import time, so the fake Ollama server
+# is started and the environment is set up here, before any test module imports a backend module.
+import os
+import sys
+import tempfile
+
+import pytest
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+
+from benchmarks.fake_ollama import FakeOllamaServer
+
+FAKE_OLLAMA = FakeOllamaServer(latency='fixed:0.01', seed=1).start()
+WORK_DIR = tempfile.mkdtemp(prefix='docpilot-tests-')
+
+os.environ.update({
+    'OLLAMA_HOST': FAKE_OLLAMA.url,
+    'OLLAMA_HOSTS': FAKE_OLLAMA.url,
+    'OLLAMA_WARM_UP': 'false',
+    'OLLAMA_IDLE_UNLOAD_SECONDS': '0',
+    'HOST_HEALTH_CHECK_INTERVAL': '0',
+    'OLLAMA_RETRY_BASE_DELAY': '0.01',
+    'OLLAMA_RETRY_MAX_DELAY': '0.05',
+    'ANALYSIS_CACHE_PATH': os.path.join(WORK_DIR, 'analysis_cache.sqlite3'),
+    'ANALYSIS_CACHE_MAX_ENTRIES': '0',
+    'NEAR_DUPLICATE_INDEX_PATH': os.path.join(WORK_DIR, 'near_duplicates.sqlite3'),
+    'NEAR_DUPLICATE_ENABLED': 'false',
+    'CORRECTIONS_PATH': os.path.join(WORK_DIR, 'corrections.sqlite3'),
+    'CORRECTION_LEARNING_ENABLED': 'false',
+})
+
+
+@pytest.fixture
+def ollama_handler():
+    """An OllamaHandler talking to the fake server."""
+    from ollama_handler import OllamaHandler
+    return OllamaHandler()
@@ -0,0 +1,110 @@
+# tests/test_concurrency_controller.py
+from types import SimpleNamespace
+
+import pytest
+
+import concurrency_controller
+from concurrency_controller import AIMDController, BASELINE_DRIFT
+
+
+class StubScheduler:
+    """Just the parts of PriorityScheduler the controller uses."""
+
+    def __init__(self, limit, saturated=True):
+        self.limit = limit
+        self.is_saturated = saturated
+
+    def saturated(self):
+        return self.is_saturated
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    # Only the controller's view of time is replaced, not the time module everyone else uses
+    monkeypatch.setattr(concurrency_controller, "time", SimpleNamespace(monotonic=clock))
+    return clock
+
+
+def run_window(controller, clock, latency=1.0, seconds=1.0, kind="analyze"):
+    """Complete one adjustment window of calls spread over the given number of seconds."""
+    calls = max(controller.window, 2 * controller.limit)
+    for _ in range(calls):
+        clock.now += seconds / calls
+        controller.record(kind, latency, ok=True)
+
+
+def test_saturated_window_increases_limit(clock):
+    controller = AIMDController(StubScheduler(2), window=4, max_limit=8)
+    run_window(controller, clock)
+    assert controller.limit == 3
+    assert controller.stats()["increases"] == 1
+
+
+def test_unsaturated_window_keeps_limit(clock):
+    controller = AIMDController(StubScheduler(2, saturated=False), window=4, max_limit=8)
+    run_window(controller, clock)
+    assert controller.limit == 2
+
+
+def test_increase_without_throughput_gain_is_reverted(clock):
+    controller = AIMDController(StubScheduler(2), window=4, max_limit=8)
+    run_window(controller, clock, seconds=1.0)
+    assert controller.limit == 3
+    # The next window is bigger (twice the new limit) but takes proportionally longer: no gain
+    run_window(controller, clock, seconds=1.5)
+    assert controller.limit == 2
+    assert controller.stats()["reverts"] == 1
+    # Probing pauses for a few windows after an unprofitable increase
+    run_window(controller, clock)
+    assert controller.limit == 2
+
+
+def test_error_decreases_limit_once_per_window(clock):
+    controller = AIMDController(StubScheduler(10), window=4, backoff=0.5)
+    controller.record("analyze", 1.0, ok=False)
+    controller.record("analyze", 1.0, ok=False)
+    assert controller.limit == 5
+    assert controller.stats()["decreases"] == 1
+
+
+def test_latency_spike_decreases_limit(clock):
+    controller = AIMDController(StubScheduler(4, saturated=False), window=8, backoff=0.5, latency_tolerance=2.0)
+    run_window(controller, clock, latency=1.0)
+    run_window(controller, clock, latency=3.0)
+    assert controller.limit == 2
+    assert controller.stats()["last_reason"] == "latency"
+
+
+def test_baseline_does_not_drift_in_saturated_windows(clock):
+    scheduler = StubScheduler(2)
+    controller = AIMDController(scheduler, window=4, max_limit=2)
+    run_window(controller, clock, latency=1.0)
+    for _ in range(10):
+        # Queueing makes saturated windows slower without anything being wrong
+        run_window(controller, clock, latency=1.5)
+    assert controller.stats()["latency_baselines_seconds"]["analyze"] == 1.0
+
+
+def test_baseline_drifts_slowly_in_unsaturated_windows(clock):
+    controller = AIMDController(StubScheduler(2, saturated=False), window=4)
+    run_window(controller, clock, latency=1.0)
+    run_window(controller, clock, latency=1.5)
+    assert controller.stats()["latency_baselines_seconds"]["analyze"] == pytest.approx(1 + BASELINE_DRIFT)
+
+
+def test_baselines_are_kept_per_kind(clock):
+    controller = AIMDController(StubScheduler(2, saturated=False), window=4)
+    run_window(controller, clock, latency=1.0, kind="analyze")
+    run_window(controller, clock, latency=4.0, kind="batch")
+    baselines = controller.stats()["latency_baselines_seconds"]
+    assert baselines == {"analyze": 1.0, "batch": 4.0}
+    assert controller.limit == 2
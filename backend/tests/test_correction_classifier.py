@@ -0,0 +1,77 @@
+# tests/test_correction_classifier.py
+import time
+
+import pytest
+
+pytest.importorskip("numpy")
+
+from correction_classifier import CorrectionClassifier
+
+CONTRACT = "This employment contract between the employer and the employee sets out salary, notice period and duties."
+INVOICE = "Invoice for consulting services: hourly rate, total amount due, payment terms and bank transfer details."
+
+
+class Budgeter:
+    def budget_content(self, content, extension=None):
+        return content
+
+
+def make_classifier(tmp_path, **kwargs):
+    options = {"path": str(tmp_path / "corrections.sqlite3"), "max_entries": 100, "neighbors": 3,
+               "min_similarity": 0.3, "min_agreement": 0.7, "enabled": True}
+    options.update(kwargs)
+    return CorrectionClassifier(Budgeter(), **options)
+
+
+def wait_for_entries(classifier, entries, timeout=5):
+    """Corrections are trained in the background; wait until the model holds the given number."""
+    deadline = time.monotonic() + timeout
+    while classifier.stats()["entries"] != entries:
+        assert time.monotonic() < deadline, "corrections were not trained"
+        time.sleep(0.01)
+
+
+def test_folders_are_matched_to_categories_by_name(tmp_path):
+    classifier = make_classifier(tmp_path)
+    assert classifier.category_for_folder("/home/me/Sorted/legal/") == "Legal"
+    assert classifier.category_for_folder("/home/me/Sorted/Holiday Photos") is None
+    assert make_classifier(tmp_path, enabled=False).category_for_folder("/home/me/Sorted/Legal") is None
+
+
+def test_identical_content_is_answered_exactly(tmp_path):
+    classifier = make_classifier(tmp_path)
+    assert classifier.record(CONTRACT, "txt", "Legal")
+    wait_for_entries(classifier, 1)
+    assert classifier.classify(CONTRACT, "txt") == "Legal"
+    assert classifier.stats()["exact_hits"] == 1
+
+
+def test_similar_content_follows_its_nearest_corrections(tmp_path):
+    classifier = make_classifier(tmp_path)
+    classifier.record(CONTRACT, "txt", "Legal")
+    classifier.record(INVOICE, "txt", "Financial")
+    wait_for_entries(classifier, 2)
+    assert classifier.classify(CONTRACT + " Signed by both parties.", "txt") == "Legal"
+    assert classifier.classify(INVOICE.replace("consulting", "design"), "txt") == "Financial"
+    assert classifier.classify("Photos from the summer trip to the mountains.", "jpg") is None
+
+
+def test_split_votes_are_left_to_other_classifiers(tmp_path):
+    classifier = make_classifier(tmp_path, min_agreement=0.9)
+    classifier.record(CONTRACT, "txt", "Legal")
+    classifier.record(CONTRACT + " Copy.", "txt", "Business")
+    wait_for_entries(classifier, 2)
+    assert classifier.classify(CONTRACT + " Draft.", "txt") is None
+    assert classifier.stats()["ambiguous"] == 1
+
+
+def test_a_later_correction_of_the_same_content_wins(tmp_path):
+    classifier = make_classifier(tmp_path)
+    classifier.record(CONTRACT, "txt", "Business")
+    wait_for_entries(classifier, 1)
+    classifier.record(CONTRACT, "txt", "Legal")
+    deadline = time.monotonic() + 5
+    while classifier.classify(CONTRACT, "txt") != "Legal":
+        assert time.monotonic() < deadline, "replacement was not trained"
+        time.sleep(0.01)
+    assert classifier.stats()["entries"] == 1
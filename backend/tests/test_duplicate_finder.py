@@ -0,0 +1,36 @@
+# tests/test_duplicate_finder.py
+import os
+
+from duplicate_finder import find_duplicate_groups
+
+
+def write(directory, files):
+    paths = []
+    for name, content in files.items():
+        path = os.path.join(directory, name)
+        with open(path, "wb") as f:
+            f.write(content)
+        paths.append(path)
+    return paths
+
+
+def test_identical_files_are_grouped_in_listing_order(tmp_path):
+    paths = write(tmp_path, {"c.txt": b"same", "a.txt": b"other", "b.txt": b"same", "d.txt": b"other"})
+    assert find_duplicate_groups(paths) == [[paths[0], paths[2]], [paths[1], paths[3]]]
+
+
+def test_same_size_with_different_bytes_is_not_a_duplicate(tmp_path):
+    paths = write(tmp_path, {"a.txt": b"abcd", "b.txt": b"abce"})
+    assert find_duplicate_groups(paths) == []
+
+
+def test_files_sharing_a_prefix_are_told_apart_by_the_full_hash(tmp_path):
+    head = b"x" * 64
+    paths = write(tmp_path, {"a.bin": head + b"1", "b.bin": head + b"2", "c.bin": head + b"1"})
+    assert find_duplicate_groups(paths, prefix_bytes=16) == [[paths[0], paths[2]]]
+
+
+def test_empty_and_missing_files_are_never_duplicates(tmp_path):
+    paths = write(tmp_path, {"a.txt": b"", "b.txt": b""})
+    missing = [os.path.join(tmp_path, "gone.txt")] * 2
+    assert find_duplicate_groups(paths + missing) == []
@@ -0,0 +1,41 @@
+# tests/test_embedding_classifier.py
+import threading
+
+import pytest
+
+from embedding_classifier import EmbeddingClassifier
+
+np = pytest.importorskip("numpy")
+
+
+class SlowEmbedder:
+    """Embeds every text as the same vector, holding the first call until released."""
+
+    def __init__(self):
+        self.started = threading.Event()
+        self.release = threading.Event()
+
+    def budget_content(self, content, extension=None):
+        return content
+
+    def embed(self, texts):
+        self.started.set()
+        self.release.wait(5)
+        return [[1.0, 0.0]] * len(texts)
+
+
+def test_seeding_does_not_hold_the_lock_while_embedding():
+    embedder = SlowEmbedder()
+    classifier = EmbeddingClassifier(embedder, enabled=True)
+    seeding = threading.Thread(target=classifier._ensure_centroids, daemon=True)
+    seeding.start()
+    assert embedder.started.wait(5)
+    # Other callers only need the lock briefly and must not wait for the embedding call
+    stats = {}
+    reader = threading.Thread(target=lambda: stats.update(classifier.stats()), daemon=True)
+    reader.start()
+    reader.join(1)
+    assert stats["hits"] == 0
+    embedder.release.set()
+    seeding.join(5)
+    assert classifier._centroids is not None
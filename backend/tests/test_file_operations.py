@@ -0,0 +1,83 @@
+# tests/test_file_operations.py
+import pytest
+
+import file_operations
+from file_operations import FileOperations, pdf_page_numbers
+
+
+class FakePage:
+    def __init__(self, text, extracted):
+        self.text = text
+        self.extracted = extracted
+
+    def extract_text(self):
+        self.extracted.append(self.text)
+        return self.text
+
+
+class FakeReader:
+    """Stands in for PyPDF2.PdfReader over pages_text, recording the text of every page parsed in extracted."""
+    pages_text = []
+    extracted = []
+
+    def __init__(self, f):
+        self.is_encrypted = False
+        self.pages = [FakePage(text, self.extracted) for text in self.pages_text]
+
+
+@pytest.fixture
+def read_pdf(tmp_path, monkeypatch):
+    """Return a function running read_pdf_text over the given page texts."""
+    path = tmp_path / "document.pdf"
+    path.write_bytes(b"%PDF")
+    FakeReader.extracted = []
+    monkeypatch.setattr(file_operations, "PyPDF2", type("PyPDF2", (), {"PdfReader": FakeReader}))
+
+    def read(pages, **kwargs):
+        FakeReader.pages_text = pages
+        return FileOperations().read_pdf_text(str(path), **kwargs)
+
+    return read
+
+
+def test_sampled_pages_start_at_the_beginning_and_end_on_the_last_page():
+    assert pdf_page_numbers(100, "sampled", 6) == [0, 1, 2, 35, 67, 99]
+    assert pdf_page_numbers(100, "sampled", 2) == [0, 99]
+    for page_count in range(3, 40):
+        for sample_pages in range(2, page_count):
+            pages = pdf_page_numbers(page_count, "sampled", sample_pages)
+            assert pages[-1] == page_count - 1
+            assert len(pages) == len(set(pages)) <= sample_pages
+
+
+def test_a_single_sampled_page_is_the_first_one():
+    assert pdf_page_numbers(50, "sampled", 1) == [0]
+    assert pdf_page_numbers(50, "first_pages", 1) == [0]
+
+
+@pytest.mark.parametrize("mode", ["sampled", "first_pages", "budget", "full"])
+def test_short_pdfs_are_read_whole(mode):
+    assert pdf_page_numbers(4, mode, 4) == [0, 1, 2, 3]
+    assert pdf_page_numbers(3, mode, 5) == [0, 1, 2]
+    assert pdf_page_numbers(0, mode, 5) == []
+
+
+def test_unknown_mode_is_rejected():
+    with pytest.raises(ValueError):
+        pdf_page_numbers(10, "everything")
+
+
+def test_budget_left_by_short_pages_is_handed_on(read_pdf):
+    text = read_pdf(["ab", "x" * 100, "y" * 100], mode="sampled", char_budget=90, sample_pages=3)
+    assert text == "\n".join(["ab", "x" * 44, "y" * 44])
+
+
+def test_extraction_stops_once_the_budget_is_spent(read_pdf):
+    pages = [f"page {index} " * 10 for index in range(20)]
+    text = read_pdf(pages, mode="budget", char_budget=150)
+    assert len(text.replace("\n", "")) == 150
+    assert len(FakeReader.extracted) == 3
+
+
+def test_full_mode_ignores_the_budget(read_pdf):
+    assert read_pdf(["a" * 50, "b" * 50], mode="full", char_budget=10) == "a" * 50 + "\n" + "b" * 50
@@ -0,0 +1,80 @@
+# tests/test_host_pool.py
+import asyncio
+
+import ollama
+import pytest
+
+from host_pool import HostPool
+
+
+def make_pool(*urls):
+    return HostPool(list(urls) or ["http://127.0.0.1:1"], health_check_interval=0, failure_threshold=2)
+
+
+def test_picks_the_host_with_the_lowest_expected_wait():
+    pool = make_pool("http://a", "http://b")
+    first, second = pool.hosts
+    first.latency, second.latency = 1.0, 1.0
+    with pool.acquire() as host:
+        assert host is first
+        with pool.acquire() as other:
+            assert other is second
+    assert [host.in_flight for host in pool.hosts] == [0, 0]
+
+
+def test_failures_take_a_host_out_of_rotation():
+    pool = make_pool("http://a", "http://b")
+    first = pool.hosts[0]
+    for _ in range(2):
+        with pytest.raises(ConnectionError):
+            with pool.acquire() as host:
+                assert host is first
+                raise ConnectionError()
+    assert not first.healthy
+    assert first.in_flight == 0
+    with pool.acquire() as host:
+        assert host is pool.hosts[1]
+
+
+def test_cancelled_request_gives_its_slot_back():
+    pool = make_pool()
+
+    async def request():
+        with pool.acquire():
+            await asyncio.sleep(10)
+
+    async def main():
+        for _ in range(2):
+            with pytest.raises(asyncio.TimeoutError):
+                await asyncio.wait_for(request(), 0.01)
+
+    asyncio.run(main())
+    host = pool.hosts[0]
+    assert host.in_flight == 0
+    assert host.failures == 0 and host.healthy
+
+
+def test_closed_generator_gives_its_slot_back():
+    pool = make_pool()
+
+    def stream():
+        with pool.acquire():
+            yield "chunk"
+            yield "chunk"
+
+    chunks = stream()
+    next(chunks)
+    chunks.close()
+    assert pool.hosts[0].in_flight == 0
+
+
+def test_client_errors_do_not_count_against_the_host():
+    pool = make_pool("http://a", "http://b")
+    first = pool.hosts[0]
+    for _ in range(3):
+        with pytest.raises(ollama.ResponseError):
+            with pool.acquire() as host:
+                assert host is first
+                raise ollama.ResponseError("model not found", 404)
+    assert first.healthy
+    assert first.failures == 0 and first.in_flight == 0
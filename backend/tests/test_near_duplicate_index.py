@@ -0,0 +1,58 @@
+# tests/test_near_duplicate_index.py
+import sqlite3
+
+from near_duplicate_index import NearDuplicateIndex, simhash, template_name
+
+INVOICE = "Invoice 1042 for consulting services rendered in March, total due 1200 EUR within 30 days."
+
+
+def make_index(path, model="phi3:mini", prompt_version=4):
+    return NearDuplicateIndex(model, prompt_version, path=str(path), max_entries=100, max_distance=3,
+                              min_chars=10, reuse={"Finance": "category"}, enabled=True)
+
+
+def test_entries_are_keyed_by_model_and_prompt_version(tmp_path):
+    path = tmp_path / "index.sqlite3"
+    index = make_index(path)
+    signature = index.signature(INVOICE)
+    index.add(signature, {"category": "Finance", "new_name_suggestion": "Invoice 1042"})
+    assert index.find(signature, "invoice")[0] == {"category": "Finance", "new_name_suggestion": None}
+
+    assert make_index(path, model="phi3:mini>llama3").find(signature, "invoice") == (None, False)
+    assert make_index(path, prompt_version=5).find(signature, "invoice") == (None, False)
+    assert make_index(path).find(signature, "invoice")[0]["category"] == "Finance"
+
+
+def test_unkeyed_index_from_an_older_version_is_discarded(tmp_path):
+    path = tmp_path / "index.sqlite3"
+    conn = sqlite3.connect(path)
+    conn.execute("CREATE TABLE near_duplicates (signature INTEGER PRIMARY KEY, band0 INTEGER NOT NULL,"
+                 " band1 INTEGER NOT NULL, band2 INTEGER NOT NULL, band3 INTEGER NOT NULL, category TEXT NOT NULL,"
+                 " new_name_suggestion TEXT, last_used REAL NOT NULL)")
+    conn.execute("INSERT INTO near_duplicates VALUES (1, 0, 0, 0, 0, 'Finance', NULL, 0)")
+    conn.commit()
+    conn.close()
+
+    index = make_index(path)
+    assert index.stats()["entries"] == 0
+    signature = index.signature(INVOICE)
+    index.add(signature, {"category": "Finance"})
+    assert index.find(signature, "invoice")[0]["category"] == "Finance"
+
+
+def test_signatures_ignore_numbers_but_not_words():
+    assert simhash("Backup log 2025-07-10: 1432 files copied") == simhash("Backup log 2025-07-11: 98 files copied")
+    distance = bin(simhash(INVOICE) ^ simhash("Meeting notes about the roadmap and hiring plans")).count("1")
+    assert distance > 3
+
+
+def test_template_name_takes_the_new_file_numbers():
+    assert template_name("Server Log 2025 07 10", "app_2025-07-11") == "Server Log 2025 07 11"
+    # Only the last numbers of the file name are used
+    assert template_name("Invoice 1042", "v2_invoice_1043") == "Invoice 1043"
+
+
+def test_template_name_keeps_the_name_without_enough_numbers():
+    assert template_name("Server Log 2025 07 10", "app_latest") == "Server Log 2025 07 10"
+    assert template_name("Server Log 2025 07 10", "app_11") == "Server Log 2025 07 10"
+    assert template_name("Quarterly Report", "report_2025") == "Quarterly Report"
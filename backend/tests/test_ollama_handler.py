@@ -0,0 +1,264 @@
+# tests/test_ollama_handler.py
+import asyncio
+import json
+import socket
+import time
+
+import pytest
+
+from circuit_breaker import CircuitBreaker, OllamaUnavailableError
+import ollama_handler as ollama_handler_module
+from benchmarks.fake_ollama import FakeOllamaServer
+from ollama_handler import OllamaHandler, match_category, repair_analysis
+
+
+class Interrupted(BaseException):
+    """Stands in for KeyboardInterrupt without interrupting the test run."""
+
+
+def half_open(handler):
+    handler.breaker = CircuitBreaker(failure_threshold=1, reset_seconds=0)
+    handler.breaker.record_failure()
+
+
+def test_cancelled_async_trial_releases_the_breaker(ollama_handler):
+    half_open(ollama_handler)
+
+    async def hang():
+        await asyncio.sleep(10)
+
+    async def main():
+        with pytest.raises(asyncio.TimeoutError):
+            await asyncio.wait_for(ollama_handler._with_retries_async("analyze", hang), 0.05)
+
+    asyncio.run(main())
+    assert ollama_handler.breaker.state == "half_open"
+    assert ollama_handler.analyze_content("quarterly revenue invoice")["category"]
+    assert ollama_handler.breaker.state == "closed"
+
+
+def test_interrupted_sync_trial_releases_the_breaker(ollama_handler):
+    half_open(ollama_handler)
+
+    def interrupt():
+        raise Interrupted()
+
+    with pytest.raises(Interrupted):
+        ollama_handler._with_retries("analyze", interrupt)
+    assert ollama_handler._with_retries("analyze", lambda: "ok") == "ok"
+    assert ollama_handler.breaker.state == "closed"
+
+
+def test_tasks_cancelled_by_asyncio_run_release_the_breaker(ollama_handler):
+    half_open(ollama_handler)
+
+    async def hang():
+        await asyncio.sleep(10)
+
+    async def main():
+        # The trial holder is still running when main returns, so asyncio.run cancels it
+        asyncio.get_running_loop().create_task(ollama_handler._with_retries_async("analyze", hang))
+        await asyncio.sleep(0.05)
+
+    asyncio.run(main())
+    assert ollama_handler.breaker.allow()
+
+
+def test_warm_up_marks_the_model_resident(ollama_handler):
+    ollama_handler.warm_up()
+    assert ollama_handler.load_stats()["resident"]
+
+
+def test_failed_warm_up_does_not_mark_the_model_resident():
+    # Nothing listens on port 1, so loading fails on every host
+    handler = OllamaHandler(host="http://127.0.0.1:1")
+    handler.warm_up()
+    assert not handler.load_stats()["resident"]
+
+
+class ScriptedReplies:
+    """Replaces _chat and _chat_async with canned replies per model, recording the requests."""
+
+    def __init__(self, handler, replies):
+        self.replies = replies
+        self.requests = []
+        handler._chat = self.chat
+        handler._chat_async = self.chat_async
+
+    def chat(self, kind, messages, format=None, num_predict=None, stop=None, model=None):
+        self.requests.append((kind, model))
+        reply = self.replies[model if kind == "analyze" else kind]
+        if isinstance(reply, Exception):
+            raise reply
+        return reply
+
+    async def chat_async(self, *args, **kwargs):
+        return self.chat(*args, **kwargs)
+
+
+CASCADE_REPLIES = {
+    "small": '{"category": "Business", "new_name_suggestion": "Plan", "confidence": 0.2}',
+    "large": '{"category": "Financial", "new_name_suggestion": "Budget", "confidence": 0.95}',
+    "rename": "Monthly Budget\n",
+}
+
+
+@pytest.mark.parametrize("use_async", [False, True])
+def test_sync_and_async_analyses_escalate_alike(use_async):
+    handler = OllamaHandler(model="small", cascade=["small", "large"])
+    replies = ScriptedReplies(handler, CASCADE_REPLIES)
+    if use_async:
+        analysis = asyncio.run(handler.analyze_content_async("my budget for July"))
+    else:
+        analysis = handler.analyze_content("my budget for July")
+    assert analysis == {"category": "Financial", "new_name_suggestion": "Budget", "confidence": 0.95}
+    assert replies.requests == [("analyze", "small"), ("analyze", "large")]
+    assert [tier["escalations"] for tier in handler.cascade_stats()] == [1, 0]
+
+
+@pytest.mark.parametrize("use_async", [False, True])
+def test_failed_escalation_keeps_the_first_answer(use_async):
+    handler = OllamaHandler(model="small", cascade=["small", "large"])
+    ScriptedReplies(handler, {**CASCADE_REPLIES, "large": "not json"})
+    analyze = handler.analyze_content_async if use_async else handler.analyze_content
+    analysis = asyncio.run(analyze("notes")) if use_async else analyze("notes")
+    assert analysis["category"] == "Business"
+
+
+@pytest.mark.parametrize("use_async", [False, True])
+def test_sync_and_async_renames_alike(use_async):
+    handler = OllamaHandler()
+    ScriptedReplies(handler, CASCADE_REPLIES)
+    rename = handler.suggest_rename_async if use_async else handler.suggest_rename
+    name = asyncio.run(rename("text", "old")) if use_async else rename("text", "old")
+    assert name == "Monthly Budget"
+    ScriptedReplies(handler, {"rename": ValueError("bad reply")})
+    name = asyncio.run(rename("text", "old")) if use_async else rename("text", "old")
+    assert name == "old"
+    ScriptedReplies(handler, {"rename": "  \n"})
+    name = asyncio.run(rename("text", "old")) if use_async else rename("text", "old")
+    assert name == "old"
+
+
+def test_streamed_and_complete_responses_match(ollama_handler):
+    request = ollama_handler._chat_request(ollama_handler._analysis_messages("invoice total due"),
+                                           format="json", num_predict=64)
+
+    async def streamed():
+        return await ollama_handler._chat_once_async("analyze", request, 64, stream=True)
+
+    texts = [
+        ollama_handler._chat_once("analyze", request, 64, stream=False),
+        ollama_handler._chat_once("analyze", request, 64, stream=True),
+        asyncio.run(streamed()),
+    ]
+    # The fake server draws a random confidence, so compare the rest
+    answers = {(answer["category"], answer["new_name_suggestion"]) for answer in map(json.loads, texts)}
+    assert len(answers) == 1
+    assert ollama_handler.usage_stats()["calls"] == 3
+
+
+def wait_for_status(handler, status, probe=False, timeout=10):
+    """Wait until handler.model_status is status, calling recheck_models like /health does if probe is set."""
+    deadline = time.monotonic() + timeout
+    while handler.model_status != status:
+        assert time.monotonic() < deadline, f"model status stayed {handler.model_status!r}"
+        if probe:
+            handler.recheck_models()
+        time.sleep(0.01)
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def test_failed_model_check_is_rerun_once_ollama_is_up(monkeypatch):
+    monkeypatch.setattr(ollama_handler_module, "MODEL_RECHECK_SECONDS", 0)
+    # Nothing listens on the port yet while the backend starts
+    port = free_port()
+    handler = OllamaHandler(host=f"http://127.0.0.1:{port}")
+    wait_for_status(handler, "degraded")
+
+    server = FakeOllamaServer(port=port).start()
+    try:
+        wait_for_status(handler, "ready", probe=True)
+    finally:
+        server.stop()
+
+
+def test_model_recheck_is_rate_limited(monkeypatch):
+    handler = OllamaHandler(host="http://127.0.0.1:1")
+    wait_for_status(handler, "degraded")
+    rechecks = []
+    monkeypatch.setattr(handler, "ensure_model", lambda: rechecks.append(1))
+
+    monkeypatch.setattr(ollama_handler_module, "MODEL_RECHECK_SECONDS", 3600)
+    handler.recheck_models()
+    time.sleep(0.05)
+    assert rechecks == []
+
+    monkeypatch.setattr(ollama_handler_module, "MODEL_RECHECK_SECONDS", 0)
+    deadline = time.monotonic() + 5
+    while not rechecks:
+        # The startup check may still be finishing up; it is not run twice at once
+        assert time.monotonic() < deadline, "model check was not re-run"
+        handler.recheck_models()
+        time.sleep(0.01)
+    # The re-check is still "running" (the stand-in never finishes), so probes do not start another
+    handler.recheck_models()
+    time.sleep(0.05)
+    assert rechecks == [1]
+
+
+@pytest.mark.parametrize("use_async", [False, True])
+def test_exhausted_retries_keep_the_last_error(use_async):
+    handler = OllamaHandler()
+    errors = iter([ConnectionError("refused"), ConnectionResetError("reset"), ConnectionError("still refused")])
+
+    def send():
+        raise next(errors)
+
+    async def send_async():
+        send()
+
+    with pytest.raises(OllamaUnavailableError) as raised:
+        if use_async:
+            asyncio.run(handler._with_retries_async("analyze", send_async))
+        else:
+            handler._with_retries("analyze", send)
+    assert str(raised.value.__cause__) == "still refused"
+
+
+@pytest.mark.parametrize("answer, category", [
+    ("Legal", "Legal"),
+    ("legal", "Legal"),
+    ("Presentations.", "Presentations"),
+    ("Legal Docs", "Legal"),
+    ("Finacial", "Financial"),
+    ("Spaceships", "Miscellaneous"),
+    (None, "Miscellaneous"),
+    (["Legal"], "Miscellaneous"),
+])
+def test_match_category(answer, category):
+    assert match_category(answer) == category
+
+
+def test_repair_analysis_leaves_valid_answers_alone():
+    analysis = {"category": "Financial", "new_name_suggestion": "Budget July", "confidence": 0.9}
+    assert repair_analysis(analysis) == (analysis, False)
+
+
+def test_repair_analysis_normalizes_every_field():
+    repaired, changed = repair_analysis({"category": "financial docs", "new_name_suggestion": "  Budget  ",
+                                         "confidence": "1.7", "reason": "numbers"})
+    assert changed
+    assert repaired == {"category": "Financial", "new_name_suggestion": "Budget", "confidence": 1.0}
+
+
+def test_repair_analysis_drops_names_it_cannot_use():
+    assert repair_analysis({"category": "Code", "new_name_suggestion": " ", "confidence": 0.5})[0] == \
+        {"category": "Code", "new_name_suggestion": None, "confidence": 0.5}
+    assert repair_analysis({"category": "Nonsense", "new_name_suggestion": "Name", "confidence": "high"}) == \
+        ({"category": "Miscellaneous", "new_name_suggestion": None, "confidence": 0.0}, True)
@@ -0,0 +1,132 @@
+# tests/test_pipeline.py
+import asyncio
+import os
+import threading
+
+import pytest
+
+from circuit_breaker import CircuitBreaker
+from file_operations import FileOperations
+from pipeline import OrganizePipeline
+from rule_classifier import RuleClassifier
+
+
+class StubHandler:
+    """Answers like OllamaHandler without a server; contents containing a key of `raises` raise that exception."""
+
+    def __init__(self, raises=None):
+        self.raises = raises or {}
+        self.breaker = CircuitBreaker()
+
+    def warm_up(self, background=False):
+        pass
+
+    def budget_content(self, content, extension=None):
+        return content
+
+    def analyze_content(self, content, extension=None):
+        for marker, error in self.raises.items():
+            if marker in content:
+                raise error
+        return {"category": "Business", "new_name_suggestion": "report", "confidence": 0.9}
+
+    def analyze_batch(self, contents, extensions=None):
+        return [self.analyze_content(content) for content in contents]
+
+    def suggest_rename(self, content, current_name, extension=None):
+        return current_name
+
+
+def make_files(directory, contents):
+    os.makedirs(directory, exist_ok=True)
+    for name, content in contents.items():
+        with open(os.path.join(directory, name), "w") as f:
+            f.write(content)
+
+
+def run_with_timeout(pipeline, *args, timeout=20):
+    """Run the pipeline on a thread so a hang fails the test instead of blocking the suite."""
+    result = {}
+    thread = threading.Thread(target=lambda: result.update(pipeline.run(*args)), daemon=True)
+    thread.start()
+    thread.join(timeout)
+    assert not thread.is_alive(), "organize run did not finish"
+    return result
+
+
+def make_pipeline(handler, **kwargs):
+    options = {"detect_duplicates": False, "extract_workers": 1, "classify_workers": 1,
+               "plan_workers": 1, "move_workers": 1, "queue_size": 1}
+    options.update(kwargs)
+    return OrganizePipeline(FileOperations(), handler, **options)
+
+
+def test_organizes_files_into_category_folders(tmp_path):
+    source, destination = str(tmp_path / "in"), str(tmp_path / "out")
+    make_files(source, {f"file{index}.txt": f"quarterly numbers {index}" for index in range(5)})
+    result = run_with_timeout(make_pipeline(StubHandler()), source, destination)
+    assert len(result["processed_files"]) == 5
+    assert result["errors"] == []
+    assert sorted(os.listdir(os.path.join(destination, "Business"))) == [f"file{index}.txt" for index in range(5)]
+
+
+@pytest.mark.parametrize("error", [RuntimeError("model exploded"), asyncio.CancelledError()])
+def test_stage_errors_are_reported_and_the_run_finishes(tmp_path, error):
+    source, destination = str(tmp_path / "in"), str(tmp_path / "out")
+    make_files(source, {"bad.txt": "boom", **{f"file{index}.txt": f"notes {index}" for index in range(6)}})
+    pipeline = make_pipeline(StubHandler(raises={"boom": error}))
+    result = run_with_timeout(pipeline, source, destination, False, "walk")
+    assert len(result["processed_files"]) == 6
+    assert [failure["file"] for failure in result["errors"]] == [os.path.join(source, "bad.txt")]
+    assert os.path.exists(os.path.join(source, "bad.txt"))
+
+
+def test_extract_errors_are_reported(tmp_path, monkeypatch):
+    source, destination = str(tmp_path / "in"), str(tmp_path / "out")
+    make_files(source, {"a.txt": "one", "b.txt": "two"})
+    pipeline = make_pipeline(StubHandler(), extract_workers=2)
+    read_file_content = pipeline.file_operations.read_file_content
+
+    def read(file_path, *args, **kwargs):
+        if file_path.endswith("a.txt"):
+            raise OSError("unreadable")
+        return read_file_content(file_path, *args, **kwargs)
+
+    monkeypatch.setattr(pipeline.file_operations, "read_file_content", read)
+    result = run_with_timeout(pipeline, source, destination)
+    assert [entry["original_path"] for entry in result["processed_files"]] == [os.path.join(source, "b.txt")]
+    assert result["errors"] == [{"file": os.path.join(source, "a.txt"), "message": "unreadable"}]
+
+
+def test_unknown_order_is_rejected(tmp_path):
+    with pytest.raises(ValueError):
+        make_pipeline(StubHandler()).run(str(tmp_path), str(tmp_path), order="largest")
+
+
+def test_reports_the_path_files_were_actually_moved_to(tmp_path):
+    source, destination = str(tmp_path / "in"), str(tmp_path / "out")
+    make_files(source, {"a.txt": "same invoice", "b.txt": "same invoice", "c.txt": "other invoice"})
+    pipeline = make_pipeline(StubHandler(), detect_duplicates=True)
+    result = run_with_timeout(pipeline, source, destination, True, "walk")
+    new_paths = sorted(entry["new_path"] for entry in result["processed_files"])
+    folder = os.path.join(destination, "Business")
+    assert new_paths == [os.path.join(folder, name) for name in ("report.txt", "report_1.txt", "report_2.txt")]
+    assert sorted(os.listdir(folder)) == ["report.txt", "report_1.txt", "report_2.txt"]
+
+
+class NamingHandler(StubHandler):
+    def suggest_rename(self, content, current_name, extension=None):
+        return "Suggested Name"
+
+
+def test_suggestions_name_rule_matched_files_but_bulk_runs_do_not(tmp_path):
+    source, destination = str(tmp_path / "in"), str(tmp_path / "out")
+    make_files(source, {"script.py": "print('hello')"})
+    file_operations = FileOperations()
+    pipeline = OrganizePipeline(file_operations, NamingHandler(), rule_classifier=RuleClassifier(file_operations),
+                                detect_duplicates=False)
+    analysis = pipeline.analyze_file(os.path.join(source, "script.py"))
+    assert analysis == {"category": "Code", "new_name_suggestion": "Suggested Name"}
+
+    result = run_with_timeout(pipeline, source, destination, True)
+    assert result["processed_files"][0]["new_path"] == os.path.join(destination, "Code", "script.py")
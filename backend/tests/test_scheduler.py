@@ -0,0 +1,103 @@
+# tests/test_scheduler.py
+import asyncio
+import threading
+import time
+
+from scheduler import PriorityScheduler, INTERACTIVE, BULK, lane, current_lane
+
+
+def hold_slot(scheduler, lane_name, release, granted):
+    with scheduler.slot(lane_name):
+        granted.append(lane_name)
+        release.wait()
+
+
+def start_waiting(scheduler, lane_name, release, granted):
+    thread = threading.Thread(target=hold_slot, args=(scheduler, lane_name, release, granted), daemon=True)
+    thread.start()
+    return thread
+
+
+def wait_for(condition, timeout=5):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline, "condition not reached"
+        time.sleep(0.005)
+
+
+def test_interactive_calls_go_first():
+    scheduler = PriorityScheduler(limit=1, aging_seconds=0)
+    release = threading.Event()
+    granted = []
+    threads = [start_waiting(scheduler, BULK, release, granted)]
+    wait_for(lambda: granted)
+    threads.append(start_waiting(scheduler, BULK, release, granted))
+    wait_for(lambda: scheduler.stats()["lanes"][BULK]["depth"] == 1)
+    threads.append(start_waiting(scheduler, INTERACTIVE, release, granted))
+    wait_for(lambda: scheduler.stats()["lanes"][INTERACTIVE]["depth"] == 1)
+    release.set()
+    for thread in threads:
+        thread.join(5)
+    assert granted == [BULK, INTERACTIVE, BULK]
+
+
+def test_aged_bulk_call_overtakes_interactive():
+    scheduler = PriorityScheduler(limit=1, aging_seconds=0.05)
+    release = threading.Event()
+    granted = []
+    threads = [start_waiting(scheduler, BULK, release, granted)]
+    wait_for(lambda: granted)
+    threads.append(start_waiting(scheduler, BULK, release, granted))
+    wait_for(lambda: scheduler.stats()["lanes"][BULK]["depth"] == 1)
+    time.sleep(0.2)
+    threads.append(start_waiting(scheduler, INTERACTIVE, release, granted))
+    wait_for(lambda: scheduler.stats()["lanes"][INTERACTIVE]["depth"] == 1)
+    release.set()
+    for thread in threads:
+        thread.join(5)
+    assert granted == [BULK, BULK, INTERACTIVE]
+    assert scheduler.stats()["lanes"][BULK]["aged_grants"] == 1
+
+
+def test_raising_the_limit_admits_waiting_calls():
+    scheduler = PriorityScheduler(limit=1)
+    release = threading.Event()
+    granted = []
+    threads = [start_waiting(scheduler, BULK, release, granted) for _ in range(3)]
+    wait_for(lambda: len(granted) == 1)
+    scheduler.limit = 3
+    wait_for(lambda: len(granted) == 3)
+    release.set()
+    for thread in threads:
+        thread.join(5)
+    assert scheduler.stats()["in_flight"] == 0
+
+
+def test_lane_context_sets_the_current_lane():
+    assert current_lane() == BULK
+    with lane(INTERACTIVE):
+        assert current_lane() == INTERACTIVE
+    assert current_lane() == BULK
+
+
+def test_cancelled_async_waiter_leaves_the_queue():
+    scheduler = PriorityScheduler(limit=1)
+
+    async def main():
+        async def hold():
+            async with scheduler.slot_async():
+                await asyncio.sleep(10)
+
+        holder = asyncio.create_task(hold())
+        await asyncio.sleep(0.01)
+        waiter = asyncio.create_task(hold())
+        await asyncio.sleep(0.01)
+        assert scheduler.stats()["lanes"][BULK]["depth"] == 1
+        waiter.cancel()
+        holder.cancel()
+        await asyncio.gather(holder, waiter, return_exceptions=True)
+
+    asyncio.run(main())
+    stats = scheduler.stats()
+    assert stats["in_flight"] == 0
+    assert stats["lanes"][BULK]["depth"] == 0
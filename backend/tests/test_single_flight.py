@@ -0,0 +1,139 @@
+# tests/test_single_flight.py
+import asyncio
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from single_flight import SingleFlight
+
+
+def test_concurrent_callers_share_one_computation():
+    flight = SingleFlight()
+    started = threading.Event()
+    release = threading.Event()
+    calls = []
+
+    def compute():
+        calls.append(1)
+        started.set()
+        release.wait()
+        return "answer"
+
+    results = []
+    leader = threading.Thread(target=lambda: results.append(flight.do("key", compute)))
+    leader.start()
+    started.wait()
+    followers = [threading.Thread(target=lambda: results.append(flight.do("key", compute))) for _ in range(3)]
+    for follower in followers:
+        follower.start()
+    time.sleep(0.05)
+    release.set()
+    for thread in [leader, *followers]:
+        thread.join(5)
+    assert results == ["answer"] * 4
+    assert len(calls) == 1
+    assert flight.stats()["coalesced"] == 3
+
+
+def test_leader_errors_are_shared():
+    flight = SingleFlight()
+    call, leader = flight.begin("key")
+    assert leader
+    flight.fail("key", ValueError("bad answer"))
+    with pytest.raises(ValueError):
+        call.wait()
+
+
+def test_cancelled_leader_does_not_cancel_followers():
+    flight = SingleFlight()
+    computed = []
+
+    async def slow():
+        await asyncio.sleep(10)
+
+    def recompute():
+        computed.append(1)
+        return "answer"
+
+    async def main():
+        leader = asyncio.create_task(flight.do_async("key", slow))
+        await asyncio.sleep(0.01)
+        # A sync follower, like a pipeline worker thread, joins the async leader
+        follower = asyncio.get_running_loop().run_in_executor(None, flight.do, "key", recompute)
+        await asyncio.sleep(0.05)
+        leader.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await leader
+        return await asyncio.wait_for(follower, 5)
+
+    assert asyncio.run(main()) == "answer"
+    assert computed == [1]
+    assert flight.stats()["in_flight"] == 0
+
+
+def test_cancelled_leader_hands_over_to_async_followers():
+    flight = SingleFlight()
+
+    async def slow():
+        await asyncio.sleep(10)
+
+    async def quick():
+        return "answer"
+
+    async def main():
+        leader = asyncio.create_task(flight.do_async("key", slow))
+        await asyncio.sleep(0.01)
+        followers = [asyncio.create_task(flight.do_async("key", quick)) for _ in range(2)]
+        await asyncio.sleep(0.05)
+        leader.cancel()
+        return await asyncio.wait_for(asyncio.gather(*followers), 5)
+
+    assert asyncio.run(main()) == ["answer", "answer"]
+
+
+class NoThreads(ThreadPoolExecutor):
+    """Default executor that fails the test if anything tries to wait on a thread."""
+
+    def submit(self, *args, **kwargs):
+        raise AssertionError("async follower used an executor thread")
+
+
+def test_async_followers_wait_without_threads():
+    flight = SingleFlight()
+    release = asyncio.Event()
+
+    async def slow():
+        await release.wait()
+        return "answer"
+
+    async def main():
+        asyncio.get_running_loop().set_default_executor(NoThreads())
+        leader = asyncio.create_task(flight.do_async("key", slow))
+        await asyncio.sleep(0.01)
+        followers = [asyncio.create_task(flight.do_async("key", slow)) for _ in range(3)]
+        await asyncio.sleep(0.01)
+        followers[0].cancel()
+        await asyncio.sleep(0.01)
+        release.set()
+        return await asyncio.wait_for(asyncio.gather(leader, *followers, return_exceptions=True), 5)
+
+    leader, cancelled, *followers = asyncio.run(main())
+    assert isinstance(cancelled, asyncio.CancelledError)
+    assert [leader, *followers] == ["answer"] * 3
+    assert flight.stats() == {"calls": 1, "coalesced": 3, "coalesced_rate": 0.75, "in_flight": 0}
+
+
+def test_async_follower_is_woken_by_a_thread_leader():
+    flight = SingleFlight()
+    call, leader = flight.begin("key")
+    assert leader
+
+    async def main():
+        follower = asyncio.create_task(flight.do_async("key", None))
+        await asyncio.sleep(0.01)
+        threading.Timer(0.02, flight.finish, args=("key", "answer")).start()
+        return await asyncio.wait_for(follower, 5)
+
+    assert asyncio.run(main()) == "answer"